@@ -0,0 +1,6 @@
+"""
+Benchmarks for the equipment ingest pipeline.
+
+Run from the chemical_visualizer directory, e.g.:
+    python -m benchmarks.bench_parallel_ingest --rows 1000000
+"""
@@ -0,0 +1,58 @@
+"""
+Measure the anomaly stage against the ingest it follows.
+
+For each size, ingests a synthetic CSV into a column store, then runs
+find_anomalies over the store with every method and reports its time as a
+share of the ingest time. The stage should grow linearly with the rows and
+stay a small fraction of ingest.
+
+Usage:
+    python -m benchmarks.bench_anomalies --rows 250000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import setup_django, write_equipment_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[250000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django()
+        from django.conf import settings
+
+        settings.MEDIA_ROOT = tmp
+        settings.EQUIPMENT_DATA_DIR = os.path.join(tmp, 'equipment_data')
+
+        from equipment_api.anomalies import METHODS, find_anomalies
+        from equipment_api.columnar import ColumnarStore
+        from equipment_api.pipeline import ingest_upload
+
+        print(f"  {'rows':>9} {'method':<7} {'ingest s':>9} {'detect s':>9} {'share':>7} {'flags':>7}")
+        for rows in args.rows:
+            path = write_equipment_csv(os.path.join(tmp, f'equipment_{rows}.csv'), rows)
+            start = time.perf_counter()
+            _, data_path = ingest_upload(path=path)
+            ingest_seconds = time.perf_counter() - start
+            store = ColumnarStore.open(data_path)
+
+            for method in METHODS:
+                best = float('inf')
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    total, _ = find_anomalies(store, method)
+                    best = min(best, time.perf_counter() - start)
+                print(
+                    f"  {rows:9,} {method:<7} {ingest_seconds:9.2f} {best:9.3f} "
+                    f"{best / ingest_seconds:7.1%} {total:7,}"
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure the typed, column-pruned CSV parser against untyped pd.read_csv on
+wide equipment exports.
+
+Each variant runs in a fresh process so its peak RSS can be reported.
+
+Usage:
+    python -m benchmarks.bench_csv_parser --rows 1000000 --extra-columns 40
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import peak_rss, reset_peak_rss, setup_django, write_equipment_csv
+
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+
+
+def run_variant(variant, path, chunk_rows):
+    """Parse ``path`` with one variant; returns (rows, seconds, peak RSS in MB)."""
+    setup_django()
+    from django.conf import settings
+    import pandas as pd
+    from equipment_api.ingest import iter_csv_chunks
+
+    baseline = reset_peak_rss()
+    start = time.perf_counter()
+    rows = 0
+    if variant == 'untyped':
+        # The pre-change configuration: every column, inferred types
+        with pd.read_csv(path, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                rows += len(chunk[REQUIRED_COLUMNS].dropna())
+    else:
+        settings.EQUIPMENT_CSV_ENGINE = variant
+        with open(path, 'rb', buffering=0) as f:
+            for chunk in iter_csv_chunks(f, chunk_rows):
+                rows += len(chunk)
+    seconds = time.perf_counter() - start
+    return rows, seconds, (peak_rss() - baseline) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--extra-columns', type=int, default=40)
+    parser.add_argument('--chunk-rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    setup_django()
+    from equipment_api.ingest import pa_csv
+
+    variants = ['untyped', 'c'] + (['pyarrow'] if pa_csv is not None else [])
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_equipment_csv(
+            os.path.join(tmp, 'wide.csv'), args.rows, extra_columns=args.extra_columns
+        )
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.rows:,} rows x {5 + args.extra_columns} columns ({size_mb:.0f} MB)")
+        print(f"  {'variant':<10} {'seconds':>8} {'us/row':>8} {'peak MB':>8}")
+        for variant in variants:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                rows, seconds, peak_mb = executor.submit(
+                    run_variant, variant, path, args.chunk_rows
+                ).result()
+            print(f"  {variant:<10} {seconds:8.2f} {seconds / rows * 1e6:8.2f} {peak_mb:8.0f}")
+
+
+if __name__ == '__main__':
+    main()
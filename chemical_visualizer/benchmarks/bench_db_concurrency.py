@@ -0,0 +1,165 @@
+"""
+Measure simultaneous uploads and history reads against the configured database.
+
+Writer threads POST small CSV files to /api/upload/ while reader threads page
+through /api/history/, all through the Django test client against an on-disk
+throwaway test database. On SQLite two configurations run, each in a fresh
+process: Django's defaults (rollback journal, synchronous=FULL, a new
+connection per request) and the tuned settings from
+chemical_visualizer/database.py (WAL, synchronous=NORMAL, busy_timeout and
+persistent connections). With DB_ENGINE=postgresql only the configured
+settings run.
+
+Usage:
+    python -m benchmarks.bench_db_concurrency --writers 4 --readers 4 --uploads 20
+"""
+import argparse
+import base64
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import setup_django
+
+
+def make_csv(writer, index, rows):
+    lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+    lines += [
+        f'Unit {writer}-{index}-{i},{"ABC"[i % 3]},{100 + i % 7},{50 + i % 5},{25 + i % 3}'
+        for i in range(rows)
+    ]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_variant(variant, args, tmp):
+    """Run one configuration; returns a dict of throughput and latency figures."""
+    setup_django()
+    from django.conf import settings
+    from django.db import connection, connections
+    from django.test import Client
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment
+
+    settings.ALLOWED_HOSTS = ['*']
+    settings.MEDIA_ROOT = tmp
+    settings.EQUIPMENT_DATA_DIR = os.path.join(tmp, 'equipment_data')
+    settings.EQUIPMENT_PRUNE_INTERVAL_SECONDS = 0
+    # Basic auth hashes the password on every request; PBKDF2 would dominate
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    database = settings.DATABASES['default']
+    if database['ENGINE'].endswith('sqlite3'):
+        database.setdefault('TEST', {})['NAME'] = os.path.join(tmp, f'{variant}.sqlite3')
+        if variant == 'default':
+            database['ENGINE'] = 'django.db.backends.sqlite3'
+            database['CONN_MAX_AGE'] = 0
+            database['OPTIONS'] = {}
+            settings.SQLITE_PRAGMAS = {}
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        from django.contrib.auth.models import User
+        User.objects.create_user('bench', password='bench')
+        auth = {'HTTP_AUTHORIZATION': 'Basic ' + base64.b64encode(b'bench:bench').decode()}
+        journal_mode = None
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+
+        lock = threading.Lock()
+        upload_times, read_times, errors = [], [], []
+        writers_done = threading.Event()
+
+        def writer(number):
+            client = Client()
+            for index in range(args.uploads):
+                upload = io.BytesIO(make_csv(number, index, args.rows))
+                upload.name = f'bench-{number}-{index}.csv'
+                start = time.perf_counter()
+                response = client.post('/api/upload/', {'csv_file': upload}, **auth)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if response.status_code == 201:
+                        upload_times.append(elapsed)
+                    else:
+                        errors.append(response.status_code)
+            connections.close_all()
+
+        def reader():
+            client = Client()
+            while not writers_done.is_set():
+                start = time.perf_counter()
+                response = client.get('/api/history/', **auth)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if response.status_code == 200:
+                        read_times.append(elapsed)
+                    else:
+                        errors.append(response.status_code)
+            connections.close_all()
+
+        writer_threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+        reader_threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        start = time.perf_counter()
+        for thread in writer_threads + reader_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        writers_done.set()
+        for thread in reader_threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+
+        return {
+            'vendor': connection.vendor,
+            'journal_mode': journal_mode,
+            'seconds': seconds,
+            'uploads_per_s': len(upload_times) / seconds,
+            'reads_per_s': len(read_times) / seconds,
+            'upload_p95_ms': percentile(upload_times, 0.95) * 1000,
+            'read_p95_ms': percentile(read_times, 0.95) * 1000,
+            'errors': len(errors),
+        }
+    finally:
+        runner.teardown_databases(old_config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--uploads', type=int, default=20, help='uploads per writer thread')
+    parser.add_argument('--rows', type=int, default=2000, help='rows per uploaded file')
+    args = parser.parse_args()
+
+    variants = ['tuned']
+    if 'sqlite' in os.getenv('DB_ENGINE', 'sqlite'):
+        variants.insert(0, 'default')
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{args.writers} writers x {args.uploads} uploads of {args.rows:,} rows, {args.readers} readers")
+    print(f"  {'variant':<8} {'journal':>8} {'uploads/s':>10} {'reads/s':>9} "
+          f"{'upload p95':>11} {'read p95':>9} {'errors':>7}")
+    for variant in variants:
+        with tempfile.TemporaryDirectory() as tmp:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_variant, variant, args, tmp).result()
+        print(f"  {variant:<8} {str(result['journal_mode'] or result['vendor']):>8} "
+              f"{result['uploads_per_s']:10.1f} {result['reads_per_s']:9.1f} "
+              f"{result['upload_p95_ms']:9.0f}ms {result['read_p95_ms']:7.0f}ms {result['errors']:7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Compare the original single-shot pd.read_csv upload path with the streaming
+serial ingest and the byte-range parallel ingest.
+
+Usage:
+    python -m benchmarks.bench_parallel_ingest --rows 1000000 10000000 --workers 4
+"""
+import argparse
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import setup_django, timed, write_equipment_csv
+
+setup_django()
+
+import pandas as pd  # noqa: E402
+
+from equipment_api.ingest import ChunkStream, ingest_stream  # noqa: E402
+from equipment_api.parallel import ingest_csv_parallel  # noqa: E402
+
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+
+
+def read_csv_baseline(path):
+    """The pre-streaming upload path: read, decode and parse the whole file."""
+    with open(path, 'rb') as f:
+        df = pd.read_csv(io.StringIO(f.read().decode('utf-8')))
+    df = df[REQUIRED_COLUMNS].dropna()
+    return len(df), df['Flowrate'].mean(), df['Type'].value_counts().to_dict()
+
+
+def stream_serial(path, chunk_rows):
+    with open(path, 'rb') as f:
+        return ingest_stream(ChunkStream(iter(lambda: f.read(65536), b'')), chunk_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"workers={args.workers} (cpu_count={os.cpu_count()})")
+    with ProcessPoolExecutor(max_workers=args.workers) as executor, \
+            tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = write_equipment_csv(os.path.join(tmp, f'equipment_{rows}.csv'), rows)
+            results = {}
+            with timed('pd.read_csv (baseline)', results):
+                read_csv_baseline(path)
+            with timed('streaming serial', results):
+                stream_serial(path, args.chunk_rows)
+            with timed('parallel byte ranges', results):
+                ingest_csv_parallel(path, args.workers, args.chunk_rows, executor)
+
+            baseline = results['pd.read_csv (baseline)']
+            size_mb = os.path.getsize(path) / 1e6
+            print(f"\n{rows:,} rows ({size_mb:.0f} MB)")
+            for label, seconds in results.items():
+                print(f"  {label:<24} {seconds:8.2f} s  {baseline / seconds:5.2f}x")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
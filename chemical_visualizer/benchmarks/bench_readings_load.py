@@ -0,0 +1,100 @@
+"""
+Measure loading upload rows into EquipmentReading: naive save() per row,
+chunked bulk_create and, on PostgreSQL, COPY.
+
+Runs against a throwaway test database of the configured backend, so point
+DB_* settings at PostgreSQL to include the COPY loader. Each row is committed
+the way the upload pipeline commits it: one transaction per upload, except
+for the naive variant, which saves rows in autocommit mode. That variant is
+slow, so it only loads the first ``--save-rows`` rows.
+
+Usage:
+    python -m benchmarks.bench_readings_load --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import setup_django, write_equipment_csv
+
+
+def load_naive(upload, store, rows):
+    """One INSERT per row via Model.save(), for the first ``rows`` rows."""
+    from equipment_api.models import EquipmentReading
+    from equipment_api.readings import iter_store_blocks
+
+    names, types, flowrates, pressures, temperatures = next(iter_store_blocks(store, rows))
+    for name, equipment_type, flowrate, pressure, temperature in zip(
+        names, types, flowrates, pressures, temperatures
+    ):
+        EquipmentReading(
+            upload=upload,
+            name=name,
+            equipment_type=equipment_type,
+            flowrate=flowrate,
+            pressure=pressure,
+            temperature=temperature,
+        ).save()
+    return len(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--save-rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django()
+        from django.conf import settings
+        from django.db import connection, transaction
+        from django.test.runner import DiscoverRunner
+        from django.test.utils import setup_test_environment
+
+        settings.MEDIA_ROOT = tmp
+        settings.EQUIPMENT_DATA_DIR = os.path.join(tmp, 'equipment_data')
+        if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+            # An on-disk database, like production, rather than :memory:
+            settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            from equipment_api.models import EquipmentReading, EquipmentUpload
+            from equipment_api.pipeline import ingest_upload
+            from equipment_api.readings import bulk_insert_readings, copy_readings
+
+            path = write_equipment_csv(os.path.join(tmp, 'equipment.csv'), args.rows)
+            stats, data_path = ingest_upload(path=path)
+            upload = EquipmentUpload.create_from_stats('equipment.csv', stats, data_path=data_path)
+            store = upload.get_store()
+
+            variants = [
+                ('save', lambda: load_naive(upload, store, min(args.save_rows, store.rows))),
+                ('bulk_create', lambda: bulk_insert_readings(upload, store, args.batch_size)),
+            ]
+            if connection.vendor == 'postgresql':
+                variants.append(('copy', lambda: copy_readings(upload, store, args.batch_size)))
+
+            print(f"{store.rows:,} rows on {connection.vendor}, batch size {args.batch_size:,}")
+            print(f"  {'variant':<12} {'rows':>9} {'seconds':>8} {'rows/s':>10}")
+            for label, load in variants:
+                EquipmentReading.objects.all().delete()
+                start = time.perf_counter()
+                if label == 'save':
+                    rows = load()
+                else:
+                    with transaction.atomic():
+                        rows = load()
+                seconds = time.perf_counter() - start
+                assert EquipmentReading.objects.count() == rows
+                print(f"  {label:<12} {rows:9,} {seconds:8.2f} {rows / seconds:10,.0f}")
+        finally:
+            runner.teardown_databases(old_config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Measure downsampling of per-row series against the column size.
+
+For each size, ingests a synthetic CSV into a column store, then reduces each
+numeric column to every requested point count with every method and reports
+the best time. Both methods read the column once, so the time should grow
+linearly with the rows and stay well under a second at millions of rows.
+
+Usage:
+    python -m benchmarks.bench_series --rows 1000000 5000000 --points 1000 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import setup_django, write_equipment_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--points', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django()
+        from django.conf import settings
+
+        settings.MEDIA_ROOT = tmp
+        settings.EQUIPMENT_DATA_DIR = os.path.join(tmp, 'equipment_data')
+
+        from equipment_api.columnar import ColumnarStore
+        from equipment_api.pipeline import ingest_upload
+        from equipment_api.series import METHODS, downsample
+
+        print(f"  {'rows':>9} {'method':<7} {'points':>7} {'kept':>7} {'seconds':>8}")
+        for rows in args.rows:
+            path = write_equipment_csv(os.path.join(tmp, f'equipment_{rows}.csv'), rows)
+            _, data_path = ingest_upload(path=path)
+            store = ColumnarStore.open(data_path)
+
+            for method in METHODS:
+                for points in args.points:
+                    best = float('inf')
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        series = downsample(store, 'Pressure', method, points)
+                        best = min(best, time.perf_counter() - start)
+                    print(f"  {rows:9,} {method:<7} {points:7,} {len(series['x']):7,} {best:8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Measure streaming read-only .xlsx ingest against pd.read_excel on a large sheet.
+
+Each variant runs in a fresh process so its peak RSS can be reported.
+
+Usage:
+    python -m benchmarks.bench_xlsx_ingest --rows 500000
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import peak_rss, reset_peak_rss, setup_django, write_equipment_xlsx
+
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+
+
+def run_variant(variant, path, chunk_rows):
+    """Parse ``path`` with one variant; returns (rows, seconds, peak RSS in MB)."""
+    setup_django()
+    import pandas as pd
+    from equipment_api.excel import iter_xlsx_chunks
+
+    baseline = reset_peak_rss()
+    start = time.perf_counter()
+    rows = 0
+    if variant == 'read_excel':
+        # Loads the whole sheet into one DataFrame
+        rows = len(pd.read_excel(path, engine='openpyxl')[REQUIRED_COLUMNS].dropna())
+    else:
+        for chunk in iter_xlsx_chunks(path, chunk_rows):
+            rows += len(chunk)
+    seconds = time.perf_counter() - start
+    return rows, seconds, (peak_rss() - baseline) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--chunk-rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_equipment_xlsx(os.path.join(tmp, 'equipment.xlsx'), args.rows)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.rows:,} rows ({size_mb:.0f} MB workbook)")
+        print(f"  {'variant':<12} {'seconds':>8} {'us/row':>8} {'peak MB':>8}")
+        for variant in ['read_excel', 'streaming']:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                rows, seconds, peak_mb = executor.submit(
+                    run_variant, variant, path, args.chunk_rows
+                ).result()
+            print(f"  {variant:<12} {seconds:8.2f} {seconds / rows * 1e6:8.2f} {peak_mb:8.0f}")
+
+
+if __name__ == '__main__':
+    main()
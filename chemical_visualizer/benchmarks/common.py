@@ -0,0 +1,103 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+import os
+import resource
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+EQUIPMENT_TYPES = ['Centrifugal', 'Reciprocating', 'Rotary', 'Ball', 'Electric', 'Axial', 'Mechanical']
+
+
+def setup_django():
+    """Configure Django so benchmark scripts can import equipment_api."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chemical_visualizer.settings')
+    import django
+    django.setup()
+
+
+def write_equipment_csv(path, rows, extra_columns=0, block_rows=500000, seed=0):
+    """
+    Write a synthetic equipment export with ``rows`` data rows.
+
+    ``extra_columns`` adds unused numeric and text columns, like the wide
+    plant exports the parser has to skip over.
+    """
+    rng = np.random.default_rng(seed)
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        while written < rows:
+            n = min(block_rows, rows - written)
+            data = {
+                'Equipment Name': [f'Unit {i}' for i in range(written, written + n)],
+                'Type': rng.choice(EQUIPMENT_TYPES, n),
+                'Flowrate': rng.normal(100, 25, n).round(2),
+                'Pressure': rng.normal(50, 10, n).round(2),
+                'Temperature': rng.normal(25, 5, n).round(2),
+            }
+            for i in range(extra_columns):
+                if i % 2:
+                    data[f'Note {i}'] = rng.choice(['ok', 'check', 'service due'], n)
+                else:
+                    data[f'Sensor {i}'] = rng.random(n).round(4)
+            pd.DataFrame(data).to_csv(f, header=(written == 0), index=False)
+            written += n
+    return path
+
+
+def write_equipment_xlsx(path, rows, seed=0):
+    """Write a synthetic equipment workbook with ``rows`` data rows."""
+    from openpyxl import Workbook
+
+    rng = np.random.default_rng(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Equipment')
+    sheet.append(['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+    types = rng.choice(EQUIPMENT_TYPES, rows)
+    values = rng.normal([100, 50, 25], [25, 10, 5], (rows, 3)).round(2)
+    for i in range(rows):
+        sheet.append([f'Unit {i}', types[i], *values[i].tolist()])
+    workbook.save(path)
+    return path
+
+
+def _read_status(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+
+
+def peak_rss():
+    """Peak RSS in KB since the last reset."""
+    try:
+        return _read_status('VmHWM:')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def reset_peak_rss():
+    """
+    Reset the peak RSS high-water mark where Linux allows it and return the
+    current RSS in KB, so the reported peak excludes interpreter and import
+    overhead.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _read_status('VmRSS:')
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@contextmanager
+def timed(label, results):
+    """Record the wall-clock time of the block under ``label``."""
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
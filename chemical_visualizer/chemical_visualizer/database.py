@@ -0,0 +1,125 @@
+"""
+Database configuration for chemical_visualizer.
+
+The backend is chosen with the DB_* environment variables. SQLite (the
+default) is tuned for concurrent uploads and history reads by the
+``connection_created`` hook below: WAL lets readers run alongside the single
+writer, synchronous=NORMAL drops the fsync on every commit (WAL stays
+crash-safe), and busy_timeout makes a writer wait for the lock instead of
+failing with "database is locked". PostgreSQL uses Django's connection pool
+when psycopg 3 and its pool are installed, else persistent connections.
+"""
+import os
+
+import django
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+SQLITE_IMMEDIATE_ENGINE = 'chemical_visualizer.sqlite3'
+POSTGRESQL_ENGINE = 'django.db.backends.postgresql'
+
+DEFAULT_CONN_MAX_AGE = 600
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+}
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def _pool_available():
+    """Whether Django's psycopg 3 connection pool can be used."""
+    if django.VERSION < (5, 1):
+        return False
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def sqlite_pragmas():
+    """PRAGMAs applied to every new SQLite connection, from the environment."""
+    return {
+        'journal_mode': os.getenv('DB_SQLITE_JOURNAL_MODE', DEFAULT_SQLITE_PRAGMAS['journal_mode']),
+        'synchronous': os.getenv('DB_SQLITE_SYNCHRONOUS', DEFAULT_SQLITE_PRAGMAS['synchronous']),
+        'busy_timeout': _env_int('DB_SQLITE_BUSY_TIMEOUT_MS', DEFAULT_SQLITE_PRAGMAS['busy_timeout']),
+    }
+
+
+def sqlite_config(base_dir):
+    """DATABASES entry for the SQLite file DB_NAME under ``base_dir``."""
+    config = {
+        'ENGINE': SQLITE_ENGINE,
+        'NAME': os.path.join(base_dir, os.getenv('DB_NAME', 'db.sqlite3')),
+        'CONN_MAX_AGE': _env_int('DB_CONN_MAX_AGE', DEFAULT_CONN_MAX_AGE),
+        'OPTIONS': {
+            # Seconds the sqlite3 module waits for a lock, matching busy_timeout
+            'timeout': _env_int('DB_SQLITE_BUSY_TIMEOUT_MS', DEFAULT_SQLITE_PRAGMAS['busy_timeout']) / 1000,
+        },
+    }
+    # Take the write lock when a transaction starts, so that a busy writer
+    # waits for busy_timeout instead of failing on lock upgrade
+    if django.VERSION >= (5, 1):
+        config['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+    else:
+        config['ENGINE'] = SQLITE_IMMEDIATE_ENGINE
+    return config
+
+
+def postgresql_config():
+    """DATABASES entry for PostgreSQL from the DB_* variables."""
+    config = {
+        'ENGINE': POSTGRESQL_ENGINE,
+        'NAME': os.getenv('DB_NAME', 'chemical_db'),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if os.getenv('DB_POOL', 'True') == 'True' and _pool_available():
+        # Pooled connections are returned to the pool after each request;
+        # Django requires CONN_MAX_AGE to be 0 with a pool
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': _env_int('DB_POOL_MIN_SIZE', 2),
+            'max_size': _env_int('DB_POOL_MAX_SIZE', 10),
+            'timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        }
+    else:
+        config['CONN_MAX_AGE'] = _env_int('DB_CONN_MAX_AGE', DEFAULT_CONN_MAX_AGE)
+    return config
+
+
+def database_config(base_dir):
+    """
+    The default DATABASES entry selected by DB_ENGINE.
+
+    Raises:
+        ValueError: If DB_ENGINE names an unsupported backend
+    """
+    engine = os.getenv('DB_ENGINE', SQLITE_ENGINE)
+    if engine in (SQLITE_ENGINE, SQLITE_IMMEDIATE_ENGINE, 'sqlite', 'sqlite3'):
+        return sqlite_config(base_dir)
+    if engine in (POSTGRESQL_ENGINE, 'postgresql', 'postgres'):
+        return postgresql_config()
+    raise ValueError(f'Unsupported DB_ENGINE: {engine}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to each new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
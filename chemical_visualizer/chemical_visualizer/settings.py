@@ -66,13 +66,15 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'chemical_visualizer.wsgi.application'
 
-# Database - SQLite
+# Database - SQLite in WAL mode by default; set DB_ENGINE and the other DB_*
+# variables for PostgreSQL (see chemical_visualizer/database.py). Importing
+# the module also registers the hook that applies SQLITE_PRAGMAS.
+from chemical_visualizer.database import database_config, sqlite_pragmas  # noqa: E402
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
+SQLITE_PRAGMAS = sqlite_pragmas()
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -151,3 +153,100 @@ REST_FRAMEWORK = {
 # File Upload Settings
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5 MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5 MB
+
+# Hash uploads while they stream in, for duplicate detection
+FILE_UPLOAD_HANDLERS = [
+    'equipment_api.upload_handlers.ContentHashMemoryFileUploadHandler',
+    'equipment_api.upload_handlers.ContentHashTemporaryFileUploadHandler',
+]
+
+# Equipment ingest settings
+# Files above FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to a temporary file and
+# parsed in chunks of this many rows, so upload size does not drive peak memory.
+EQUIPMENT_INGEST_CHUNK_ROWS = int(os.getenv('EQUIPMENT_INGEST_CHUNK_ROWS', '50000'))
+
+# Spooled uploads at least this large are split into byte ranges and parsed by
+# a pool of EQUIPMENT_INGEST_WORKERS processes (0 = one per CPU). A file is
+# parsed serially instead when a range boundary falls inside a quoted field
+# holding a line break.
+EQUIPMENT_PARALLEL_MIN_BYTES = int(os.getenv('EQUIPMENT_PARALLEL_MIN_BYTES', str(64 * 1024 * 1024)))
+EQUIPMENT_INGEST_WORKERS = int(os.getenv('EQUIPMENT_INGEST_WORKERS', '0'))
+
+# Background upload jobs (POST /api/upload/ with mode=async) are spooled here
+# and processed by a local pool of EQUIPMENT_JOB_WORKERS threads. Jobs left
+# queued or running by a stopped server are marked failed after a restart.
+EQUIPMENT_SPOOL_DIR = os.getenv('EQUIPMENT_SPOOL_DIR', os.path.join(MEDIA_ROOT, 'spool'))
+EQUIPMENT_JOB_WORKERS = int(os.getenv('EQUIPMENT_JOB_WORKERS', '2'))
+
+# Rows of every upload are kept in a memory-mappable column store under
+# EQUIPMENT_DATA_DIR so they can be re-analysed without re-uploading.
+EQUIPMENT_STORE_ROWS = os.getenv('EQUIPMENT_STORE_ROWS', 'True') == 'True'
+EQUIPMENT_DATA_DIR = os.getenv('EQUIPMENT_DATA_DIR', os.path.join(MEDIA_ROOT, 'equipment_data'))
+
+# CSV parser engine: 'auto' uses pyarrow (a requirement; several times faster
+# than pandas 'c'), falling back to 'c' if it cannot be imported.
+EQUIPMENT_CSV_ENGINE = os.getenv('EQUIPMENT_CSV_ENGINE', 'auto')
+
+# Batch uploads (POST /api/upload/batch/): maximum files per request and total
+# uncompressed bytes accepted from a ZIP archive.
+EQUIPMENT_BATCH_MAX_FILES = int(os.getenv('EQUIPMENT_BATCH_MAX_FILES', '100'))
+EQUIPMENT_BATCH_MAX_BYTES = int(os.getenv('EQUIPMENT_BATCH_MAX_BYTES', str(2 * 1024 * 1024 * 1024)))
+
+# Resumable uploads (/api/upload/sessions/): largest chunk per request, and how
+# long an idle session and its spooled bytes are kept.
+EQUIPMENT_UPLOAD_CHUNK_MAX_BYTES = int(os.getenv('EQUIPMENT_UPLOAD_CHUNK_MAX_BYTES', str(32 * 1024 * 1024)))
+EQUIPMENT_UPLOAD_SESSION_TTL_HOURS = int(os.getenv('EQUIPMENT_UPLOAD_SESSION_TTL_HOURS', '24'))
+
+# Upload retention: keep the newest EQUIPMENT_RETENTION_COUNT uploads and drop
+# uploads older than EQUIPMENT_RETENTION_DAYS (0 disables either limit).
+# Pruning runs in batches from `manage.py prune_uploads` or from a background
+# thread that starts with the server and prunes at once, then every
+# EQUIPMENT_PRUNE_INTERVAL_SECONDS (0 disables the thread); the
+# readings of pruned uploads are deleted first, in batches of
+# EQUIPMENT_PRUNE_READINGS_BATCH_SIZE rows.
+EQUIPMENT_RETENTION_COUNT = int(os.getenv('EQUIPMENT_RETENTION_COUNT', '100'))
+EQUIPMENT_RETENTION_DAYS = int(os.getenv('EQUIPMENT_RETENTION_DAYS', '0'))
+EQUIPMENT_PRUNE_BATCH_SIZE = int(os.getenv('EQUIPMENT_PRUNE_BATCH_SIZE', '500'))
+EQUIPMENT_PRUNE_READINGS_BATCH_SIZE = int(os.getenv('EQUIPMENT_PRUNE_READINGS_BATCH_SIZE', '10000'))
+EQUIPMENT_PRUNE_INTERVAL_SECONDS = int(os.getenv('EQUIPMENT_PRUNE_INTERVAL_SECONDS', '600'))
+
+# Rows of every upload are also loaded into the EquipmentReading table (needs
+# EQUIPMENT_STORE_ROWS) after the upload commits, in batches of
+# EQUIPMENT_READINGS_BATCH_SIZE rows via bulk_create, or via COPY on
+# PostgreSQL; each batch is its own transaction.
+EQUIPMENT_STORE_READINGS = os.getenv('EQUIPMENT_STORE_READINGS', 'True') == 'True'
+EQUIPMENT_READINGS_BATCH_SIZE = int(os.getenv('EQUIPMENT_READINGS_BATCH_SIZE', '5000'))
+
+# Row queries (GET /api/uploads/<id>/query/): rows returned when no limit is
+# given, and the most rows one query may return.
+EQUIPMENT_QUERY_DEFAULT_LIMIT = int(os.getenv('EQUIPMENT_QUERY_DEFAULT_LIMIT', '1000'))
+EQUIPMENT_QUERY_MAX_ROWS = int(os.getenv('EQUIPMENT_QUERY_MAX_ROWS', '100000'))
+
+# Anomaly detection at ingest (needs EQUIPMENT_STORE_ROWS): outlier method
+# ('mad', 'zscore' or 'iqr'; 'off' disables), score threshold (empty uses the
+# method default) and the most flags stored per upload. Uploads processed
+# without stored rows or with the stage off report no anomaly count.
+EQUIPMENT_ANOMALY_METHOD = os.getenv('EQUIPMENT_ANOMALY_METHOD', 'mad')
+EQUIPMENT_ANOMALY_THRESHOLD = float(os.getenv('EQUIPMENT_ANOMALY_THRESHOLD') or 0) or None
+EQUIPMENT_ANOMALY_MAX_ROWS = int(os.getenv('EQUIPMENT_ANOMALY_MAX_ROWS', '1000'))
+
+# Cache used to memoize upload comparisons (GET /api/compare/). The default is
+# per-process memory; point CACHE_BACKEND/CACHE_LOCATION at a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache) to share it across workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+EQUIPMENT_COMPARE_CACHE_SECONDS = int(os.getenv('EQUIPMENT_COMPARE_CACHE_SECONDS', '600'))
+
+# Downsampled series (GET /api/uploads/<id>/series/) are memoized in the same
+# cache per upload, column, method and point count for this many seconds.
+EQUIPMENT_SERIES_CACHE_SECONDS = int(os.getenv('EQUIPMENT_SERIES_CACHE_SECONDS', '600'))
+
+# Rendered PDF reports (GET /api/report/) are cached on disk under
+# EQUIPMENT_REPORT_CACHE_DIR, evicting the least recently served beyond
+# EQUIPMENT_REPORT_CACHE_MAX_BYTES (0 renders every request instead).
+EQUIPMENT_REPORT_CACHE_DIR = os.getenv('EQUIPMENT_REPORT_CACHE_DIR', os.path.join(MEDIA_ROOT, 'report_cache'))
+EQUIPMENT_REPORT_CACHE_MAX_BYTES = int(os.getenv('EQUIPMENT_REPORT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
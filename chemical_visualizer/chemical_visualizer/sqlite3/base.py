@@ -0,0 +1,15 @@
+"""
+SQLite backend that starts transactions with BEGIN IMMEDIATE.
+
+Backport of the ``transaction_mode = 'IMMEDIATE'`` option of Django 5.1 for
+older Django versions; chemical_visualizer/database.py selects it only there.
+A deferred transaction that later needs the write lock fails at once with
+"database is locked" when another connection is writing, without waiting for
+busy_timeout. Taking the lock at BEGIN makes concurrent writers queue instead.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
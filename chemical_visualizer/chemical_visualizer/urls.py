@@ -14,8 +14,18 @@ def api_root(request):
             'admin': '/admin/',
             'api': '/api/',
             'upload': '/api/upload/',
+            'upload_batch': '/api/upload/batch/',
+            'upload_sessions': '/api/upload/sessions/',
             'history': '/api/history/',
+            'types': '/api/types/',
+            'rollups': '/api/rollups/',
+            'compare': '/api/compare/?a=<id>&b=<id>',
+            'upload_query': '/api/uploads/<id>/query/',
+            'upload_anomalies': '/api/uploads/<id>/anomalies/',
+            'upload_histograms': '/api/uploads/<id>/histograms/',
+            'upload_series': '/api/uploads/<id>/series/?column=<name>',
             'report': '/api/report/',
+            'jobs': '/api/jobs/<id>/',
         },
         'auth': 'HTTP Basic Authentication',
         'credentials': 'username: admin, password: admin123'
@@ -42,6 +42,13 @@ except ImportError:
     DESKTOP_API_PASSWORD = 'admin123'
 
 API_BASE_URL = DESKTOP_API_URL
+API_UPLOAD_SESSIONS_URL = f'{DESKTOP_API_URL}/api/upload/sessions/'
+API_UPLOADS_URL = f'{DESKTOP_API_URL}/api/uploads/'
+
+# Files at least this large are sent in resumable chunks
+RESUMABLE_UPLOAD_MIN_BYTES = 8 * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+UPLOAD_CHUNK_RETRIES = 5
 
 
 # =============================================================================
@@ -64,22 +71,28 @@ class UploadWorker(QThread):
         Execute the file upload in a background thread.
         """
         try:
-            # Open and read the CSV file
-            with open(self.file_path, 'rb') as f:
-                files = {'csv_file': f}
-                
-                # Make POST request to API with Basic Auth
-                response = requests.post(
-                    API_UPLOAD_URL,
-                    files=files,
-                    auth=(DESKTOP_API_USERNAME, DESKTOP_API_PASSWORD),
-                    timeout=30
-                )
+            if os.path.getsize(self.file_path) >= RESUMABLE_UPLOAD_MIN_BYTES:
+                response = self.upload_resumable()
+            else:
+                # Open and read the CSV file
+                with open(self.file_path, 'rb') as f:
+                    files = {'csv_file': f}
+                    
+                    # Make POST request to API with Basic Auth
+                    response = requests.post(
+                        API_UPLOAD_URL,
+                        files=files,
+                        auth=(DESKTOP_API_USERNAME, DESKTOP_API_PASSWORD),
+                        timeout=30
+                    )
             
-            # Check response status
-            if response.status_code == 201:
-                # Success - emit data
+            # Check response status (200 when the file was uploaded before)
+            if response.status_code in (200, 201):
+                # Success - emit data, with the histograms and readings for the charts
                 data = response.json()
+                upload_id = data.get('data', {}).get('id')
+                data['histograms'] = self.fetch_histograms(upload_id)
+                data['series'] = self.fetch_series(upload_id)
                 self.upload_success.emit(data)
             else:
                 # API returned error
@@ -106,6 +119,106 @@ class UploadWorker(QThread):
             self.upload_error.emit("Request timeout. Please try again.")
         except Exception as e:
             self.upload_error.emit(f"Error: {str(e)}")
+    
+    def fetch_histograms(self, upload_id):
+        """
+        Fetch the per-column histograms of an upload.
+        
+        Returns:
+            dict: Histograms keyed by column, or {} when unavailable
+        """
+        if upload_id is None:
+            return {}
+        try:
+            response = requests.get(
+                f'{API_UPLOADS_URL}{upload_id}/histograms/',
+                params={'type': 'none', 'bins': 32},
+                auth=(DESKTOP_API_USERNAME, DESKTOP_API_PASSWORD),
+                timeout=30
+            )
+        except requests.exceptions.RequestException:
+            return {}
+        if response.status_code != 200:
+            return {}
+        return response.json().get('columns', {})
+    
+    def fetch_series(self, upload_id, points=800):
+        """
+        Fetch the per-row readings of each column, downsampled by the server.
+        
+        Returns:
+            dict: Series (row indices x, values y) keyed by column; columns
+            that are unavailable are left out
+        """
+        series = {}
+        if upload_id is None:
+            return series
+        for column in ('flowrate', 'pressure', 'temperature'):
+            try:
+                response = requests.get(
+                    f'{API_UPLOADS_URL}{upload_id}/series/',
+                    params={'column': column, 'points': points},
+                    auth=(DESKTOP_API_USERNAME, DESKTOP_API_PASSWORD),
+                    timeout=30
+                )
+            except requests.exceptions.RequestException:
+                return series
+            if response.status_code == 200:
+                series[column] = response.json()
+        return series
+    
+    def upload_resumable(self):
+        """
+        Send the file through a resumable upload session.
+        
+        Chunks that fail on a dropped connection or timeout are retried from
+        the offset the server reports, so only the missing bytes are re-sent.
+        
+        Returns:
+            requests.Response: Response of the session completion, or of the
+            first request the API rejected
+        """
+        auth = (DESKTOP_API_USERNAME, DESKTOP_API_PASSWORD)
+        size = os.path.getsize(self.file_path)
+        response = requests.post(
+            API_UPLOAD_SESSIONS_URL,
+            data={'filename': os.path.basename(self.file_path), 'size': size},
+            auth=auth,
+            timeout=30
+        )
+        if response.status_code != 201:
+            return response
+        session_url = f"{API_UPLOAD_SESSIONS_URL}{response.json()['id']}/"
+        
+        offset = 0
+        index = 0
+        failures = 0
+        with open(self.file_path, 'rb') as f:
+            while offset < size:
+                f.seek(offset)
+                chunk = f.read(UPLOAD_CHUNK_BYTES)
+                try:
+                    response = requests.put(
+                        f'{session_url}chunks/{index}/',
+                        params={'offset': offset},
+                        data=chunk,
+                        headers={'Content-Type': 'application/octet-stream'},
+                        auth=auth,
+                        timeout=30
+                    )
+                    if response.status_code not in (200, 409):
+                        return response
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    failures += 1
+                    if failures > UPLOAD_CHUNK_RETRIES:
+                        raise
+                    # Ask how much of the file arrived before resuming
+                    response = requests.get(session_url, auth=auth, timeout=30)
+                offset = response.json()['offset']
+                index += 1
+        
+        # The whole file is parsed during completion, which can take a while
+        return requests.post(f'{session_url}complete/', auth=auth, timeout=600)
 
 
 # =============================================================================
@@ -281,7 +394,7 @@ class EquipmentVisualizerApp(QMainWindow):
             self,
             "Select CSV File",
             "",
-            "CSV Files (*.csv);;All Files (*)"
+            "Equipment Files (*.csv *.csv.gz *.csv.bz2 *.csv.zst *.xlsx);;All Files (*)"
         )
         
         if file_path:
@@ -415,11 +528,16 @@ Equipment Type Distribution
             avg_pressure = response_data.get('avg_pressure', 0)
             avg_temperature = response_data.get('avg_temperature', 0)
             
-            # Create figure with two subplots
-            fig = Figure(figsize=(12, 4), dpi=100)
+            histograms = data.get('histograms') or {}
+            series = data.get('series') or {}
+            
+            # Create figure with two subplots, plus rows of histograms and
+            # readings when available
+            rows = 1 + bool(histograms) + bool(series)
+            fig = Figure(figsize=(12, 4 * rows), dpi=100)
             
             # Chart 1: Equipment Type Distribution (Pie Chart)
-            ax1 = fig.add_subplot(121)
+            ax1 = fig.add_subplot(rows, 2, 1)
             if type_distribution:
                 types = list(type_distribution.keys())
                 counts = list(type_distribution.values())
@@ -431,7 +549,7 @@ Equipment Type Distribution
                 ax1.set_title('Equipment Type Distribution', fontsize=12, fontweight='bold')
             
             # Chart 2: Average Measurements (Bar Chart)
-            ax2 = fig.add_subplot(122)
+            ax2 = fig.add_subplot(rows, 2, 2)
             measurements = ['Flowrate', 'Pressure', 'Temperature']
             values = [avg_flowrate, avg_pressure, avg_temperature]
             colors_bar = ['#667eea', '#764ba2', '#f093fb']
@@ -446,6 +564,28 @@ Equipment Type Distribution
                         f'{value:.2f}',
                         ha='center', va='bottom', fontsize=10)
             
+            # Charts 3-5: Distribution of each measurement (Histograms)
+            for index, (column, color) in enumerate(zip(['flowrate', 'pressure', 'temperature'], colors_bar)):
+                fixed = histograms.get(column, {}).get('fixed', {})
+                if not fixed.get('counts'):
+                    continue
+                ax = fig.add_subplot(rows, 3, 4 + index)
+                edges = fixed['edges']
+                widths = [right - left for left, right in zip(edges, edges[1:])]
+                ax.bar(edges[:-1], fixed['counts'], width=widths, align='edge', color=color)
+                ax.set_title(f'{column.capitalize()} Distribution', fontsize=12, fontweight='bold')
+                ax.set_ylabel('Count')
+            
+            # Charts 6-8: Readings by row (downsampled series)
+            for index, (column, color) in enumerate(zip(['flowrate', 'pressure', 'temperature'], colors_bar)):
+                points = series.get(column, {})
+                if not points.get('x'):
+                    continue
+                ax = fig.add_subplot(rows, 3, 3 * (rows - 1) + 1 + index)
+                ax.plot(points['x'], points['y'], color=color, linewidth=0.8)
+                ax.set_title(f'{column.capitalize()} Readings', fontsize=12, fontweight='bold')
+                ax.set_xlabel('Row')
+            
             fig.tight_layout()
             
             # Clear previous chart if exists
@@ -2,13 +2,26 @@
 Admin configuration for equipment_api.
 """
 from django.contrib import admin
-from equipment_api.models import EquipmentUpload
+from equipment_api.models import EquipmentUpload, UploadTypeSummary
+
+
+class UploadTypeSummaryInline(admin.TabularInline):
+    """Per-type counts and averages shown on an upload."""
+    model = UploadTypeSummary
+    fields = ('equipment_type', 'count', 'avg_flowrate', 'avg_pressure', 'avg_temperature')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(EquipmentUpload)
 class EquipmentUploadAdmin(admin.ModelAdmin):
     """Admin interface for EquipmentUpload model."""
-    list_display = ('filename', 'uploaded_at', 'equipment_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature')
-    list_filter = ('uploaded_at',)
+    list_display = ('filename', 'uploaded_at', 'equipment_count', 'anomaly_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature')
+    list_filter = ('uploaded_at', 'readings_state')
     search_fields = ('filename',)
-    readonly_fields = ('filename', 'uploaded_at', 'equipment_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature', 'type_distribution')
+    readonly_fields = ('filename', 'uploaded_at', 'equipment_count', 'anomaly_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature', 'readings_state')
+    inlines = (UploadTypeSummaryInline,)
@@ -0,0 +1,257 @@
+"""
+Outlier detection over an upload's stored rows.
+
+After ingest, every numeric column of the column store is scored twice: once
+against the whole column and once against the rows of the same equipment
+type. Scores come from one of three methods:
+
+- ``zscore``: |x - mean| / std
+- ``mad``: |x - median| / (1.4826 * MAD), the robust z-score
+- ``iqr``: distance beyond the quartiles in units of the IQR
+
+and values scoring above the method's threshold are flagged. Each method
+reduces a group to bounds (low, high) and a scale, so scoring is one
+vectorized pass over the memory-mapped column, with per-type bounds gathered
+by type code. The bounds of types with more than STATS_SAMPLE_ROWS rows are
+estimated from a seeded random sample of that many rows, which keeps the
+median and quantile work constant and detection linear in the number of rows;
+smaller types, and whole columns of small uploads, use every row.
+"""
+import numpy as np
+from django.conf import settings
+
+from equipment_api.models import EquipmentAnomaly, EquipmentUpload
+
+
+# Method -> default threshold
+METHODS = {
+    'zscore': 3.0,
+    'mad': 3.5,
+    'iqr': 1.5,
+}
+DEFAULT_ANOMALY_METHOD = 'mad'
+DEFAULT_ANOMALY_MAX_ROWS = 1000
+
+# Column store column -> API column name
+COLUMNS = {
+    'Flowrate': 'flowrate',
+    'Pressure': 'pressure',
+    'Temperature': 'temperature',
+}
+
+# Groups smaller than this are not scored; their spread is meaningless
+MIN_GROUP_ROWS = 8
+
+# Rows per group the bounds are computed from; larger groups are sampled.
+# At this size the sampled median is within about 0.02 sigma of the exact one.
+STATS_SAMPLE_ROWS = 10000
+SAMPLE_SEED = 0
+
+# Scale factors turning MAD and mean absolute deviation into a normal sigma
+MAD_TO_SIGMA = 1.4826
+MEAN_AD_TO_SIGMA = 1.2533
+
+
+def get_anomaly_method():
+    """Configured detection method, or None when the stage is disabled."""
+    method = getattr(settings, 'EQUIPMENT_ANOMALY_METHOD', DEFAULT_ANOMALY_METHOD)
+    return method if method in METHODS else None
+
+
+def get_anomaly_threshold(method):
+    """Score above which a value is flagged."""
+    return getattr(settings, 'EQUIPMENT_ANOMALY_THRESHOLD', None) or METHODS[method]
+
+
+def get_anomaly_max_rows():
+    """Most flags stored per upload; the highest scores are kept."""
+    return getattr(settings, 'EQUIPMENT_ANOMALY_MAX_ROWS', DEFAULT_ANOMALY_MAX_ROWS)
+
+
+def outlier_bounds(values, method):
+    """
+    Reduce one group to the bounds and scale its values are scored against.
+
+    A value scores (distance below ``low`` or above ``high``) / ``scale``.
+
+    Returns:
+        tuple: (low, high, scale); scale is infinite, so every score is zero,
+        when the group is too small or has no spread
+    """
+    values = np.asarray(values, dtype='float64')
+    if values.size < MIN_GROUP_ROWS:
+        return 0.0, 0.0, np.inf
+
+    if method == 'zscore':
+        low = high = values.mean()
+        scale = values.std()
+    elif method == 'mad':
+        low = high = np.median(values)
+        deviation = np.abs(values - low)
+        scale = np.median(deviation) * MAD_TO_SIGMA
+        if not scale:
+            # More than half the values are identical; fall back to the
+            # mean absolute deviation so a lone stuck value still stands out
+            scale = deviation.mean() * MEAN_AD_TO_SIGMA
+    elif method == 'iqr':
+        low, high = np.percentile(values, [25, 75])
+        scale = high - low
+    else:
+        raise ValueError(f'Unknown anomaly method: {method}')
+
+    return float(low), float(high), float(scale) if scale else np.inf
+
+
+def outlier_scores(values, low, high, scale):
+    """Score values against bounds (scalars, or arrays matching ``values``)."""
+    return np.maximum(low - values, values - high) / scale
+
+
+def flag_outliers(values, bounds, threshold, codes=None):
+    """
+    Find the values scoring above ``threshold``.
+
+    ``bounds`` is one (low, high, scale) triple, or an array of them indexed
+    by type code when ``codes`` is given. Values are compared against the
+    cutoffs ``low - threshold * scale`` and ``high + threshold * scale``, so
+    only the rows outside them are scored.
+
+    Returns:
+        tuple: (flagged row indices, their scores)
+    """
+    low, high, scale = np.asarray(bounds, dtype='float64').T
+    lower = low - threshold * scale
+    upper = high + threshold * scale
+    if codes is None:
+        rows = np.flatnonzero((values < lower) | (values > upper))
+    else:
+        # Only rows outside the tightest cutoffs of any type can be flagged,
+        # so the per-type cutoffs are gathered for those candidates alone
+        rows = np.flatnonzero((values < lower.max()) | (values > upper.min()))
+        row_codes = codes[rows]
+        outside = (values[rows] < np.take(lower, row_codes)) | (values[rows] > np.take(upper, row_codes))
+        rows, row_codes = rows[outside], row_codes[outside]
+        low, high, scale = np.take(low, row_codes), np.take(high, row_codes), np.take(scale, row_codes)
+    return rows, outlier_scores(values[rows], low, high, scale)
+
+
+def sample_rows(codes, groups, sample_rows=STATS_SAMPLE_ROWS):
+    """
+    Pick the rows the bounds are computed from.
+
+    Returns:
+        tuple: (rows for the whole-column bounds, rows for the per-type
+        bounds sorted by type, start of each type's run in the latter plus
+        the end)
+    """
+    counts = np.bincount(codes, minlength=groups)
+    if codes.size <= sample_rows:
+        column_rows = type_rows = np.arange(codes.size)
+    else:
+        draw = np.random.default_rng(SAMPLE_SEED).random(codes.size)
+        column_rows = np.flatnonzero(draw < sample_rows / codes.size)
+        if counts.max() <= sample_rows:
+            type_rows = np.arange(codes.size)
+        else:
+            type_rows = np.flatnonzero(draw < np.take(sample_rows / counts.clip(min=1), codes))
+    type_codes = codes[type_rows]
+    if groups <= np.iinfo(np.uint16).max:
+        # NumPy radix-sorts 16-bit keys
+        type_codes = type_codes.astype(np.uint16)
+    order = np.argsort(type_codes, kind='stable')
+    bounds = np.searchsorted(type_codes[order], np.arange(groups + 1))
+    return column_rows, type_rows[order], bounds
+
+
+def detect_anomalies(store, method=None, threshold=None, max_rows=None):
+    """
+    Flag outlying values of a column store.
+
+    Returns:
+        tuple: (total number of flags, list of the highest-scoring flags as
+        dicts with row, column, scope, value and score)
+    """
+    method = method or get_anomaly_method()
+    threshold = threshold or get_anomaly_threshold(method)
+    max_rows = get_anomaly_max_rows() if max_rows is None else max_rows
+
+    codes = store.type_codes()
+    groups = len(store.type_categories)
+    column_rows, type_rows, bounds = sample_rows(codes, groups)
+
+    found = []
+    total = 0
+    for column, name in COLUMNS.items():
+        values = np.asarray(store.numeric(column))
+        sampled = values[type_rows]
+        per_type = np.array([
+            outlier_bounds(sampled[start:end], method)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]).reshape(groups, 3)
+        for scope, (rows, scores) in (
+            (EquipmentAnomaly.SCOPE_COLUMN, flag_outliers(values, outlier_bounds(values[column_rows], method), threshold)),
+            (EquipmentAnomaly.SCOPE_TYPE, flag_outliers(values, per_type, threshold, codes)),
+        ):
+            total += rows.size
+            if rows.size > max_rows:
+                keep = np.argsort(scores)[-max_rows:]
+                rows, scores = rows[keep], scores[keep]
+            found.extend(
+                {'row': row, 'column': name, 'scope': scope, 'value': value, 'score': score}
+                for row, value, score in zip(rows.tolist(), values[rows].tolist(), scores.tolist())
+            )
+
+    found.sort(key=lambda flag: flag['score'], reverse=True)
+    return total, found[:max_rows]
+
+
+def find_anomalies(store, method=None):
+    """
+    Run the anomaly stage over a column store.
+
+    Runs before the upload is saved, so detection happens outside the
+    database transaction.
+
+    Scoring needs bounds over the whole column before any value is scored,
+    so it reads the stored columns rather than running inside the ingest
+    pass; without a store there is nothing to score.
+
+    Returns:
+        tuple: (total number of flags, unsaved EquipmentAnomaly rows without
+        their upload), or None when the stage is disabled or ``store`` is None
+    """
+    method = method or get_anomaly_method()
+    if method is None or store is None:
+        return None
+    total, found = detect_anomalies(store, method)
+    if not found:
+        return total, []
+    rows = np.array([flag['row'] for flag in found])
+    names = store.names(rows)
+    types = store.types(rows)
+    return total, [
+        EquipmentAnomaly(
+            name=name[:EquipmentAnomaly.NAME_MAX_LENGTH],
+            equipment_type=str(equipment_type)[:EquipmentAnomaly.TYPE_MAX_LENGTH],
+            method=method,
+            **flag,
+        )
+        for flag, name, equipment_type in zip(found, names, types)
+    ]
+
+
+def save_anomalies(upload, found):
+    """
+    Store the ``find_anomalies`` result of a saved upload.
+
+    Call inside the transaction that saves the upload. An upload the stage
+    did not run for keeps a null ``anomaly_count``.
+    """
+    if found is None:
+        return
+    total, anomalies = found
+    for anomaly in anomalies:
+        anomaly.upload = upload
+    EquipmentAnomaly.objects.bulk_create(anomalies)
+    EquipmentUpload.objects.filter(pk=upload.pk).update(anomaly_count=total)
+    upload.anomaly_count = total
@@ -7,3 +7,7 @@ from django.apps import AppConfig
 class EquipmentApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'equipment_api'
+
+    def ready(self):
+        # Register signal handlers; background work starts on the first request
+        from equipment_api import signals  # noqa: F401
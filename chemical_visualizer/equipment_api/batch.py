@@ -0,0 +1,228 @@
+"""
+Batch uploads: many CSV files, or a ZIP archive of them, in one request.
+
+Each file is parsed by its own worker in the shared ingest process pool.
+All successfully parsed files are saved together with a single bulk_create
+inside one transaction.
+"""
+import hashlib
+import os
+import tempfile
+import zipfile
+from concurrent.futures import as_completed
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from equipment_api.anomalies import find_anomalies, save_anomalies
+from equipment_api.columnar import ColumnarWriter
+from equipment_api.compression import compression_for, is_supported_upload
+from equipment_api.ingest import IngestError
+from equipment_api.jobs import get_spool_dir, spool_upload
+from equipment_api.models import EquipmentUpload, UploadTypeSummary
+from equipment_api.parallel import get_executor, ingest_file
+from equipment_api.pipeline import store_rows_enabled
+from equipment_api.readings import load_committed_readings
+from equipment_api.rollups import add_to_rollups
+from equipment_api.stats import EquipmentStats
+from equipment_api.upload_handlers import get_content_hash
+
+
+DEFAULT_BATCH_MAX_FILES = 100
+DEFAULT_BATCH_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+class BatchItem:
+    """One CSV file of a batch, available on disk."""
+
+    def __init__(self, filename, path, content_hash, owned):
+        self.filename = filename
+        self.path = path
+        self.content_hash = content_hash
+        self.compression = compression_for(filename)
+        # Whether the file was spooled for this batch and must be removed
+        self.owned = owned
+
+    def cleanup(self):
+        if self.owned and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def get_batch_limits():
+    """Maximum number of files and total uncompressed bytes per batch."""
+    return (
+        getattr(settings, 'EQUIPMENT_BATCH_MAX_FILES', DEFAULT_BATCH_MAX_FILES),
+        getattr(settings, 'EQUIPMENT_BATCH_MAX_BYTES', DEFAULT_BATCH_MAX_BYTES),
+    )
+
+
+def collect_uploaded_files(files):
+    """
+    Make uploaded files available on disk as BatchItems.
+
+    Each item takes the digest of its own file object, so files sharing a
+    name keep distinct hashes.
+    """
+    items = []
+    for uploaded_file in files:
+        content_hash = get_content_hash(uploaded_file)
+        if hasattr(uploaded_file, 'temporary_file_path'):
+            items.append(BatchItem(uploaded_file.name, uploaded_file.temporary_file_path(), content_hash, False))
+        else:
+            items.append(BatchItem(uploaded_file.name, spool_upload(uploaded_file), content_hash, True))
+    return items
+
+
+def collect_archive(archive):
+    """
+    Extract the CSV members of a ZIP archive to the spool directory.
+
+    Members are streamed out one at a time and hashed while they are copied.
+    Compressed CSV members (``.csv.gz`` etc.) are kept compressed on disk.
+
+    Raises:
+        IngestError: If the archive is invalid or exceeds the batch limits
+    """
+    max_files, max_bytes = get_batch_limits()
+    try:
+        zf = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+        raise IngestError('Invalid ZIP archive')
+
+    with zf:
+        members = [
+            info for info in zf.infolist()
+            if not info.is_dir()
+            and is_supported_upload(info.filename)
+            and not os.path.basename(info.filename).startswith('.')
+            and not info.filename.startswith('__MACOSX/')
+        ]
+        if not members:
+            raise IngestError('ZIP archive contains no CSV files')
+        if len(members) > max_files:
+            raise IngestError(f'ZIP archive contains more than {max_files} CSV files')
+        if sum(info.file_size for info in members) > max_bytes:
+            raise IngestError('ZIP archive is too large when uncompressed')
+
+        items = []
+        try:
+            for info in members:
+                hasher = hashlib.sha256()
+                _, extension = os.path.splitext(info.filename)
+                fd, path = tempfile.mkstemp(suffix=extension, dir=get_spool_dir())
+                with os.fdopen(fd, 'wb') as out, zf.open(info) as member:
+                    for chunk in iter(lambda: member.read(1024 * 1024), b''):
+                        hasher.update(chunk)
+                        out.write(chunk)
+                items.append(BatchItem(os.path.basename(info.filename), path, hasher.hexdigest(), True))
+        except (zipfile.BadZipFile, RuntimeError, OSError) as e:
+            for item in items:
+                item.cleanup()
+            raise IngestError(f'Could not extract ZIP archive: {str(e)}')
+    return items
+
+
+def save_batch(uploads, stats_by_index, anomalies_by_index):
+    """Save parsed uploads, their summaries, flags and rollups in one transaction."""
+    with transaction.atomic():
+        EquipmentUpload.objects.bulk_create(uploads.values())
+        UploadTypeSummary.objects.bulk_create(
+            summary
+            for index, upload in uploads.items()
+            for summary in upload.build_type_summaries(stats_by_index[index])
+        )
+        for index, upload in uploads.items():
+            save_anomalies(upload, anomalies_by_index[index])
+        add_to_rollups((upload, stats_by_index[index]) for index, upload in uploads.items())
+
+
+def process_batch(items):
+    """
+    Parse every item concurrently and save the results in one transaction.
+
+    Returns:
+        list: One (item, status, upload or None, error message or None)
+              tuple per item, in input order
+    """
+    results = {}
+    pending = {}
+    # Later copies of a file that appears twice in the batch
+    repeats = {}
+    first_seen = {}
+    executor = get_executor()
+    for index, item in enumerate(items):
+        existing = EquipmentUpload.find_by_content_hash(item.content_hash)
+        if existing:
+            results[index] = (item, 'duplicate', existing, None)
+            continue
+        if item.content_hash in first_seen:
+            repeats[index] = first_seen[item.content_hash]
+            continue
+        first_seen[item.content_hash] = index
+        writer = ColumnarWriter.create() if store_rows_enabled() else None
+        future = executor.submit(ingest_file, item.path, writer.directory if writer else None, item.compression)
+        pending[future] = (index, writer)
+
+    uploads = {}
+    stats_by_index = {}
+    writers = {}
+    for future in as_completed(pending):
+        index, writer = pending[future]
+        item = items[index]
+        try:
+            stats = EquipmentStats.from_dict(future.result())
+        except Exception as e:
+            if isinstance(e, IngestError):
+                error = e.message
+            else:
+                error = f'Error processing file: {str(e)}'
+            results[index] = (item, 'error', None, error)
+            if writer:
+                writer.discard()
+            continue
+        stats_by_index[index] = stats
+        uploads[index] = EquipmentUpload.from_stats(
+            item.filename,
+            stats,
+            data_path=writer.relative_path if writer else '',
+            content_hash=item.content_hash,
+        )
+        if writer:
+            writers[index] = writer
+
+    if uploads:
+        try:
+            # Detect before the transaction so the write lock is not held for it
+            anomalies_by_index = {index: find_anomalies(upload.get_store()) for index, upload in uploads.items()}
+            while uploads:
+                try:
+                    save_batch(uploads, stats_by_index, anomalies_by_index)
+                    break
+                except IntegrityError:
+                    # Concurrent uploads saved some of these bytes first
+                    raced = {
+                        index: EquipmentUpload.find_by_content_hash(upload.content_hash)
+                        for index, upload in uploads.items()
+                    }
+                    raced = {index: existing for index, existing in raced.items() if existing}
+                    if not raced:
+                        raise
+                    for index, existing in raced.items():
+                        results[index] = (items[index], 'duplicate', existing, None)
+                        del uploads[index]
+                        if index in writers:
+                            writers.pop(index).discard()
+        except Exception:
+            for writer in writers.values():
+                writer.discard()
+            raise
+        # Outside the batch's transaction, so the write lock is held per block
+        load_committed_readings(uploads.values())
+        for index, upload in uploads.items():
+            results[index] = (items[index], 'created', upload, None)
+
+    for index, first in repeats.items():
+        _, status, upload, error = results[first]
+        results[index] = (items[index], 'duplicate' if upload else status, upload, error)
+
+    return [results[index] for index in range(len(items))]
@@ -0,0 +1,327 @@
+"""
+Columnar on-disk storage of the equipment rows behind an upload.
+
+Each upload gets a directory of raw little-endian column files plus a
+``manifest.json`` describing their dtypes and lengths:
+
+- ``flowrate.f8``, ``pressure.f8``, ``temperature.f8``: float64 values
+- ``type_codes.i4``: int32 codes into the manifest's ``type_categories``
+- ``name_offsets.i8`` / ``name_data.bin``: Arrow-style UTF-8 string column,
+  where row ``i`` is ``name_data[offsets[i]:offsets[i + 1]]``
+
+Columns are read back with ``numpy.memmap``, so queries load only the columns
+they touch and never re-parse CSV text. Parts written by parallel ingest
+workers are concatenated into the final files when the store is finalized.
+"""
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+from django.conf import settings
+
+
+MANIFEST_NAME = 'manifest.json'
+STORE_FORMAT_VERSION = 1
+
+NUMERIC_FILES = {
+    'Flowrate': ('flowrate.f8', '<f8'),
+    'Pressure': ('pressure.f8', '<f8'),
+    'Temperature': ('temperature.f8', '<f8'),
+}
+TYPE_CODES_FILE = ('type_codes.i4', '<i4')
+NAME_OFFSETS_FILE = ('name_offsets.i8', '<i8')
+NAME_DATA_FILE = 'name_data.bin'
+
+PART_FILES = [name for name, _ in NUMERIC_FILES.values()] + [
+    TYPE_CODES_FILE[0],
+    NAME_OFFSETS_FILE[0],
+    NAME_DATA_FILE,
+]
+
+
+def get_data_root():
+    """Root directory of all upload column stores."""
+    return getattr(settings, 'EQUIPMENT_DATA_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'equipment_data')
+
+
+def remove_store(relative_path):
+    """Delete a column store given its path relative to MEDIA_ROOT."""
+    if relative_path:
+        shutil.rmtree(os.path.join(settings.MEDIA_ROOT, relative_path), ignore_errors=True)
+
+
+def _part_path(directory, index, filename):
+    return os.path.join(directory, f'part-{index:04d}.{filename}')
+
+
+class ColumnarPartWriter:
+    """
+    Appends cleaned DataFrame chunks to one part of a column store.
+
+    Safe to use from a worker process: it only needs the store directory and
+    its own part index, and ``close`` returns a picklable part description.
+    """
+
+    def __init__(self, directory, index):
+        self.directory = directory
+        self.index = index
+        self.rows = 0
+        self.name_bytes = 0
+        self.categories = {}
+        self._files = {
+            filename: open(_part_path(directory, index, filename), 'wb')
+            for filename in PART_FILES
+        }
+
+    def append(self, df):
+        """Append one chunk of rows in every column file."""
+        for column, (filename, dtype) in NUMERIC_FILES.items():
+            df[column].to_numpy(dtype=dtype).tofile(self._files[filename])
+
+        # Remap the chunk's categorical codes onto this part's categories
+        types = df['Type'].astype('category')
+        remap = np.array(
+            [self.categories.setdefault(category, len(self.categories)) for category in types.cat.categories],
+            dtype=TYPE_CODES_FILE[1],
+        )
+        remap[types.cat.codes.to_numpy()].tofile(self._files[TYPE_CODES_FILE[0]])
+
+        names = df['Equipment Name'].astype(str).tolist()
+        data, ends = _encode_strings(names)
+        self._files[NAME_DATA_FILE].write(data)
+        (ends + self.name_bytes).astype(NAME_OFFSETS_FILE[1]).tofile(self._files[NAME_OFFSETS_FILE[0]])
+
+        self.name_bytes += len(data)
+        self.rows += len(df)
+
+    def close(self):
+        """Close the part files and describe the part for ``ColumnarWriter.finalize``."""
+        for f in self._files.values():
+            f.close()
+        return {
+            'index': self.index,
+            'rows': self.rows,
+            'name_bytes': self.name_bytes,
+            'categories': list(self.categories),
+        }
+
+
+def _encode_strings(values):
+    """
+    Encode strings into one UTF-8 blob and the end offset of every value.
+
+    Joins on NUL in a single call and locates the separators with NumPy; if a
+    value itself contains NUL, falls back to encoding value by value.
+    """
+    if not values:
+        return b'', np.empty(0, dtype='int64')
+    blob = '\0'.join(values).encode('utf-8')
+    separators = np.flatnonzero(np.frombuffer(blob, dtype=np.uint8) == 0)
+    if len(separators) == len(values) - 1:
+        # Removing the separators shifts every end offset left by its position
+        ends = np.append(separators, len(blob)) - np.arange(len(values))
+        return blob.replace(b'\0', b''), ends
+
+    encoded = [value.encode('utf-8') for value in values]
+    return b''.join(encoded), np.cumsum([len(value) for value in encoded])
+
+
+def _iter_blocks(path, dtype, block_rows=1 << 20):
+    """Read a raw column file back in bounded blocks."""
+    with open(path, 'rb') as f:
+        while True:
+            block = np.fromfile(f, dtype=dtype, count=block_rows)
+            if not block.size:
+                return
+            yield block
+
+
+class ColumnarWriter:
+    """Creates an upload column store from one or more written parts."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @classmethod
+    def create(cls):
+        """Create a writer for a new, uniquely named store directory."""
+        directory = os.path.join(get_data_root(), uuid.uuid4().hex)
+        os.makedirs(directory)
+        return cls(directory)
+
+    @property
+    def relative_path(self):
+        """Store path relative to MEDIA_ROOT, as kept on EquipmentUpload."""
+        return os.path.relpath(self.directory, settings.MEDIA_ROOT)
+
+    def part(self, index=0):
+        return ColumnarPartWriter(self.directory, index)
+
+    def finalize(self, parts):
+        """
+        Concatenate written parts into the final column files and the manifest.
+
+        Args:
+            parts (list): Dicts returned by ``ColumnarPartWriter.close``
+        """
+        parts = sorted(parts, key=lambda part: part['index'])
+
+        # Merge per-part type categories into one list of store-wide codes
+        categories = []
+        category_codes = {}
+        for part in parts:
+            for category in part['categories']:
+                if category not in category_codes:
+                    category_codes[category] = len(categories)
+                    categories.append(category)
+
+        for filename, _ in NUMERIC_FILES.values():
+            self._concatenate(parts, filename)
+        self._concatenate(parts, NAME_DATA_FILE)
+
+        codes_name, codes_dtype = TYPE_CODES_FILE
+        offsets_name, offsets_dtype = NAME_OFFSETS_FILE
+        with open(os.path.join(self.directory, codes_name), 'wb') as codes_out, \
+                open(os.path.join(self.directory, offsets_name), 'wb') as offsets_out:
+            np.zeros(1, dtype=offsets_dtype).tofile(offsets_out)
+            name_base = 0
+            for part in parts:
+                remap = np.array(
+                    [category_codes[category] for category in part['categories']],
+                    dtype=codes_dtype,
+                )
+                codes_path = _part_path(self.directory, part['index'], codes_name)
+                for codes in _iter_blocks(codes_path, codes_dtype):
+                    remap[codes].tofile(codes_out)
+                os.remove(codes_path)
+
+                offsets_path = _part_path(self.directory, part['index'], offsets_name)
+                for offsets in _iter_blocks(offsets_path, offsets_dtype):
+                    (offsets + name_base).tofile(offsets_out)
+                os.remove(offsets_path)
+                name_base += part['name_bytes']
+
+        manifest = {
+            'version': STORE_FORMAT_VERSION,
+            'rows': sum(part['rows'] for part in parts),
+            'type_categories': categories,
+        }
+        with open(os.path.join(self.directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        return manifest
+
+    def _concatenate(self, parts, filename):
+        target = os.path.join(self.directory, filename)
+        first = _part_path(self.directory, parts[0]['index'], filename) if parts else None
+        if first:
+            # The first part becomes the final file; later parts are appended
+            os.replace(first, target)
+        else:
+            open(target, 'wb').close()
+        with open(target, 'ab') as out:
+            for part in parts[1:]:
+                path = _part_path(self.directory, part['index'], filename)
+                with open(path, 'rb') as f:
+                    shutil.copyfileobj(f, out, 1024 * 1024)
+                os.remove(path)
+
+    def remove_parts(self, parts):
+        """Delete written parts that will not be finalized."""
+        for part in parts:
+            for filename in PART_FILES:
+                path = _part_path(self.directory, part['index'], filename)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def discard(self):
+        """Remove the store directory and everything written so far."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ColumnarStore:
+    """Read-only, memory-mapped access to a finalized upload column store."""
+
+    COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+    @classmethod
+    def open(cls, relative_path):
+        """Open a store from its path relative to MEDIA_ROOT."""
+        return cls(os.path.join(settings.MEDIA_ROOT, relative_path))
+
+    @property
+    def rows(self):
+        return self.manifest['rows']
+
+    @property
+    def type_categories(self):
+        return self.manifest['type_categories']
+
+    def _map(self, filename, dtype, length):
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.directory, filename), dtype=dtype, mode='r', shape=(length,))
+
+    def numeric(self, column):
+        """Memory-mapped float64 values of a numeric column."""
+        filename, dtype = NUMERIC_FILES[column]
+        return self._map(filename, dtype, self.rows)
+
+    def type_codes(self):
+        """Memory-mapped int32 type codes; see ``type_categories``."""
+        filename, dtype = TYPE_CODES_FILE
+        return self._map(filename, dtype, self.rows)
+
+    def types(self, rows=None):
+        """Decoded equipment types, optionally for selected row indices only."""
+        codes = self.type_codes() if rows is None else self.type_codes()[rows]
+        categories = np.array(self.type_categories, dtype=object)
+        return categories[codes] if len(categories) else np.empty(0, dtype=object)
+
+    def names(self, rows=None):
+        """
+        Decoded equipment names, optionally for selected rows only.
+
+        ``rows`` is a slice or an array of row indices; only the offsets of
+        the selected rows are read, so decoding a block costs the same
+        however large the store is.
+        """
+        if rows is None:
+            rows = slice(None)
+        if isinstance(rows, slice):
+            indices = range(*rows.indices(self.rows))
+        else:
+            indices = np.atleast_1d(rows).tolist()
+
+        data_path = os.path.join(self.directory, NAME_DATA_FILE)
+        if not os.path.getsize(data_path):
+            return [''] * len(indices)
+        filename, dtype = NAME_OFFSETS_FILE
+        offsets = self._map(filename, dtype, self.rows + 1)
+        data = np.memmap(data_path, dtype=np.uint8, mode='r')
+
+        if isinstance(indices, range) and indices.step == 1:
+            # Contiguous rows: read their names in one piece and split it
+            start, stop = indices.start, indices.stop
+            bounds = (offsets[start:stop + 1] - offsets[start]).tolist()
+            blob = data[offsets[start]:offsets[stop]].tobytes() if stop > start else b''
+            return [blob[a:b].decode('utf-8') for a, b in zip(bounds, bounds[1:])]
+        return [
+            data[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+            for i in indices
+        ]
+
+    def column(self, column, rows=None):
+        """Values of any stored column, optionally for selected rows only."""
+        if column == 'Type':
+            return self.types(rows)
+        if column == 'Equipment Name':
+            return self.names(rows)
+        values = self.numeric(column)
+        return values if rows is None else values[rows]
@@ -0,0 +1,147 @@
+"""
+Comparison of two uploads from their stored aggregates.
+
+Deltas are computed from each upload's persisted EquipmentStats state
+(counts, moments, extremes and t-digest quantiles) and its UploadTypeSummary
+rows, so no row of either upload is read. An upload's aggregates never
+change once committed, so a comparison is memoized in the Django cache per
+ordered id pair; repeated requests for the same pair cost one cache lookup.
+Entries expire after EQUIPMENT_COMPARE_CACHE_SECONDS, which bounds how long a
+comparison outlives an upload removed by retention.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import serializers
+
+from equipment_api.models import EquipmentUpload, UploadTypeSummary
+from equipment_api.stats import NUMERIC_COLUMNS
+
+
+DEFAULT_COMPARE_CACHE_SECONDS = 600
+
+# Statistics compared per type, from the type summaries
+TYPE_STATISTICS = ['mean', 'min', 'max']
+
+
+def get_compare_cache_seconds():
+    """Seconds a memoized comparison is kept."""
+    return getattr(settings, 'EQUIPMENT_COMPARE_CACHE_SECONDS', DEFAULT_COMPARE_CACHE_SECONDS)
+
+
+def compare_cache_key(a_id, b_id):
+    return f'equipment_api:compare:{a_id}:{b_id}'
+
+
+def delta(a, b):
+    """Both values, b - a, and the change relative to a in percent."""
+    if a is None or b is None:
+        return {'a': a, 'b': b, 'delta': None, 'pct_change': None}
+    change = b - a
+    return {
+        'a': a,
+        'b': b,
+        'delta': change,
+        'pct_change': change / abs(a) * 100 if a else None,
+    }
+
+
+def upload_statistics(upload):
+    """
+    Per-column statistics of an upload, keyed by column name.
+
+    Uploads saved before the stats state was stored only have their count
+    and averages.
+    """
+    stats = upload.get_stats()
+    if stats is not None:
+        return stats.summary()
+    averages = [upload.avg_flowrate, upload.avg_pressure, upload.avg_temperature]
+    return {
+        column: {'count': upload.equipment_count, 'mean': mean}
+        for column, mean in zip(NUMERIC_COLUMNS, averages)
+    }
+
+
+def _compare_statistics(a, b):
+    return {
+        stat: delta(a.get(stat), b.get(stat))
+        for stat in dict.fromkeys([*a, *b])
+    }
+
+
+def _describe(upload):
+    return {
+        'id': upload.id,
+        'filename': upload.filename,
+        'uploaded_at': serializers.DateTimeField().to_representation(upload.uploaded_at),
+    }
+
+
+def compare_uploads(a, b):
+    """
+    Deltas from upload ``a`` to upload ``b``.
+
+    Returns:
+        dict: The two uploads, then ``{'a', 'b', 'delta', 'pct_change'}``
+        entries for the equipment and anomaly counts, every per-column
+        statistic, the count of every type and each type's column
+        mean/min/max. A type missing from one upload counts 0 there and has
+        no statistics.
+    """
+    a_stats, b_stats = upload_statistics(a), upload_statistics(b)
+    a_types = {summary.equipment_type: summary for summary in a.type_summaries.all()}
+    b_types = {summary.equipment_type: summary for summary in b.type_summaries.all()}
+    types = sorted(set(a_types) | set(b_types))
+
+    type_statistics = {}
+    for equipment_type in types:
+        a_summary = a_types[equipment_type].statistics() if equipment_type in a_types else {}
+        b_summary = b_types[equipment_type].statistics() if equipment_type in b_types else {}
+        type_statistics[equipment_type] = {
+            prefix: {
+                stat: delta(a_summary.get(prefix, {}).get(stat), b_summary.get(prefix, {}).get(stat))
+                for stat in TYPE_STATISTICS
+            }
+            for prefix in UploadTypeSummary.STATISTIC_COLUMNS.values()
+        }
+
+    return {
+        'a': _describe(a),
+        'b': _describe(b),
+        'equipment_count': delta(a.equipment_count, b.equipment_count),
+        'anomaly_count': delta(a.anomaly_count, b.anomaly_count),
+        'statistics': {
+            column: _compare_statistics(a_stats.get(column, {}), b_stats.get(column, {}))
+            for column in NUMERIC_COLUMNS
+        },
+        'type_distribution': {
+            equipment_type: delta(
+                a_types[equipment_type].count if equipment_type in a_types else 0,
+                b_types[equipment_type].count if equipment_type in b_types else 0,
+            )
+            for equipment_type in types
+        },
+        'type_statistics': type_statistics,
+    }
+
+
+def get_comparison(a_id, b_id):
+    """
+    Memoized comparison of two uploads by id.
+
+    Returns:
+        tuple: (comparison dict, None), or (None, missing id) when an upload
+        does not exist
+    """
+    key = compare_cache_key(a_id, b_id)
+    comparison = cache.get(key)
+    if comparison is not None:
+        return comparison, None
+
+    uploads = EquipmentUpload.objects.prefetch_related('type_summaries').in_bulk([a_id, b_id])
+    for upload_id in (a_id, b_id):
+        if upload_id not in uploads:
+            return None, upload_id
+    comparison = compare_uploads(uploads[a_id], uploads[b_id])
+    cache.set(key, comparison, get_compare_cache_seconds())
+    return comparison, None
@@ -0,0 +1,203 @@
+"""
+Transparent decompression of compressed CSV uploads.
+
+Supports ``.csv.gz``, ``.csv.bz2`` and ``.csv.zst`` files as well as
+``Content-Encoding: gzip`` request bodies. Decompression is incremental: the
+parser pulls decompressed bytes as it needs them, so the whole decompressed
+file is never held in memory or written to disk.
+"""
+import bz2
+import gzip
+import io
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from equipment_api.ingest import IngestError
+
+
+COMPRESSED_SUFFIXES = {
+    '.csv.gz': 'gzip',
+    '.csv.bz2': 'bz2',
+    '.csv.zst': 'zstd',
+}
+CONTENT_ENCODINGS = {
+    'gzip': 'gzip',
+    'x-gzip': 'gzip',
+    'zstd': 'zstd',
+}
+UPLOAD_SUFFIXES = ('.csv', '.xlsx') + tuple(COMPRESSED_SUFFIXES)
+
+DECOMPRESSION_ERRORS = (EOFError, OSError, zlib.error) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+ZSTD_MAGIC = 0xFD2FB528
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A50
+ZSTD_SKIPPABLE_MASK = 0xFFFFFFF0
+
+
+def is_supported_upload(filename):
+    """Whether a file name is a plain or compressed CSV, or an Excel workbook."""
+    return filename.lower().endswith(UPLOAD_SUFFIXES)
+
+
+def compression_for(filename, content_encoding=None):
+    """
+    Compression of an upload from its Content-Encoding or file name suffix.
+
+    Returns:
+        str: 'gzip', 'bz2', 'zstd', or None for plain CSV
+
+    Raises:
+        IngestError: For an unsupported Content-Encoding
+    """
+    if content_encoding and content_encoding.strip().lower() != 'identity':
+        encoding = content_encoding.strip().lower()
+        if encoding not in CONTENT_ENCODINGS:
+            raise IngestError(f'Unsupported Content-Encoding: {content_encoding}')
+        return CONTENT_ENCODINGS[encoding]
+    name = filename.lower()
+    for suffix, compression in COMPRESSED_SUFFIXES.items():
+        if name.endswith(suffix):
+            return compression
+    return None
+
+
+class ZstdFrameTracker(io.RawIOBase):
+    """
+    Pass-through stream following the frame and block layout of zstd data.
+
+    zstandard's stream reader ends quietly when its input stops inside a
+    frame, so a truncated upload would be parsed as a shorter file. Only
+    frame and block headers are inspected (block contents are skipped), and
+    ``complete`` tells whether everything read so far ends on a frame
+    boundary.
+    """
+
+    def __init__(self, stream):
+        super().__init__()
+        self._stream = stream
+        self._state = 'magic'
+        self._header = b''
+        self._want = 4
+        self._skip = 0
+        self._checksum = False
+
+    def readable(self):
+        return True
+
+    @property
+    def complete(self):
+        return self._state == 'magic' and not self._header and not self._skip
+
+    def readinto(self, buffer):
+        size = self._stream.readinto(buffer)
+        if size:
+            self._follow(memoryview(buffer)[:size])
+        return size
+
+    def _follow(self, data):
+        pos = 0
+        while pos < len(data):
+            if self._skip:
+                step = min(self._skip, len(data) - pos)
+                self._skip -= step
+                pos += step
+                continue
+            step = min(self._want - len(self._header), len(data) - pos)
+            self._header += bytes(data[pos:pos + step])
+            pos += step
+            if len(self._header) == self._want:
+                self._advance(self._header)
+                self._header = b''
+
+    def _advance(self, header):
+        value = int.from_bytes(header, 'little')
+        if self._state == 'magic':
+            if value == ZSTD_MAGIC:
+                self._state, self._want = 'descriptor', 1
+            elif value & ZSTD_SKIPPABLE_MASK == ZSTD_SKIPPABLE_MAGIC:
+                self._state, self._want = 'skippable', 4
+            else:
+                raise zstandard.ZstdError('Unknown frame magic')
+        elif self._state == 'descriptor':
+            single_segment = value >> 5 & 1
+            self._checksum = bool(value >> 2 & 1)
+            # Window descriptor, dictionary id and frame content size fields
+            self._skip = (
+                (0 if single_segment else 1)
+                + (0, 1, 2, 4)[value & 3]
+                + (single_segment, 2, 4, 8)[value >> 6]
+            )
+            self._state, self._want = 'block', 3
+        elif self._state == 'block':
+            block_type = value >> 1 & 3
+            if block_type == 3:
+                raise zstandard.ZstdError('Reserved block type')
+            # An RLE block holds one byte, repeated
+            self._skip = 1 if block_type == 1 else value >> 3
+            if value & 1:
+                self._skip += 4 if self._checksum else 0
+                self._state, self._want = 'magic', 4
+        else:
+            self._skip = value
+            self._state, self._want = 'magic', 4
+
+
+class DecompressingStream(io.RawIOBase):
+    """
+    Raw stream of decompressed bytes read incrementally from a compressed one.
+
+    Corrupt or truncated input surfaces as IngestError instead of the
+    codec-specific exception. ``tracker`` is a ZstdFrameTracker over the
+    compressed input, checked once the decompressed data ends.
+    """
+
+    def __init__(self, reader, tracker=None):
+        super().__init__()
+        self._reader = reader
+        self._tracker = tracker
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        try:
+            data = self._reader.read(len(buffer))
+        except DECOMPRESSION_ERRORS:
+            raise IngestError('Invalid or corrupt compressed file')
+        if not data and self._tracker is not None and not self._tracker.complete:
+            raise IngestError('Invalid or corrupt compressed file')
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._reader.close()
+        super().close()
+
+
+def decompress(stream, compression):
+    """
+    Wrap a binary stream so it yields decompressed bytes.
+
+    Returns ``stream`` unchanged when ``compression`` is None.
+    """
+    if compression is None:
+        return stream
+    tracker = None
+    if compression == 'gzip':
+        reader = gzip.GzipFile(fileobj=stream, mode='rb')
+    elif compression == 'bz2':
+        reader = bz2.BZ2File(stream, mode='rb')
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise IngestError('Zstandard-compressed uploads require the zstandard package')
+        tracker = ZstdFrameTracker(stream)
+        reader = zstandard.ZstdDecompressor().stream_reader(tracker, read_across_frames=True)
+    else:
+        raise IngestError(f'Unsupported compression: {compression}')
+    return DecompressingStream(reader, tracker)
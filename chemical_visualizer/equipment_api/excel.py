@@ -0,0 +1,107 @@
+"""
+Streaming ingest of Excel (.xlsx) uploads.
+
+Workbooks are opened with openpyxl in read-only mode, which parses the sheet
+XML lazily instead of building the whole workbook in memory. Rows of the first
+worksheet are read as plain values, collected into fixed-size batches and
+passed through the same chunk pipeline as CSV uploads.
+"""
+import zipfile
+from xml.etree.ElementTree import ParseError
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from equipment_api.ingest import (
+    REQUIRED_COLUMNS,
+    IngestError,
+    get_chunk_rows,
+    ingest_chunks,
+    validate_header,
+)
+from equipment_api.stats import NUMERIC_COLUMNS
+
+
+EXCEL_SUFFIXES = ('.xlsx',)
+
+WORKBOOK_ERRORS = (InvalidFileException, zipfile.BadZipFile, KeyError, ParseError, EOFError)
+
+
+def is_excel(filename):
+    """Whether a file name or path refers to an Excel workbook."""
+    return filename.lower().endswith(EXCEL_SUFFIXES)
+
+
+def iter_xlsx_chunks(fileobj, chunk_rows=None):
+    """
+    Yield cleaned DataFrame chunks of the required columns from a workbook.
+
+    Args:
+        fileobj: Path or seekable binary file of the .xlsx workbook
+        chunk_rows (int): Rows per chunk
+
+    Non-numeric cells in numeric columns and rows with empty required cells
+    are dropped, like unparseable values in a CSV chunk.
+    """
+    chunk_rows = chunk_rows or get_chunk_rows()
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except WORKBOOK_ERRORS:
+        raise IngestError('Invalid Excel file')
+
+    try:
+        if not workbook.worksheets:
+            raise IngestError('No valid data found in workbook')
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        try:
+            header = validate_header(next(rows))
+        except StopIteration:
+            raise IngestError('No valid data found in workbook')
+
+        batch = []
+        try:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= chunk_rows:
+                    yield from _clean_chunk(batch, header)
+                    batch = []
+        except WORKBOOK_ERRORS:
+            raise IngestError('Invalid Excel file')
+        yield from _clean_chunk(batch, header)
+    finally:
+        workbook.close()
+
+
+def _clean_chunk(batch, header):
+    width = len(header)
+    records = [
+        row[:width] if len(row) >= width else row + (None,) * (width - len(row))
+        for row in batch
+    ]
+    chunk = pd.DataFrame.from_records(records, columns=header)[REQUIRED_COLUMNS]
+    for column in NUMERIC_COLUMNS:
+        chunk[column] = pd.to_numeric(chunk[column], errors='coerce').astype('float64')
+
+    # Remove rows with empty or non-numeric values in any required column
+    chunk = chunk.dropna()
+    if len(chunk):
+        chunk['Equipment Name'] = chunk['Equipment Name'].astype(str)
+        chunk['Type'] = chunk['Type'].astype(str).astype('category')
+        yield chunk
+
+
+def ingest_excel(fileobj, chunk_rows=None, progress=None, writer=None):
+    """
+    Ingest the first worksheet of an .xlsx workbook.
+
+    Args:
+        fileobj: Path or seekable binary file of the workbook
+        chunk_rows (int): Optional override for the number of rows per chunk
+        progress (callable): Optional callback receiving the running row count
+        writer (ColumnarWriter): Optional column store receiving the rows
+
+    Returns:
+        EquipmentStats: Statistics over every valid row in the worksheet
+    """
+    return ingest_chunks(iter_xlsx_chunks(fileobj, chunk_rows), progress, writer)
@@ -0,0 +1,44 @@
+"""
+Query parameter parsing shared by equipment_api list endpoints.
+"""
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def parse_moment(value):
+    """
+    Parse an ISO date or datetime query parameter into an aware datetime.
+
+    Dates mean midnight at the start of that day in the current time zone;
+    naive datetimes are taken in the current time zone as well.
+
+    Returns:
+        datetime: The parsed moment, or None if ``value`` is not ISO formatted
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_day(value):
+    """
+    Parse an ISO date query parameter.
+
+    Returns:
+        date: The parsed day, or None if ``value`` is not an ISO date
+    """
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
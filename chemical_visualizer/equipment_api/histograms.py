@@ -0,0 +1,144 @@
+"""
+Chart-ready histograms of an upload, from the histograms kept at ingest.
+
+Every upload stores a power-of-two-width Histogram per numeric column and
+per (type, column) (see equipment_api.stats), built in the ingest pass, so
+serving them never reads the upload's rows and the payload size depends only
+on the number of bins and types.
+
+Two binnings are served per column:
+- ``fixed``: the stored equal-width bins, optionally coarsened to at most
+  ``bins`` bins by doubling the width
+- ``quantile``: ``quantile_bins`` bins holding equal shares of the rows; the
+  edges come from the column's t-digest for whole columns and from the
+  stored histogram, narrowed to the exact extremes, per type
+"""
+import numpy as np
+
+from equipment_api.query import QueryError
+from equipment_api.stats import NUMERIC_COLUMNS
+
+
+DEFAULT_QUANTILE_BINS = 10
+MAX_QUANTILE_BINS = 100
+
+# Column store column -> API column name
+COLUMNS = {column: column.lower() for column in NUMERIC_COLUMNS}
+
+
+def _positive_int(params, name, default, maximum=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1 or (maximum and number > maximum):
+        if maximum:
+            raise QueryError(f'{name} must be an integer from 1 to {maximum}.')
+        raise QueryError(f'{name} must be a positive integer.')
+    return number
+
+
+def histogram_options(params):
+    """
+    Keyword arguments of ``upload_histograms`` from request query parameters.
+
+    Query parameters:
+    - ``column``: comma-separated API column names (default: all)
+    - ``type``: comma-separated equipment types, or 'none' (default: all)
+    - ``bins``: most fixed bins per histogram
+    - ``quantile_bins``: number of quantile bins
+
+    Raises:
+        QueryError: On unknown columns or invalid bin counts
+    """
+    names = {name: column for column, name in COLUMNS.items()}
+    columns = [item.strip() for item in params.get('column', '').split(',') if item.strip()]
+    unknown = [column for column in columns if column not in names]
+    if unknown:
+        raise QueryError(f'Unknown columns: {", ".join(unknown)}; use {", ".join(names)}.')
+
+    types = params.get('type')
+    if types is not None:
+        types = [] if types == 'none' else [item.strip() for item in types.split(',') if item.strip()]
+
+    return {
+        'columns': [names[column] for column in columns],
+        'types': types,
+        'bins': _positive_int(params, 'bins', None),
+        'quantile_bins': _positive_int(params, 'quantile_bins', DEFAULT_QUANTILE_BINS, MAX_QUANTILE_BINS),
+    }
+
+
+def quantile_counts(total, bins):
+    """Split ``total`` rows into ``bins`` integer shares that add up to it."""
+    return np.diff(np.round(np.linspace(0, total, bins + 1))).astype(int).tolist()
+
+
+def describe_histogram(histogram, quantiles, bins=None, quantile_bins=DEFAULT_QUANTILE_BINS):
+    """
+    Fixed and quantile bins of one histogram.
+
+    ``quantiles`` maps a list of quantiles to their values, so callers can
+    use a more precise sketch than the histogram when one is kept.
+    """
+    if not histogram.count:
+        return {'count': 0, 'fixed': {'edges': [], 'counts': []}, 'quantile': {'edges': [], 'counts': []}}
+    fixed = histogram.coarsen(bins) if bins else histogram
+    return {
+        'count': histogram.count,
+        'fixed': {'edges': fixed.edges(), 'counts': fixed.counts.tolist()},
+        'quantile': {
+            'edges': quantiles(np.linspace(0, 1, quantile_bins + 1).tolist()),
+            'counts': quantile_counts(histogram.count, quantile_bins),
+        },
+    }
+
+
+def upload_histograms(stats, columns=None, types=None, bins=None, quantile_bins=DEFAULT_QUANTILE_BINS):
+    """
+    Chart-ready histograms of an upload's stats state.
+
+    Args:
+        stats: EquipmentStats with histograms loaded
+        columns: Column store columns to include (default: all)
+        types: Equipment types to include (default: all; empty for none)
+        bins: Most fixed bins per histogram (default: as stored)
+        quantile_bins: Number of quantile bins
+
+    Returns:
+        dict: ``{'columns': {column: ...}, 'types': {type: {column: ...}}}``
+    """
+    columns = columns or NUMERIC_COLUMNS
+    result = {'columns': {}, 'types': {}}
+    for column in columns:
+        column_stats = stats.columns[column]
+        result['columns'][COLUMNS[column]] = describe_histogram(
+            stats.histograms[column],
+            lambda qs, column_stats=column_stats: [column_stats.quantile(q) for q in qs],
+            bins,
+            quantile_bins,
+        )
+
+    for equipment_type in sorted(stats.type_histograms) if types is None else types:
+        histograms = stats.type_histograms.get(equipment_type)
+        if histograms is None:
+            continue
+        mins = stats.type_mins.get(equipment_type)
+        maxs = stats.type_maxs.get(equipment_type)
+        result['types'][equipment_type] = {}
+        for column in columns:
+            i = NUMERIC_COLUMNS.index(column)
+            histogram = histograms[column]
+            result['types'][equipment_type][COLUMNS[column]] = describe_histogram(
+                histogram,
+                lambda qs, histogram=histogram, i=i: [
+                    histogram.quantile(q, mins[i] if mins else None, maxs[i] if maxs else None)
+                    for q in qs
+                ],
+                bins,
+                quantile_bins,
+            )
+    return result
@@ -0,0 +1,402 @@
+"""
+Streaming ingest for equipment uploads.
+
+Parses uploaded CSV files in fixed-size row chunks and folds every chunk into
+mergeable running statistics, so peak memory stays flat regardless of the file size.
+"""
+import csv
+import io
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+from equipment_api.stats import NUMERIC_COLUMNS, EquipmentStats
+
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+
+DEFAULT_CHUNK_ROWS = 50000
+
+# Parser configuration for the equipment schema: only the required columns
+# are parsed, numbers as float64 and the low-cardinality Type as categorical.
+CSV_DTYPES = {
+    'Equipment Name': 'object',
+    'Type': 'category',
+    'Flowrate': 'float64',
+    'Pressure': 'float64',
+    'Temperature': 'float64',
+}
+if pa is not None:
+    ARROW_TYPES = {
+        'Equipment Name': pa.string(),
+        'Type': pa.dictionary(pa.int32(), pa.string()),
+        'Flowrate': pa.float64(),
+        'Pressure': pa.float64(),
+        'Temperature': pa.float64(),
+    }
+# Largest magnitude accepted in a numeric column; squared deviations summed
+# over any realistic row count stay far from float64 overflow
+MAX_ABS_VALUE = 1e100
+# Bytes counted per FieldCountCheck block; large blocks amortize the NumPy calls
+FIELD_CHECK_BLOCK_BYTES = 1024 * 1024
+# Arrow reads by byte blocks; this converts the row chunk size to a block size
+ARROW_BYTES_PER_ROW = 64
+
+
+class IngestError(Exception):
+    """Raised when an uploaded file cannot be turned into equipment statistics."""
+
+    def __init__(self, message, **extra):
+        super().__init__(message)
+        self.message = message
+        self.extra = extra
+
+    def as_response_data(self):
+        """Return the error payload used by the API views."""
+        return {'error': self.message, **self.extra}
+
+
+class FieldCountCheck(io.RawIOBase):
+    """
+    Pass-through binary stream that rejects lines with more fields than the header.
+
+    pandas' C parser silently truncates such rows when ``usecols`` is given,
+    so the fields of every row are counted here, vectorized per block, before
+    the parser sees them. A delimiter or line break is part of a quoted field
+    when an odd number of double quotes precede it on its row (an escaped
+    quote adds two), so quoted fields are counted correctly.
+    """
+
+    def __init__(self, stream, fields):
+        super().__init__()
+        self._stream = stream
+        self._fields = fields
+        # Incomplete last row of the previous block; it starts outside quotes
+        self._tail = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = self._stream.readinto(buffer)
+        if size:
+            self._check(b''.join((self._tail, memoryview(buffer)[:size])), final=False)
+        elif self._tail:
+            self._check(self._tail, final=True)
+        return size
+
+    def _check(self, data, final):
+        chars = np.frombuffer(data, dtype=np.uint8)
+        delimiters = chars == ord(',')
+        breaks = chars == ord('\n')
+        if b'"' in data:
+            quoted = np.cumsum(chars == ord('"')) % 2 == 1
+            delimiters &= ~quoted
+            breaks &= ~quoted
+        ends = np.flatnonzero(breaks)
+        if final:
+            ends = np.append(ends, chars.size - 1)
+        if ends.size:
+            # Every row runs up to and including its line break
+            starts = np.concatenate([[0], ends[:-1] + 1])
+            fields = np.add.reduceat(delimiters[:ends[-1] + 1], starts, dtype=np.int32) + 1
+            if fields.max() > self._fields:
+                raise IngestError('Invalid CSV format')
+            data = data[ends[-1] + 1:]
+        self._tail = data
+
+
+class ChunkStream(io.RawIOBase):
+    """
+    Read-only binary stream over an iterator of byte chunks.
+
+    Lets the CSV parser pull data straight from ``UploadedFile.chunks()``
+    without ever joining the chunks into one bytes object.
+    """
+
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def get_chunk_rows():
+    """Number of CSV rows parsed per chunk."""
+    return getattr(settings, 'EQUIPMENT_INGEST_CHUNK_ROWS', DEFAULT_CHUNK_ROWS)
+
+
+def parse_header(line):
+    """
+    Parse and validate a CSV header line.
+
+    Returns:
+        list: Column names in file order
+
+    Raises:
+        IngestError: If the line is empty or required columns are missing
+    """
+    if not line.strip():
+        raise IngestError('No valid data found in CSV')
+    return validate_header(next(csv.reader([line])))
+
+
+def validate_header(names):
+    """
+    Normalize header cell values and check the required columns are present.
+
+    Returns:
+        list: Stripped column names, duplicates suffixed as pandas does
+
+    Raises:
+        IngestError: If required columns are missing
+    """
+    header = []
+    for name in names:
+        name = '' if name is None else str(name).strip()
+        # Give duplicate column names a numeric suffix, as pandas does
+        base, suffix = name, 1
+        while name in header:
+            name = f'{base}.{suffix}'
+            suffix += 1
+        header.append(name)
+    missing_columns = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing_columns:
+        raise IngestError(
+            f"Missing columns: {', '.join(missing_columns)}",
+            required_columns=REQUIRED_COLUMNS,
+        )
+    return header
+
+
+def get_csv_engine():
+    """
+    CSV parser engine: 'pyarrow' when it is installed, otherwise pandas' 'c'.
+
+    EQUIPMENT_CSV_ENGINE can force either engine; 'auto' picks the fastest
+    one available.
+    """
+    engine = getattr(settings, 'EQUIPMENT_CSV_ENGINE', 'auto')
+    if engine == 'auto':
+        return 'pyarrow' if pa_csv is not None else 'c'
+    if engine == 'pyarrow' and pa_csv is None:
+        return 'c'
+    return engine
+
+
+def iter_csv_chunks(stream, chunk_rows=None, header=None):
+    """
+    Yield cleaned DataFrame chunks of the required columns from a binary stream.
+
+    Unless ``header`` is given, the first line of the stream is read and
+    validated up front, so a file with missing columns is rejected before any
+    data rows are parsed. A leading byte order mark, as Excel writes to
+    "CSV UTF-8" files, is ignored. Only the required columns are parsed, with the
+    types from CSV_DTYPES.
+    """
+    buffered = io.BufferedReader(stream)
+    if header is None:
+        header = parse_header(buffered.readline().decode('utf-8-sig'))
+    chunk_rows = chunk_rows or get_chunk_rows()
+
+    if get_csv_engine() == 'pyarrow':
+        chunks = _iter_arrow_chunks(buffered, header, chunk_rows)
+    else:
+        chunks = _iter_pandas_chunks(buffered, header, chunk_rows)
+
+    for chunk in chunks:
+        # Remove rows with NaN values in any required column
+        chunk = chunk.dropna()
+        if len(chunk):
+            yield chunk
+
+
+def _iter_pandas_chunks(buffered, header, chunk_rows):
+    # With usecols the parser truncates rows with extra fields instead of
+    # rejecting them, so FieldCountCheck rejects them first
+    checked = io.BufferedReader(FieldCountCheck(buffered, len(header)), FIELD_CHECK_BLOCK_BYTES)
+    text = io.TextIOWrapper(checked, encoding='utf-8-sig', newline='')
+    reader = pd.read_csv(
+        text,
+        header=None,
+        names=header,
+        usecols=REQUIRED_COLUMNS,
+        dtype=CSV_DTYPES,
+        engine='c',
+        chunksize=chunk_rows,
+    )
+    with reader:
+        for chunk in reader:
+            yield chunk[REQUIRED_COLUMNS]
+
+
+def _iter_arrow_chunks(buffered, header, chunk_rows):
+    if not buffered.peek(1):
+        # Arrow rejects an empty body; a header-only file simply has no rows
+        return
+    reader = pa_csv.open_csv(
+        buffered,
+        read_options=pa_csv.ReadOptions(
+            column_names=header,
+            block_size=max(chunk_rows * ARROW_BYTES_PER_ROW, 1 << 20),
+        ),
+        parse_options=pa_csv.ParseOptions(invalid_row_handler=_skip_invalid_row),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=REQUIRED_COLUMNS,
+            column_types=ARROW_TYPES,
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def _skip_invalid_row(row):
+    # Short rows would be dropped as incomplete by the pandas path as well.
+    # Rows with extra fields are rejected there, so they are here too; Arrow
+    # ignores exceptions raised by the handler, but 'error' makes it raise
+    # ArrowInvalid, which parse_errors turns into 'Invalid CSV format'.
+    if row.actual_columns < row.expected_columns:
+        return 'skip'
+    return 'error'
+
+
+@contextmanager
+def parse_errors():
+    """Translate parser and decoding failures into IngestError."""
+    try:
+        yield
+    except pd.errors.EmptyDataError:
+        raise IngestError('No valid data found in CSV')
+    except UnicodeDecodeError:
+        raise IngestError('File must be UTF-8 encoded')
+    except (pd.errors.ParserError, ValueError):
+        raise IngestError('Invalid CSV format')
+
+
+def ingest_stream(stream, chunk_rows=None, header=None, progress=None, sink=None):
+    """
+    Fold every chunk of a binary CSV stream into a new EquipmentStats.
+
+    The result may be empty; callers decide whether that is an error (a byte
+    range of a larger file may legitimately contain no valid rows).
+    ``progress`` is called with the running row count after each chunk, and
+    every cleaned chunk is appended to ``sink`` (a column store part) if given.
+    """
+    with parse_errors():
+        return fold_chunks(iter_csv_chunks(stream, chunk_rows, header), progress, sink)
+
+
+def check_values(chunk):
+    """
+    Reject a chunk holding infinite or out-of-range values.
+
+    Parsers read 'inf' and friends as floats; such values would make every
+    mean, spread and histogram of the upload meaningless. Finite values
+    beyond MAX_ABS_VALUE are rejected too: their spreads and squared
+    deviations overflow to infinity in the histograms and moments.
+
+    Raises:
+        IngestError: Naming the columns with infinite or out-of-range values
+    """
+    values = chunk[NUMERIC_COLUMNS].to_numpy()
+    finite = np.isfinite(values)
+    if not finite.all():
+        columns = [column for column, ok in zip(NUMERIC_COLUMNS, finite.all(axis=0)) if not ok]
+        raise IngestError(f"Infinite values in columns: {', '.join(columns)}")
+    in_range = np.abs(values) <= MAX_ABS_VALUE
+    if not in_range.all():
+        columns = [column for column, ok in zip(NUMERIC_COLUMNS, in_range.all(axis=0)) if not ok]
+        raise IngestError(
+            f"Values out of range in columns: {', '.join(columns)}",
+            max_abs_value=MAX_ABS_VALUE,
+        )
+
+
+def fold_chunks(chunks, progress=None, sink=None):
+    """
+    Fold cleaned DataFrame chunks of the required columns into a new EquipmentStats.
+
+    Raises:
+        IngestError: If a chunk holds infinite or out-of-range values
+    """
+    stats = EquipmentStats()
+    for chunk in chunks:
+        check_values(chunk)
+        stats.update(chunk)
+        if sink:
+            sink.append(chunk)
+        if progress:
+            progress(stats.count)
+    return stats
+
+
+def ingest_serial(stream, chunk_rows=None, progress=None, writer=None):
+    """
+    Ingest a whole CSV stream in-process.
+
+    When a ``ColumnarWriter`` is given, the rows are written as a single part
+    and the store is finalized.
+
+    Raises:
+        IngestError: If the stream holds no valid rows
+    """
+    return ingest_chunks(iter_csv_chunks(stream, chunk_rows), progress, writer)
+
+
+def ingest_chunks(chunks, progress=None, writer=None):
+    """
+    Ingest an iterator of cleaned DataFrame chunks from any source format.
+
+    Raises:
+        IngestError: If the chunks hold no valid rows
+    """
+    part = writer.part(0) if writer else None
+    try:
+        with parse_errors():
+            stats = fold_chunks(chunks, progress, part)
+    finally:
+        part_info = part.close() if part else None
+
+    if stats.count == 0:
+        raise IngestError('No valid data found in CSV')
+    if writer:
+        writer.finalize([part_info])
+    return stats
+
+
+def ingest_csv(uploaded_file, chunk_rows=None, progress=None, writer=None):
+    """
+    Stream an uploaded CSV file into mergeable statistics.
+
+    Args:
+        uploaded_file (UploadedFile): File from the upload request
+        chunk_rows (int): Optional override for the number of rows per chunk
+        progress (callable): Optional callback receiving the running row count
+        writer (ColumnarWriter): Optional column store receiving the rows
+
+    Returns:
+        EquipmentStats: Statistics over every valid row in the file
+    """
+    return ingest_serial(ChunkStream(uploaded_file.chunks()), chunk_rows, progress, writer)
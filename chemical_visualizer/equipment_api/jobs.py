@@ -0,0 +1,192 @@
+"""
+Background upload jobs.
+
+Uploads submitted in job mode are spooled to disk and processed by a local
+thread pool, so the request returns immediately and no external broker is
+needed. Job state and progress live on the UploadJob model.
+
+The pool does not outlive its process: jobs still queued or running when the
+server stops are marked failed by ``recover_stale_jobs`` once it restarts.
+"""
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from equipment_api.ingest import IngestError
+from equipment_api.models import EquipmentUpload, UploadJob
+from equipment_api.pipeline import DuplicateUpload, process_upload
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_WORKERS = 2
+
+STALE_JOB_ERROR = 'Job interrupted by a server restart; upload the file again'
+
+_executor = None
+_executor_lock = threading.Lock()
+_started_at = timezone.now()
+
+
+def get_spool_dir():
+    """Directory holding spooled upload files, created on demand."""
+    spool_dir = getattr(settings, 'EQUIPMENT_SPOOL_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'spool')
+    os.makedirs(spool_dir, exist_ok=True)
+    return spool_dir
+
+
+def get_executor():
+    """Return the shared job thread pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'EQUIPMENT_JOB_WORKERS', DEFAULT_JOB_WORKERS),
+                thread_name_prefix='upload-job',
+            )
+        return _executor
+
+
+def spool_upload(uploaded_file):
+    """
+    Copy an uploaded file to the spool directory chunk by chunk.
+
+    Returns:
+        str: Path of the spooled file
+    """
+    _, extension = os.path.splitext(uploaded_file.name)
+    fd, path = tempfile.mkstemp(suffix=extension, dir=get_spool_dir())
+    with os.fdopen(fd, 'wb') as f:
+        for chunk in uploaded_file.chunks():
+            f.write(chunk)
+    return path
+
+
+def submit_upload_job(uploaded_file, content_hash='', compression=None):
+    """
+    Spool an uploaded file, create its job row and queue it for processing.
+
+    Returns:
+        UploadJob: The queued job
+    """
+    path = spool_upload(uploaded_file)
+    return queue_upload_job(
+        uploaded_file.name,
+        path,
+        size_bytes=uploaded_file.size or 0,
+        content_hash=content_hash,
+        compression=compression,
+    )
+
+
+def queue_upload_job(filename, path, size_bytes=0, content_hash='', compression=None):
+    """
+    Create a job for a file already in the spool directory and queue it.
+
+    The job takes ownership of the spool file and deletes it when it ends.
+
+    Returns:
+        UploadJob: The queued job
+    """
+    job = UploadJob.objects.create(
+        filename=filename,
+        spool_path=path,
+        content_hash=content_hash,
+        compression=compression or '',
+        size_bytes=size_bytes,
+    )
+    get_executor().submit(run_upload_job, job.pk)
+    return job
+
+
+def _update_job(job_id, **fields):
+    """Update job fields without loading the row, keeping updated_at current."""
+    UploadJob.objects.filter(pk=job_id).update(updated_at=timezone.now(), **fields)
+
+
+def recover_stale_jobs():
+    """
+    Fail the jobs a previous server process left queued or running.
+
+    Jobs last updated before this process started can no longer finish, as
+    their pool went away with the old process; their spool files are removed.
+    Server processes sharing the database are expected to restart together,
+    as the workers of one gunicorn master do.
+
+    Returns:
+        int: Number of jobs marked failed
+    """
+    stale = UploadJob.objects.filter(
+        state__in=[UploadJob.QUEUED, UploadJob.RUNNING],
+        updated_at__lt=_started_at,
+    )
+    jobs = list(stale.values_list('pk', 'spool_path'))
+    if not jobs:
+        return 0
+    UploadJob.objects.filter(pk__in=[pk for pk, _ in jobs]).update(
+        state=UploadJob.FAILED,
+        error=STALE_JOB_ERROR,
+        updated_at=timezone.now(),
+    )
+    for _, spool_path in jobs:
+        if spool_path and os.path.exists(spool_path):
+            os.remove(spool_path)
+    logger.warning("Marked %d interrupted upload jobs as failed", len(jobs))
+    return len(jobs)
+
+
+def run_upload_job(job_id):
+    """Process a queued job in a worker thread."""
+    close_old_connections()
+    try:
+        job = UploadJob.objects.get(pk=job_id)
+        # A job failed by recover_stale_jobs in the meantime is not run
+        claimed = UploadJob.objects.filter(pk=job_id, state=UploadJob.QUEUED).update(
+            state=UploadJob.RUNNING,
+            updated_at=timezone.now(),
+        )
+        if not claimed:
+            return
+
+        def report_progress(rows):
+            _update_job(job_id, rows_processed=rows)
+
+        try:
+            try:
+                upload = EquipmentUpload.find_by_content_hash(job.content_hash) or process_upload(
+                    job.filename,
+                    path=job.spool_path,
+                    progress=report_progress,
+                    content_hash=job.content_hash,
+                    compression=job.compression or None,
+                )
+            except DuplicateUpload as e:
+                # Identical bytes were saved while this job was parsing them
+                upload = e.upload
+        except IngestError as e:
+            _update_job(job_id, state=UploadJob.FAILED, error=e.message)
+        except Exception as e:
+            logger.exception("Upload job %s failed", job_id)
+            _update_job(
+                job_id,
+                state=UploadJob.FAILED,
+                error=f'Error processing file: {str(e)}',
+            )
+        else:
+            _update_job(
+                job_id,
+                state=UploadJob.SUCCEEDED,
+                rows_processed=upload.equipment_count,
+                upload=upload,
+            )
+        finally:
+            if job.spool_path and os.path.exists(job.spool_path):
+                os.remove(job.spool_path)
+    finally:
+        close_old_connections()
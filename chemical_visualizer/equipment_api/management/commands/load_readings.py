@@ -0,0 +1,17 @@
+"""
+Retry loading the readings of uploads whose readings load failed.
+
+Usage:
+    python manage.py load_readings
+"""
+from django.core.management.base import BaseCommand
+
+from equipment_api.readings import reload_failed_readings
+
+
+class Command(BaseCommand):
+    help = 'Load the readings of uploads whose earlier readings load failed.'
+
+    def handle(self, *args, **options):
+        retried, loaded = reload_failed_readings()
+        self.stdout.write(self.style.SUCCESS(f'Loaded readings of {loaded} of {retried} uploads'))
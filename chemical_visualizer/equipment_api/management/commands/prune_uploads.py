@@ -0,0 +1,45 @@
+"""
+Delete uploads outside the retention policy in bounded batches.
+
+Usage:
+    python manage.py prune_uploads
+    python manage.py prune_uploads --keep 1000 --max-age-days 90
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment_api.retention import get_prune_batch_size, get_retention_policy, prune_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete uploads beyond the retention count or age, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            help='Keep at most this many uploads, 0 for no limit (default: EQUIPMENT_RETENTION_COUNT)',
+        )
+        parser.add_argument(
+            '--max-age-days',
+            type=int,
+            help='Delete uploads older than this many days, 0 for no limit (default: EQUIPMENT_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Uploads deleted per transaction (default: EQUIPMENT_PRUNE_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        max_count, max_age = get_retention_policy()
+        if options['keep'] is not None:
+            max_count = options['keep'] or None
+        if options['max_age_days'] is not None:
+            max_age = timedelta(days=options['max_age_days']) if options['max_age_days'] else None
+        if max_count is None and max_age is None:
+            raise CommandError('No retention limit configured; pass --keep or --max-age-days.')
+
+        deleted = prune_uploads(max_count, max_age, options['batch_size'] or get_prune_batch_size())
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} uploads'))
@@ -0,0 +1,17 @@
+"""
+Recompute the daily rollups from the uploads still stored.
+
+Usage:
+    python manage.py rebuild_rollups
+"""
+from django.core.management.base import BaseCommand
+
+from equipment_api.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily and per-type rollups from the stored uploads (totals of pruned uploads are lost).'
+
+    def handle(self, *args, **options):
+        added = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups from {added} uploads'))
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0006_uploadjob_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('spool_path', models.CharField(blank=True, default='', max_length=500)),
+                ('size_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('state', models.CharField(choices=[('open', 'Open'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='open', max_length=16)),
+                ('received_bytes', models.BigIntegerField(default=0)),
+                ('last_chunk', models.IntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sessions', to='equipment_api.uploadjob')),
+                ('upload', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sessions', to='equipment_api.equipmentupload')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
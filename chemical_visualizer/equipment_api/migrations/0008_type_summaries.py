@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import json
+
+
+def copy_type_distribution(apps, schema_editor):
+    """Move each upload's JSON type distribution into UploadTypeSummary rows."""
+    EquipmentUpload = apps.get_model('equipment_api', 'EquipmentUpload')
+    UploadTypeSummary = apps.get_model('equipment_api', 'UploadTypeSummary')
+    for upload in EquipmentUpload.objects.only('id', 'type_distribution').iterator():
+        try:
+            distribution = json.loads(upload.type_distribution)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        counts = {}
+        for equipment_type, count in distribution.items():
+            key = str(equipment_type)[:255]
+            counts[key] = counts.get(key, 0) + int(count)
+        UploadTypeSummary.objects.bulk_create(
+            UploadTypeSummary(upload_id=upload.id, equipment_type=equipment_type, count=count)
+            for equipment_type, count in counts.items()
+        )
+
+
+def restore_type_distribution(apps, schema_editor):
+    EquipmentUpload = apps.get_model('equipment_api', 'EquipmentUpload')
+    UploadTypeSummary = apps.get_model('equipment_api', 'UploadTypeSummary')
+    for upload in EquipmentUpload.objects.only('id').iterator():
+        summaries = UploadTypeSummary.objects.filter(upload_id=upload.id).order_by('id')
+        EquipmentUpload.objects.filter(id=upload.id).update(
+            type_distribution=json.dumps({s.equipment_type: s.count for s in summaries})
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0007_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadTypeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_type', models.CharField(max_length=255)),
+                ('count', models.IntegerField()),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='type_summaries', to='equipment_api.equipmentupload')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['equipment_type', 'upload'], name='type_summary_type_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='uploadtypesummary',
+            constraint=models.UniqueConstraint(fields=('upload', 'equipment_type'), name='unique_upload_equipment_type'),
+        ),
+        # A default lets the column be re-added to existing rows when unapplied
+        migrations.AlterField(
+            model_name='equipmentupload',
+            name='type_distribution',
+            field=models.TextField(default='{}'),
+        ),
+        migrations.RunPython(copy_type_distribution, restore_type_distribution),
+        migrations.RemoveField(
+            model_name='equipmentupload',
+            name='type_distribution',
+        ),
+    ]
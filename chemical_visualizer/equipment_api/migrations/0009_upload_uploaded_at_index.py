@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0008_type_summaries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipmentupload',
+            index=models.Index(fields=['uploaded_at', 'id'], name='upload_uploaded_at_id_idx'),
+        ),
+    ]
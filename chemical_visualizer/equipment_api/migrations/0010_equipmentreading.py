@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0009_upload_uploaded_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('equipment_type', models.CharField(max_length=255)),
+                ('flowrate', models.FloatField()),
+                ('pressure', models.FloatField()),
+                ('temperature', models.FloatField()),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='equipment_api.equipmentupload')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['equipment_type'], name='reading_type_idx'), models.Index(fields=['upload', 'equipment_type'], name='reading_upload_type_idx')],
+            },
+        ),
+    ]
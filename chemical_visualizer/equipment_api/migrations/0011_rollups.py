@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0010_equipmentreading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('upload_count', models.IntegerField(default=0)),
+                ('equipment_count', models.IntegerField(default=0)),
+                ('flowrate_sum', models.FloatField(default=0.0)),
+                ('pressure_sum', models.FloatField(default=0.0)),
+                ('temperature_sum', models.FloatField(default=0.0)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTypeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('upload_count', models.IntegerField(default=0)),
+                ('equipment_count', models.IntegerField(default=0)),
+                ('flowrate_sum', models.FloatField(default=0.0)),
+                ('pressure_sum', models.FloatField(default=0.0)),
+                ('temperature_sum', models.FloatField(default=0.0)),
+                ('equipment_type', models.CharField(max_length=255)),
+            ],
+            options={
+                'ordering': ['day', 'equipment_type'],
+                'indexes': [models.Index(fields=['equipment_type', 'day'], name='daily_type_rollup_type_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailytyperollup',
+            constraint=models.UniqueConstraint(fields=('day', 'equipment_type'), name='unique_daily_type_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(fields=('day',), name='unique_daily_rollup_day'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0012_type_summary_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentupload',
+            name='anomaly_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='EquipmentAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row', models.IntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('equipment_type', models.CharField(max_length=255)),
+                ('column', models.CharField(max_length=16)),
+                ('value', models.FloatField()),
+                ('scope', models.CharField(choices=[('column', 'Column'), ('type', 'Type')], max_length=8)),
+                ('method', models.CharField(max_length=8)),
+                ('score', models.FloatField()),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='equipment_api.equipmentupload')),
+            ],
+            options={
+                'ordering': ['-score', 'id'],
+                'indexes': [models.Index(fields=['upload', 'score'], name='anomaly_upload_score_idx')],
+            },
+        ),
+    ]
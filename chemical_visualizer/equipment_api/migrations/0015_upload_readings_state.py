@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0014_upload_histogram_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentupload',
+            name='readings_state',
+            field=models.CharField(blank=True, choices=[('', 'Not loaded'), ('loading', 'Loading'), ('loaded', 'Loaded'), ('failed', 'Failed')], default='', max_length=8),
+        ),
+    ]
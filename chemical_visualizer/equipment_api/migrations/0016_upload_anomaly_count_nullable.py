@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0015_upload_readings_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipmentupload',
+            name='anomaly_count',
+            field=models.IntegerField(blank=True, default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+def clear_duplicate_hashes(apps, schema_editor):
+    """Keep the digest on the newest upload of identical bytes only."""
+    EquipmentUpload = apps.get_model('equipment_api', 'EquipmentUpload')
+    seen = set()
+    for pk, content_hash in (
+        EquipmentUpload.objects.exclude(content_hash='')
+        .order_by('-uploaded_at', '-id')
+        .values_list('id', 'content_hash')
+        .iterator()
+    ):
+        if content_hash in seen:
+            EquipmentUpload.objects.filter(pk=pk).update(content_hash='')
+        else:
+            seen.add(content_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0016_upload_anomaly_count_nullable'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_hashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='equipmentupload',
+            constraint=models.UniqueConstraint(condition=models.Q(('content_hash', ''), _negated=True), fields=('content_hash',), name='upload_content_hash_unique'),
+        ),
+    ]
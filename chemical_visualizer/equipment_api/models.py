@@ -1,15 +1,34 @@
 """
 Models for equipment API - stores CSV upload history and statistics.
 """
-from django.db import models
+import json
+import os
+import uuid
+
+from django.db import models, transaction
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+from equipment_api.columnar import ColumnarStore
+from equipment_api.stats import EquipmentStats
 
 
 class EquipmentUpload(models.Model):
     """
     Stores summary of equipment CSV uploads.
-    Only keeps last 5 uploads (managed via manager).
+    Old uploads are pruned by the retention policy (see equipment_api.retention).
     """
+    READINGS_NONE = ''
+    READINGS_LOADING = 'loading'
+    READINGS_LOADED = 'loaded'
+    READINGS_FAILED = 'failed'
+    READINGS_STATE_CHOICES = [
+        (READINGS_NONE, 'Not loaded'),
+        (READINGS_LOADING, 'Loading'),
+        (READINGS_LOADED, 'Loaded'),
+        (READINGS_FAILED, 'Failed'),
+    ]
+    
     # Upload metadata
     filename = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
@@ -20,21 +39,469 @@ class EquipmentUpload(models.Model):
     avg_pressure = models.FloatField()
     avg_temperature = models.FloatField()
     
-    # Equipment type distribution (stored as JSON string)
-    type_distribution = models.TextField()  # JSON format: {"type1": count, "type2": count}
+    # Serialized mergeable statistics state (see equipment_api.stats)
+    stats_state = models.TextField(blank=True, default='')
+    
+    # Serialized per-column and per-type histograms, kept apart from
+    # stats_state so history listings do not parse them
+    histogram_state = models.TextField(blank=True, default='')
+    
+    # Column store of the uploaded rows, relative to MEDIA_ROOT (see equipment_api.columnar)
+    data_path = models.CharField(max_length=255, blank=True, default='')
+    
+    # SHA-256 of the uploaded bytes, used to answer re-uploads without parsing
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    
+    # Outlier flags found by the anomaly stage (see equipment_api.anomalies),
+    # including any beyond those stored as EquipmentAnomaly rows; null when
+    # the stage did not run (disabled, or the rows are not stored)
+    anomaly_count = models.IntegerField(null=True, blank=True, default=None)
+    
+    # Whether every row is in EquipmentReading (see equipment_api.readings);
+    # readings of an upload in any other state are absent or incomplete
+    readings_state = models.CharField(max_length=8, choices=READINGS_STATE_CHOICES, blank=True, default=READINGS_NONE)
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Serves history ordering, keyset pagination and date-range filters
+            models.Index(fields=['uploaded_at', 'id'], name='upload_uploaded_at_id_idx'),
+        ]
+        constraints = [
+            # Concurrent uploads of identical bytes cannot both be saved
+            models.UniqueConstraint(
+                fields=['content_hash'],
+                condition=~models.Q(content_hash=''),
+                name='upload_content_hash_unique',
+            ),
+        ]
         
     def __str__(self):
         return f"{self.filename} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M:%S')}"
     
-    @staticmethod
-    def cleanup_old_uploads():
-        """Keep only the last 5 uploads."""
-        old_ids = list(
-            EquipmentUpload.objects.order_by('-uploaded_at')
-            .values_list('id', flat=True)[5:]
+    @classmethod
+    def from_stats(cls, filename, stats, data_path='', content_hash=''):
+        """Build an unsaved upload record from an ingested EquipmentStats."""
+        return cls(
+            filename=filename,
+            equipment_count=stats.count,
+            avg_flowrate=stats.mean('Flowrate'),
+            avg_pressure=stats.mean('Pressure'),
+            avg_temperature=stats.mean('Temperature'),
+            stats_state=stats.to_json(histograms=False),
+            histogram_state=json.dumps(stats.histograms_to_dict()),
+            data_path=data_path,
+            content_hash=content_hash,
         )
-        if old_ids:
-            EquipmentUpload.objects.filter(id__in=old_ids).delete()
+    
+    @classmethod
+    def create_from_stats(cls, filename, stats, data_path='', content_hash=''):
+        """Create and save an upload record and its type summaries from an ingested EquipmentStats."""
+        upload = cls.from_stats(filename, stats, data_path, content_hash)
+        with transaction.atomic():
+            upload.save()
+            UploadTypeSummary.objects.bulk_create(upload.build_type_summaries(stats))
+        return upload
+    
+    def build_type_summaries(self, stats):
+        """Unsaved UploadTypeSummary rows of a saved upload, one per equipment type."""
+        # Types that collide once truncated share one summary
+        merged = EquipmentStats()
+        for equipment_type, count in stats.type_counts.items():
+            merged.merge_type(
+                str(equipment_type)[:UploadTypeSummary.TYPE_MAX_LENGTH],
+                count,
+                stats.type_sums.get(equipment_type),
+                stats.type_mins.get(equipment_type),
+                stats.type_maxs.get(equipment_type),
+            )
+        return [
+            UploadTypeSummary(
+                upload=self,
+                equipment_type=equipment_type,
+                count=count,
+                **UploadTypeSummary.statistic_fields(merged.type_summary(equipment_type)),
+            )
+            for equipment_type, count in merged.type_counts.items()
+        ]
+    
+    @property
+    def type_distribution(self):
+        """Equipment count per type; uses prefetched type summaries when available."""
+        return {summary.equipment_type: summary.count for summary in self.type_summaries.all()}
+    
+    @property
+    def type_statistics(self):
+        """Count and per-column mean/min/max per type; uses prefetched type summaries when available."""
+        return {summary.equipment_type: summary.statistics() for summary in self.type_summaries.all()}
+    
+    @classmethod
+    def find_by_content_hash(cls, content_hash):
+        """Return the upload of identical bytes, or None."""
+        if not content_hash:
+            return None
+        return cls.objects.filter(content_hash=content_hash).first()
+    
+    def get_stats(self):
+        """Return the stored EquipmentStats, or None for uploads without one."""
+        if not self.stats_state:
+            return None
+        try:
+            return EquipmentStats.from_json(self.stats_state)
+        except (ValueError, KeyError, TypeError):
+            return None
+    
+    @cached_property
+    def stats(self):
+        """
+        The stored EquipmentStats, parsed once per instance, or None.
+        
+        Shared by every reader of the instance, so it must not be modified;
+        use ``get_stats`` for a private copy.
+        """
+        return self.get_stats()
+    
+    def get_stats_with_histograms(self):
+        """Return the stored EquipmentStats with its histograms, or None when either is missing."""
+        stats = self.get_stats()
+        if stats is None or not self.histogram_state:
+            return None
+        try:
+            stats.load_histograms(json.loads(self.histogram_state))
+        except (ValueError, KeyError, TypeError):
+            return None
+        return stats
+    
+    def get_store(self):
+        """Return the ColumnarStore of the uploaded rows, or None if not stored."""
+        if not self.data_path:
+            return None
+        try:
+            return ColumnarStore.open(self.data_path)
+        except (OSError, ValueError):
+            return None
+
+
+class UploadTypeSummary(models.Model):
+    """
+    Equipment count and grouped statistics of one type within one upload.
+    
+    Lets type queries run in SQL: uploads containing a type, and per-type
+    totals across the upload history. The statistics are null for uploads
+    stored before they were tracked.
+    """
+    TYPE_MAX_LENGTH = 255
+    # Model field prefix of each EquipmentStats numeric column
+    STATISTIC_COLUMNS = {'Flowrate': 'flowrate', 'Pressure': 'pressure', 'Temperature': 'temperature'}
+    
+    upload = models.ForeignKey(
+        EquipmentUpload,
+        on_delete=models.CASCADE,
+        related_name='type_summaries',
+    )
+    equipment_type = models.CharField(max_length=TYPE_MAX_LENGTH)
+    count = models.IntegerField()
+    
+    avg_flowrate = models.FloatField(null=True, blank=True)
+    min_flowrate = models.FloatField(null=True, blank=True)
+    max_flowrate = models.FloatField(null=True, blank=True)
+    avg_pressure = models.FloatField(null=True, blank=True)
+    min_pressure = models.FloatField(null=True, blank=True)
+    max_pressure = models.FloatField(null=True, blank=True)
+    avg_temperature = models.FloatField(null=True, blank=True)
+    min_temperature = models.FloatField(null=True, blank=True)
+    max_temperature = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        # Insertion order, which follows first appearance in the file
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['upload', 'equipment_type'], name='unique_upload_equipment_type'),
+        ]
+        indexes = [
+            models.Index(fields=['equipment_type', 'upload'], name='type_summary_type_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.equipment_type}: {self.count} (upload {self.upload_id})"
+    
+    @classmethod
+    def statistic_fields(cls, type_summary):
+        """Model field values from ``EquipmentStats.type_summary`` output."""
+        fields = {}
+        for column, prefix in cls.STATISTIC_COLUMNS.items():
+            values = type_summary[column]
+            fields[f'avg_{prefix}'] = values['mean']
+            fields[f'min_{prefix}'] = values['min']
+            fields[f'max_{prefix}'] = values['max']
+        return fields
+    
+    def statistics(self):
+        """Count and mean/min/max per column, keyed like the upload's API fields."""
+        result = {'count': self.count}
+        for prefix in self.STATISTIC_COLUMNS.values():
+            result[prefix] = {
+                'mean': getattr(self, f'avg_{prefix}'),
+                'min': getattr(self, f'min_{prefix}'),
+                'max': getattr(self, f'max_{prefix}'),
+            }
+        return result
+
+
+class EquipmentReading(models.Model):
+    """
+    One equipment row of an upload, for row-level queries in the database.
+    
+    Loaded from the upload's column store by equipment_api.readings.
+    """
+    NAME_MAX_LENGTH = 255
+    TYPE_MAX_LENGTH = 255
+    
+    upload = models.ForeignKey(
+        EquipmentUpload,
+        on_delete=models.CASCADE,
+        related_name='readings',
+    )
+    name = models.CharField(max_length=NAME_MAX_LENGTH)
+    equipment_type = models.CharField(max_length=TYPE_MAX_LENGTH)
+    flowrate = models.FloatField()
+    pressure = models.FloatField()
+    temperature = models.FloatField()
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['equipment_type'], name='reading_type_idx'),
+            models.Index(fields=['upload', 'equipment_type'], name='reading_upload_type_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.equipment_type})"
+
+
+class EquipmentAnomaly(models.Model):
+    """
+    One outlying value of an upload, flagged by the anomaly stage.
+    
+    A value is scored against its whole column (scope 'column') and against
+    the rows of its equipment type (scope 'type'); each scope that flags it
+    stores one row. See equipment_api.anomalies.
+    """
+    SCOPE_COLUMN = 'column'
+    SCOPE_TYPE = 'type'
+    SCOPE_CHOICES = [
+        (SCOPE_COLUMN, 'Column'),
+        (SCOPE_TYPE, 'Type'),
+    ]
+    COLUMNS = ['flowrate', 'pressure', 'temperature']
+    NAME_MAX_LENGTH = 255
+    TYPE_MAX_LENGTH = 255
+    
+    upload = models.ForeignKey(
+        EquipmentUpload,
+        on_delete=models.CASCADE,
+        related_name='anomalies',
+    )
+    # Position of the row in the upload's column store
+    row = models.IntegerField()
+    name = models.CharField(max_length=NAME_MAX_LENGTH)
+    equipment_type = models.CharField(max_length=TYPE_MAX_LENGTH)
+    column = models.CharField(max_length=16)
+    value = models.FloatField()
+    scope = models.CharField(max_length=8, choices=SCOPE_CHOICES)
+    method = models.CharField(max_length=8)
+    # Method statistic; values above the method threshold are flagged
+    score = models.FloatField()
+    
+    class Meta:
+        ordering = ['-score', 'id']
+        indexes = [
+            models.Index(fields=['upload', 'score'], name='anomaly_upload_score_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} {self.column}={self.value} ({self.scope}, score {self.score:.1f})"
+
+
+class RollupBucket(models.Model):
+    """
+    Mergeable totals of the uploads committed in one bucket.
+    
+    Uploads are added to their buckets as they commit (see
+    equipment_api.rollups); averages are derived from the sums, so trend
+    queries read one row per bucket instead of every upload. Buckets keep the
+    totals of uploads later removed by retention.
+    """
+    day = models.DateField()
+    upload_count = models.IntegerField(default=0)
+    equipment_count = models.IntegerField(default=0)
+    flowrate_sum = models.FloatField(default=0.0)
+    pressure_sum = models.FloatField(default=0.0)
+    temperature_sum = models.FloatField(default=0.0)
+    
+    class Meta:
+        abstract = True
+    
+    def _average(self, total):
+        return total / self.equipment_count if self.equipment_count else None
+    
+    @property
+    def avg_flowrate(self):
+        return self._average(self.flowrate_sum)
+    
+    @property
+    def avg_pressure(self):
+        return self._average(self.pressure_sum)
+    
+    @property
+    def avg_temperature(self):
+        return self._average(self.temperature_sum)
+
+
+class DailyRollup(RollupBucket):
+    """Totals of all uploads committed on one day."""
+    
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day'], name='unique_daily_rollup_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day}: {self.equipment_count} rows in {self.upload_count} uploads"
+
+
+class DailyTypeRollup(RollupBucket):
+    """Totals of one equipment type over the uploads committed on one day."""
+    TYPE_MAX_LENGTH = 255
+    
+    equipment_type = models.CharField(max_length=TYPE_MAX_LENGTH)
+    
+    class Meta:
+        ordering = ['day', 'equipment_type']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'equipment_type'], name='unique_daily_type_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['equipment_type', 'day'], name='daily_type_rollup_type_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.equipment_type}: {self.equipment_count} rows"
+
+
+class UploadJob(models.Model):
+    """
+    Tracks an upload processed in the background job pool.
+    
+    The uploaded file is spooled to disk when the job is created; the worker
+    deletes the spool file once the job has finished.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATE_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    spool_path = models.CharField(max_length=500, blank=True, default='')
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    # Codec of a compressed upload ('gzip', 'bz2', 'zstd'); blank for plain CSV
+    compression = models.CharField(max_length=8, blank=True, default='')
+    size_bytes = models.BigIntegerField(default=0)
+    
+    state = models.CharField(max_length=16, choices=STATE_CHOICES, default=QUEUED)
+    rows_processed = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    upload = models.ForeignKey(
+        EquipmentUpload,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='jobs',
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.state})"
+
+
+class UploadSession(models.Model):
+    """
+    Resumable upload of one large file sent as numbered chunks.
+    
+    Chunks are written at their byte offset into a spool file, so a client
+    whose connection drops asks for the received offset and continues from
+    there. The file is processed when the session is completed.
+    """
+    OPEN = 'open'
+    PROCESSING = 'processing'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATE_CHOICES = [
+        (OPEN, 'Open'),
+        (PROCESSING, 'Processing'),
+        (COMPLETED, 'Completed'),
+        (FAILED, 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    spool_path = models.CharField(max_length=500, blank=True, default='')
+    # Total size announced by the client, if any
+    size_bytes = models.BigIntegerField(null=True, blank=True)
+    
+    state = models.CharField(max_length=16, choices=STATE_CHOICES, default=OPEN)
+    received_bytes = models.BigIntegerField(default=0)
+    last_chunk = models.IntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    upload = models.ForeignKey(
+        EquipmentUpload,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='sessions',
+    )
+    job = models.ForeignKey(
+        UploadJob,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='sessions',
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Session {self.id} ({self.state}) - {self.filename}"
+    
+    def remove_spool(self):
+        """Delete the session's spool file if it is still present."""
+        if self.spool_path and os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+    
+    @staticmethod
+    def cleanup_stale_sessions(max_age):
+        """Delete sessions not updated within ``max_age`` and their spool files."""
+        stale = UploadSession.objects.filter(
+            updated_at__lt=timezone.now() - max_age,
+        ).exclude(state=UploadSession.PROCESSING)
+        # Spool files of sessions handed to a job belong to the job
+        for session in stale.filter(job__isnull=True):
+            session.remove_spool()
+        stale.delete()
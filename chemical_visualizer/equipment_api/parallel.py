@@ -0,0 +1,296 @@
+"""
+Parallel ingest of a single large CSV file.
+
+The file is split into newline-aligned byte ranges that are parsed in a
+process pool; each worker returns a serialized EquipmentStats partial and the
+partials are merged in the parent, in range order. Ranges are aligned on raw
+newlines, which would split a quoted field holding a line break. Workers
+count the double quotes of their range while parsing it: a boundary is
+inside a quoted field exactly when an odd number of quotes precede it (an
+escaped quote adds two), and only then is the file parsed serially instead.
+
+The pool's workers are started with forkserver (spawn where it is not
+available) rather than forked from the server process, whose other threads
+may hold locks at the time of the fork.
+"""
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+
+from equipment_api.columnar import ColumnarPartWriter, ColumnarWriter
+from equipment_api.compression import decompress
+from equipment_api.excel import ingest_excel, is_excel
+from equipment_api.ingest import (
+    ChunkStream,
+    IngestError,
+    get_chunk_rows,
+    ingest_csv,
+    ingest_serial,
+    ingest_stream,
+    parse_errors,
+    parse_header,
+)
+from equipment_api.stats import EquipmentStats
+
+
+DEFAULT_PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class RangeStream(io.RawIOBase):
+    """Binary stream over the ``[start, end)`` byte range of a file, counting its double quotes."""
+
+    def __init__(self, fileobj, start, end):
+        super().__init__()
+        self._file = fileobj
+        self._file.seek(start)
+        self._remaining = end - start
+        self.quotes = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:min(len(buffer), self._remaining)]
+        size = self._file.readinto(view)
+        self._remaining -= size
+        self.quotes += view[:size].tobytes().count(b'"')
+        return size
+
+    def drain(self):
+        """Read the rest of the range, so ``quotes`` covers all of it."""
+        buffer = bytearray(1024 * 1024)
+        while self.readinto(buffer):
+            pass
+
+
+def get_worker_count():
+    """Number of processes used for parallel ingest."""
+    workers = getattr(settings, 'EQUIPMENT_INGEST_WORKERS', 0)
+    return workers or os.cpu_count() or 1
+
+
+def get_mp_context():
+    """Multiprocessing context of the pool: forkserver where available, otherwise spawn."""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def get_executor():
+    """Return the shared process pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=get_worker_count(),
+                mp_context=get_mp_context(),
+                initializer=django.setup,
+            )
+        return _executor
+
+
+def split_byte_ranges(path, parts):
+    """
+    Read the header and split the rest of a file into newline-aligned ranges.
+
+    Returns:
+        tuple: (header line as str, list of (start, end) byte offsets)
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header_line = f.readline().decode('utf-8-sig')
+        data_start = f.tell()
+
+        boundaries = [data_start]
+        step = max((size - data_start) // parts, 1)
+        for i in range(1, parts):
+            offset = data_start + i * step
+            if offset <= boundaries[-1] or offset >= size:
+                continue
+            f.seek(offset - 1)
+            # Move the boundary to the start of the next full line
+            f.readline()
+            boundaries.append(f.tell())
+        boundaries.append(size)
+
+    ranges = [
+        (start, end)
+        for start, end in zip(boundaries, boundaries[1:])
+        if end > start
+    ]
+    return header_line, ranges
+
+
+def ingest_range(path, header, start, end, chunk_rows, store_dir=None, index=0):
+    """
+    Parse one byte range in a worker process.
+
+    A range that starts inside a quoted field may fail to parse; its error is
+    returned rather than raised, with the quote count of the whole range, so
+    the parent can tell a misaligned range from an invalid file.
+
+    Returns:
+        tuple: (stats as a dict or None, column store part description or
+        None, number of double quotes in the range, (message, extra) of the
+        IngestError or None)
+    """
+    part = ColumnarPartWriter(store_dir, index) if store_dir else None
+    stats = error = None
+    try:
+        with open(path, 'rb') as f:
+            stream = RangeStream(f, start, end)
+            try:
+                stats = ingest_stream(stream, chunk_rows, header, sink=part).to_dict()
+            except IngestError as e:
+                stream.drain()
+                error = (e.message, e.extra)
+    finally:
+        part_info = part.close() if part else None
+    return stats, part_info, stream.quotes, error
+
+
+def split_inside_quotes(header_line, quote_counts):
+    """Whether any range boundary falls inside a quoted field."""
+    quotes = header_line.count('"')
+    for count in quote_counts[:-1]:
+        quotes += count
+        if quotes % 2:
+            return True
+    return False
+
+
+def ingest_csv_parallel(path, workers=None, chunk_rows=None, executor=None, progress=None, writer=None):
+    """
+    Parse a CSV file on disk across a process pool.
+
+    Args:
+        path (str): Path of the CSV file
+        workers (int): Number of byte ranges; defaults to the pool size
+        chunk_rows (int): Rows per chunk inside each worker
+        executor (Executor): Pool to use instead of the shared one
+        progress (callable): Optional callback receiving the running row
+            count each time a byte range finishes
+        writer (ColumnarWriter): Optional column store; each range is
+            written as one part and the store is finalized at the end
+
+    Partials are merged in range order, so the result does not depend on
+    which worker finishes first. If a range boundary splits a quoted field
+    holding a line break, the partials are dropped and the file is parsed
+    serially.
+
+    Returns:
+        EquipmentStats: Merged statistics over every valid row in the file
+    """
+    workers = workers or get_worker_count()
+    chunk_rows = chunk_rows or get_chunk_rows()
+    executor = executor or get_executor()
+
+    with parse_errors():
+        header_line, ranges = split_byte_ranges(path, workers)
+    header = parse_header(header_line)
+
+    store_dir = writer.directory if writer else None
+    futures = [
+        executor.submit(ingest_range, path, header, start, end, chunk_rows, store_dir, index)
+        for index, (start, end) in enumerate(ranges)
+    ]
+    partials = []
+    parts = []
+    quote_counts = []
+    errors = []
+    rows = 0
+    for future in futures:
+        range_stats, part_info, quotes, error = future.result()
+        quote_counts.append(quotes)
+        if part_info:
+            parts.append(part_info)
+        if error:
+            errors.append(error)
+            continue
+        partials.append(EquipmentStats.from_dict(range_stats))
+        rows += partials[-1].count
+        if progress:
+            progress(rows)
+
+    if split_inside_quotes(header_line, quote_counts):
+        if writer:
+            writer.remove_parts(parts)
+        with open(path, 'rb', buffering=0) as f:
+            return ingest_serial(f, chunk_rows, progress, writer)
+    if errors:
+        message, extra = errors[0]
+        raise IngestError(message, **extra)
+
+    stats = EquipmentStats()
+    for partial in partials:
+        stats.merge(partial)
+
+    if stats.count == 0:
+        raise IngestError('No valid data found in CSV')
+    if writer:
+        writer.finalize(parts)
+    return stats
+
+
+def ingest_file(path, store_dir=None, compression=None):
+    """
+    Ingest a whole CSV file in a worker process.
+
+    Used to process several files concurrently, one file per worker.
+
+    Returns:
+        dict: Serialized EquipmentStats of the file
+    """
+    writer = ColumnarWriter(store_dir) if store_dir else None
+    if is_excel(path):
+        return ingest_excel(path, writer=writer).to_dict()
+    with open(path, 'rb', buffering=0) as f:
+        return ingest_serial(decompress(f, compression), writer=writer).to_dict()
+
+
+def use_parallel(size):
+    """Whether a file of ``size`` bytes on disk should be parsed in parallel."""
+    min_bytes = getattr(settings, 'EQUIPMENT_PARALLEL_MIN_BYTES', DEFAULT_PARALLEL_MIN_BYTES)
+    return size >= min_bytes and get_worker_count() > 1
+
+
+def ingest_path(path, progress=None, writer=None, compression=None):
+    """
+    Ingest a CSV file on disk, in parallel when it is large enough.
+
+    Compressed files cannot be split into byte ranges and are always
+    decompressed and parsed serially; Excel workbooks are read row by row.
+    """
+    if is_excel(path):
+        return ingest_excel(path, progress=progress, writer=writer)
+    if compression is None and use_parallel(os.path.getsize(path)):
+        return ingest_csv_parallel(path, progress=progress, writer=writer)
+    with open(path, 'rb', buffering=0) as f:
+        return ingest_serial(decompress(f, compression), progress=progress, writer=writer)
+
+
+def ingest_uploaded_file(uploaded_file, writer=None, compression=None):
+    """
+    Ingest an uploaded CSV, in parallel when it is large and spooled to disk.
+
+    Small files, files held in memory and compressed files use the streaming
+    serial path; Excel workbooks are read row by row.
+    """
+    if is_excel(uploaded_file.name):
+        return ingest_excel(uploaded_file, writer=writer)
+    if compression is not None:
+        stream = decompress(ChunkStream(uploaded_file.chunks()), compression)
+        return ingest_serial(stream, writer=writer)
+    if hasattr(uploaded_file, 'temporary_file_path') and use_parallel(uploaded_file.size):
+        return ingest_csv_parallel(uploaded_file.temporary_file_path(), writer=writer)
+    return ingest_csv(uploaded_file, writer=writer)
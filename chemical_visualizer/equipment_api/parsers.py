@@ -0,0 +1,42 @@
+"""
+Request parsers for equipment_api.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import FileUploadParser
+
+from equipment_api.compression import compression_for
+from equipment_api.ingest import IngestError
+
+
+class CSVBodyParser(FileUploadParser):
+    """
+    Parses a raw ``text/csv`` request body as the ``csv_file`` upload.
+
+    The body may be sent with ``Content-Encoding: gzip`` (or ``zstd``); the
+    codec is recorded on the file as ``content_encoding`` and the body is
+    decompressed while it is parsed, not here. The file name comes from the
+    Content-Disposition header and defaults to ``upload.csv``; ``mode`` may be
+    passed as a query parameter.
+    """
+    media_type = 'text/csv'
+    default_filename = 'upload.csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = request.META.get('HTTP_CONTENT_ENCODING')
+        try:
+            compression_for('', encoding)
+        except IngestError as e:
+            raise ParseError(e.message)
+
+        uploaded_file = super().parse(stream, media_type, parser_context).files['file']
+        uploaded_file.content_encoding = encoding
+
+        data = {'csv_file': uploaded_file}
+        if 'mode' in request.query_params:
+            data['mode'] = request.query_params['mode']
+        return data
+
+    def get_filename(self, stream, media_type, parser_context):
+        return super().get_filename(stream, media_type, parser_context) or self.default_filename
@@ -3,7 +3,6 @@ PDF Report Generation Utility
 Generates professional PDF reports for equipment uploads.
 """
 import io
-import json
 from datetime import datetime
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -13,6 +12,34 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 
 
+# Version of the report layout; bump it whenever the report's content or
+# look changes so that cached renderings are not served (see report_cache)
+REPORT_TEMPLATE_VERSION = 1
+
+# Most anomalies listed in a report
+REPORT_ANOMALY_ROWS = 20
+
+# Column pairs listed per type in the correlation section
+CORRELATION_PAIRS = [(0, 1), (0, 2), (1, 2)]
+
+
+def correlation_color(value):
+    """Heatmap cell colour: white at 0, shading to red at +1 and blue at -1."""
+    if value is None:
+        return colors.HexColor('#eeeeee')
+    full = colors.HexColor('#d6604d') if value > 0 else colors.HexColor('#4393c3')
+    weight = min(abs(value), 1.0)
+    return colors.Color(
+        1 + (full.red - 1) * weight,
+        1 + (full.green - 1) * weight,
+        1 + (full.blue - 1) * weight,
+    )
+
+
+def format_correlation(value):
+    return '-' if value is None else f"{value:+.2f}"
+
+
 def generate_equipment_report(upload):
     """
     Generate a PDF report for an equipment upload.
@@ -70,7 +97,7 @@ def generate_equipment_report(upload):
     header_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e8f0f7')),
         ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), TA_LEFT),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
         ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
         ('FONTSIZE', (0, 0), (-1, -1), 10),
         ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
@@ -95,7 +122,7 @@ def generate_equipment_report(upload):
     stats_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2e5c8a')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), TA_CENTER),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
         ('FONTSIZE', (0, 0), (-1, 0), 11),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
@@ -107,13 +134,43 @@ def generate_equipment_report(upload):
     elements.append(stats_table)
     elements.append(Spacer(1, 0.3*inch))
     
+    # Detailed Statistics Section (from the stored stats state)
+    stats = upload.get_stats()
+    if stats:
+        elements.append(Paragraph("Detailed Statistics", heading_style))
+        
+        detail_data = [['Metric', 'Mean', 'Std Dev', 'Min', 'Median', 'P95', 'Max']]
+        for column, summary in stats.summary().items():
+            if not summary['count']:
+                continue
+            detail_data.append([column] + [
+                f"{summary[key]:.2f}"
+                for key in ('mean', 'std', 'min', 'median', 'p95', 'max')
+            ])
+        
+        detail_table = Table(detail_data, colWidths=[1.2*inch] + [0.8*inch] * 6)
+        detail_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2e5c8a')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('TOPPADDING', (0, 0), (-1, 0), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cccccc')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9f9f9')]),
+        ]))
+        elements.append(detail_table)
+        elements.append(Spacer(1, 0.3*inch))
+        
+        correlations = stats.correlation_summary()
+        if correlations:
+            elements.extend(correlation_elements(correlations, heading_style, normal_style))
+    
     # Equipment Type Distribution Section
     elements.append(Paragraph("Equipment Type Distribution", heading_style))
     
-    try:
-        type_dist = json.loads(upload.type_distribution)
-    except (json.JSONDecodeError, TypeError):
-        type_dist = {}
+    type_dist = upload.type_distribution
     
     if type_dist:
         dist_data = [['Equipment Type', 'Count']]
@@ -124,7 +181,7 @@ def generate_equipment_report(upload):
         dist_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2e5c8a')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), TA_CENTER),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
             ('FONTSIZE', (0, 0), (-1, 0), 11),
             ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
@@ -139,6 +196,42 @@ def generate_equipment_report(upload):
     
     elements.append(Spacer(1, 0.3*inch))
     
+    # Anomalies Section (values flagged as outliers at ingest)
+    if upload.anomaly_count:
+        elements.append(Paragraph("Anomalies", heading_style))
+        elements.append(Paragraph(
+            f"{upload.anomaly_count} outlying values flagged; "
+            f"the {min(upload.anomaly_count, REPORT_ANOMALY_ROWS)} highest scores are listed.",
+            normal_style
+        ))
+        elements.append(Spacer(1, 0.1*inch))
+        
+        anomaly_data = [['Equipment', 'Type', 'Column', 'Value', 'Scope', 'Score']]
+        for anomaly in upload.anomalies.all()[:REPORT_ANOMALY_ROWS]:
+            anomaly_data.append([
+                anomaly.name[:30],
+                anomaly.equipment_type[:20],
+                anomaly.column,
+                f"{anomaly.value:.2f}",
+                anomaly.scope,
+                f"{anomaly.score:.1f}",
+            ])
+        
+        anomaly_table = Table(anomaly_data, colWidths=[1.7*inch, 1.3*inch, 1.0*inch, 0.9*inch, 0.7*inch, 0.7*inch])
+        anomaly_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2e5c8a')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('TOPPADDING', (0, 0), (-1, 0), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cccccc')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9f9f9')]),
+        ]))
+        elements.append(anomaly_table)
+        elements.append(Spacer(1, 0.3*inch))
+    
     # Footer
     footer_style = ParagraphStyle(
         'Footer',
@@ -156,3 +249,79 @@ def generate_equipment_report(upload):
     doc.build(elements)
     buffer.seek(0)
     return buffer.getvalue()
+
+
+def correlation_elements(correlations, heading_style, normal_style):
+    """
+    Report elements for the correlation section: a heatmap table of the
+    overall correlation matrix, then each type's pairwise correlations.
+    
+    Args:
+        correlations (dict): ``EquipmentStats.correlation_summary()`` output
+    
+    Returns:
+        list: Flowables to append to the report
+    """
+    columns = correlations['columns']
+    matrix = correlations['overall']['correlation']
+    elements = [
+        Paragraph("Correlation", heading_style),
+        Paragraph(
+            "Pearson correlation between the numeric columns; red cells move together, "
+            "blue cells move in opposite directions.",
+            normal_style
+        ),
+        Spacer(1, 0.1*inch),
+    ]
+    
+    heatmap_data = [[''] + columns]
+    for column, row in zip(columns, matrix):
+        heatmap_data.append([column] + [format_correlation(value) for value in row])
+    heatmap_style = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2e5c8a')),
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#2e5c8a')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cccccc')),
+    ]
+    for i, row in enumerate(matrix, start=1):
+        for j, value in enumerate(row, start=1):
+            heatmap_style.append(('BACKGROUND', (j, i), (j, i), correlation_color(value)))
+    heatmap_table = Table(heatmap_data, colWidths=[1.5*inch] * (len(columns) + 1))
+    heatmap_table.setStyle(TableStyle(heatmap_style))
+    elements.append(heatmap_table)
+    elements.append(Spacer(1, 0.2*inch))
+    
+    if correlations['types']:
+        type_data = [['Equipment Type', 'Count'] + [
+            f"{columns[a]} / {columns[b]}" for a, b in CORRELATION_PAIRS
+        ]]
+        type_style = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2e5c8a')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('TOPPADDING', (0, 0), (-1, 0), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cccccc')),
+        ]
+        for i, (equipment_type, summary) in enumerate(sorted(correlations['types'].items()), start=1):
+            values = [summary['correlation'][a][b] for a, b in CORRELATION_PAIRS]
+            type_data.append([equipment_type[:20], str(summary['count'])] + [
+                format_correlation(value) for value in values
+            ])
+            for j, value in enumerate(values, start=2):
+                type_style.append(('BACKGROUND', (j, i), (j, i), correlation_color(value)))
+        type_table = Table(type_data, colWidths=[1.5*inch, 0.8*inch] + [1.4*inch] * len(CORRELATION_PAIRS))
+        type_table.setStyle(TableStyle(type_style))
+        elements.append(type_table)
+    
+    elements.append(Spacer(1, 0.3*inch))
+    return elements
@@ -0,0 +1,86 @@
+"""
+Upload processing pipeline shared by the upload view and background jobs.
+
+Ingests a file into EquipmentStats, persists its rows in a column store and
+creates the EquipmentUpload record, its anomaly flags and its daily rollup
+increments in one transaction, then loads its EquipmentReading rows after
+the commit.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from equipment_api.anomalies import find_anomalies, save_anomalies
+from equipment_api.columnar import ColumnarStore, ColumnarWriter, remove_store
+from equipment_api.models import EquipmentUpload
+from equipment_api.parallel import ingest_path, ingest_uploaded_file
+from equipment_api.readings import load_committed_readings
+from equipment_api.rollups import add_to_rollups
+
+
+class DuplicateUpload(Exception):
+    """Raised when a concurrent upload of identical bytes was saved first."""
+
+    def __init__(self, upload):
+        super().__init__(f'Identical bytes were saved as upload {upload.pk}')
+        self.upload = upload
+
+
+def store_rows_enabled():
+    """Whether uploaded rows are kept in a per-upload column store."""
+    return getattr(settings, 'EQUIPMENT_STORE_ROWS', True)
+
+
+def ingest_upload(uploaded_file=None, path=None, progress=None, compression=None):
+    """
+    Ingest an uploaded file or a spooled file on disk.
+
+    ``compression`` names the codec of a compressed file ('gzip', 'bz2' or
+    'zstd'); see ``equipment_api.compression``.
+
+    Returns:
+        tuple: (EquipmentStats, column store path relative to MEDIA_ROOT or '')
+    """
+    writer = ColumnarWriter.create() if store_rows_enabled() else None
+    try:
+        if path is not None:
+            stats = ingest_path(path, progress=progress, writer=writer, compression=compression)
+        else:
+            stats = ingest_uploaded_file(uploaded_file, writer=writer, compression=compression)
+    except Exception:
+        if writer:
+            writer.discard()
+        raise
+    return stats, writer.relative_path if writer else ''
+
+
+def process_upload(filename, uploaded_file=None, path=None, progress=None, content_hash='', compression=None):
+    """
+    Run the full pipeline for one file and return the created EquipmentUpload.
+
+    Raises:
+        IngestError: If the file cannot be parsed into equipment statistics
+        DuplicateUpload: If identical bytes were saved while this file was
+            being parsed
+    """
+    stats, data_path = ingest_upload(uploaded_file, path, progress, compression)
+    try:
+        anomalies = find_anomalies(ColumnarStore.open(data_path) if data_path else None)
+        with transaction.atomic():
+            upload = EquipmentUpload.create_from_stats(
+                filename, stats, data_path=data_path, content_hash=content_hash
+            )
+            save_anomalies(upload, anomalies)
+            add_to_rollups([(upload, stats)])
+    except IntegrityError:
+        remove_store(data_path)
+        existing = EquipmentUpload.find_by_content_hash(content_hash)
+        if existing is None:
+            raise
+        raise DuplicateUpload(existing)
+    except Exception:
+        remove_store(data_path)
+        raise
+
+    # Outside the upload's transaction, so the write lock is held per block
+    load_committed_readings([upload])
+    return upload
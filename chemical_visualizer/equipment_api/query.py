@@ -0,0 +1,298 @@
+"""
+Filter, projection and aggregation queries over an upload's stored rows.
+
+Predicates from the query string become NumPy boolean masks over the
+memory-mapped columns of the upload's column store (see
+equipment_api.columnar): numeric comparisons run directly on the float64
+columns and type filters compare int32 type codes, so no row is decoded
+unless it is returned. Matching rows are decoded and written out in blocks,
+which lets the view stream large results.
+
+Query parameters:
+- ``<column>`` / ``<column>__<op>`` for flowrate, pressure and temperature,
+  with op one of gt, gte, lt, lte, ne (no op means equal)
+- ``type``: equipment type, or several separated by commas
+- ``fields``: comma-separated columns to return (default: all)
+- ``agg``: comma-separated aggregates (count, sum, mean, min, max, std)
+- ``group_by``: 'type' to aggregate per equipment type
+- ``limit`` / ``offset``: window of matching rows to return
+"""
+import csv
+import io
+import json
+
+import numpy as np
+from django.conf import settings
+
+
+# API field name -> column store column
+FIELDS = {
+    'name': 'Equipment Name',
+    'type': 'Type',
+    'flowrate': 'Flowrate',
+    'pressure': 'Pressure',
+    'temperature': 'Temperature',
+}
+NUMERIC_FIELDS = ['flowrate', 'pressure', 'temperature']
+
+OPERATORS = {
+    '': np.equal,
+    'gt': np.greater,
+    'gte': np.greater_equal,
+    'lt': np.less,
+    'lte': np.less_equal,
+    'ne': np.not_equal,
+}
+AGGREGATES = ['count', 'sum', 'mean', 'min', 'max', 'std']
+GROUP_BY_FIELDS = ['type']
+
+# Query parameters that are not row predicates
+CONTROL_PARAMS = {'fields', 'agg', 'group_by', 'limit', 'offset', 'output', 'format'}
+
+DEFAULT_QUERY_LIMIT = 1000
+DEFAULT_QUERY_MAX_ROWS = 100000
+STREAM_BLOCK_ROWS = 1000
+
+
+class QueryError(Exception):
+    """Raised when query parameters do not form a valid query."""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+    def as_response_data(self):
+        """Return the error payload used by the API views."""
+        return {'error': self.message}
+
+
+def get_query_limits():
+    """Default and maximum number of rows one query returns."""
+    return (
+        getattr(settings, 'EQUIPMENT_QUERY_DEFAULT_LIMIT', DEFAULT_QUERY_LIMIT),
+        getattr(settings, 'EQUIPMENT_QUERY_MAX_ROWS', DEFAULT_QUERY_MAX_ROWS),
+    )
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _non_negative_int(params, name, default):
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise QueryError(f'{name} must be a non-negative integer.')
+    return number
+
+
+class EquipmentQuery:
+    """A parsed query: predicates, projection, aggregation and row window."""
+
+    def __init__(self, predicates=(), types=None, fields=None, aggregates=None,
+                 group_by=None, limit=DEFAULT_QUERY_LIMIT, offset=0):
+        self.predicates = list(predicates)
+        self.types = types
+        self.fields = fields or list(FIELDS)
+        self.aggregates = aggregates or []
+        self.group_by = group_by
+        self.limit = limit
+        self.offset = offset
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Build a query from request query parameters.
+
+        Raises:
+            QueryError: On unknown fields, operators or aggregates, or
+                non-numeric comparison values
+        """
+        predicates = []
+        types = None
+        for key in params:
+            if key in CONTROL_PARAMS:
+                continue
+            if key == 'type':
+                types = _split(params[key])
+                continue
+            field, _, op = key.partition('__')
+            if field not in NUMERIC_FIELDS:
+                raise QueryError(f'Unknown filter: {key}')
+            if op not in OPERATORS:
+                raise QueryError(f'Unknown operator in {key}; use one of gt, gte, lt, lte, ne.')
+            try:
+                value = float(params[key])
+            except ValueError:
+                raise QueryError(f'{key} must be a number.')
+            predicates.append((FIELDS[field], OPERATORS[op], value))
+
+        fields = _split(params.get('fields', '')) or None
+        unknown = [field for field in fields or [] if field not in FIELDS]
+        if unknown:
+            raise QueryError(f'Unknown fields: {", ".join(unknown)}')
+
+        aggregates = _split(params.get('agg', '')) or None
+        unknown = [agg for agg in aggregates or [] if agg not in AGGREGATES]
+        if unknown:
+            raise QueryError(f'Unknown aggregates: {", ".join(unknown)}; use {", ".join(AGGREGATES)}.')
+
+        group_by = params.get('group_by') or None
+        if group_by is not None and group_by not in GROUP_BY_FIELDS:
+            raise QueryError('group_by must be type.')
+        if group_by and not aggregates:
+            aggregates = ['count']
+
+        default_limit, max_rows = get_query_limits()
+        limit = min(_non_negative_int(params, 'limit', default_limit), max_rows)
+        offset = _non_negative_int(params, 'offset', 0)
+        return cls(predicates, types, fields, aggregates, group_by, limit, offset)
+
+    @property
+    def is_aggregate(self):
+        return bool(self.aggregates)
+
+    def mask(self, store):
+        """Boolean mask of the store rows matching every predicate."""
+        mask = np.ones(store.rows, dtype=bool)
+        if self.types is not None:
+            wanted = [code for code, name in enumerate(store.type_categories) if name in self.types]
+            mask &= np.isin(store.type_codes(), wanted)
+        for column, operator, value in self.predicates:
+            # Writes into the existing mask, so each predicate costs one pass
+            mask &= operator(store.numeric(column), value)
+        return mask
+
+    def aggregate(self, store, mask):
+        """
+        Aggregate the matching rows.
+
+        Returns:
+            dict: ``{'matched': n, 'aggregates': {...}}``, or with group_by
+            ``{'matched': n, 'groups': [{'type': ..., 'aggregates': {...}}]}``
+        """
+        numeric = [field for field in self.fields if field in NUMERIC_FIELDS] or NUMERIC_FIELDS
+        matched = int(np.count_nonzero(mask))
+        if self.group_by is None:
+            return {
+                'matched': matched,
+                'aggregates': {
+                    field: _aggregate(store.numeric(FIELDS[field])[mask], self.aggregates)
+                    for field in numeric
+                },
+            }
+
+        codes = store.type_codes()[mask]
+        groups = len(store.type_categories)
+        counts = np.bincount(codes, minlength=groups)
+        per_field = {
+            field: _grouped_aggregate(store.numeric(FIELDS[field])[mask], codes, counts, self.aggregates)
+            for field in numeric
+        }
+        return {
+            'matched': matched,
+            'groups': [
+                {
+                    'type': store.type_categories[code],
+                    'count': int(counts[code]),
+                    'aggregates': {field: per_field[field][code] for field in numeric},
+                }
+                for code in np.flatnonzero(counts)
+            ],
+        }
+
+    def row_indices(self, mask):
+        """Indices of the matching rows inside the limit/offset window."""
+        return np.flatnonzero(mask)[self.offset:self.offset + self.limit]
+
+    def iter_row_blocks(self, store, indices, block_rows=STREAM_BLOCK_ROWS):
+        """Yield the projected rows at ``indices`` as lists of value lists, block by block."""
+        for start in range(0, len(indices), block_rows):
+            rows = indices[start:start + block_rows]
+            columns = []
+            for field in self.fields:
+                values = store.column(FIELDS[field], rows)
+                columns.append(values if isinstance(values, list) else values.tolist())
+            yield [list(row) for row in zip(*columns)]
+
+    def stream_json(self, store, mask):
+        """Yield a JSON document of the matching rows in chunks."""
+        indices = self.row_indices(mask)
+        header = {
+            'matched': int(np.count_nonzero(mask)),
+            'returned': len(indices),
+            'offset': self.offset,
+            'fields': self.fields,
+        }
+        yield json.dumps(header)[:-1] + ', "data": ['
+        first = True
+        for block in self.iter_row_blocks(store, indices):
+            text = ', '.join(json.dumps(dict(zip(self.fields, row))) for row in block)
+            yield text if first else ', ' + text
+            first = False
+        yield ']}'
+
+    def stream_csv(self, store, mask):
+        """Yield CSV text of the matching rows in chunks, with a header row."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.fields)
+        for block in self.iter_row_blocks(store, self.row_indices(mask)):
+            writer.writerows(block)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+
+def _aggregate(values, aggregates):
+    result = {}
+    for agg in aggregates:
+        if agg == 'count':
+            result[agg] = int(values.size)
+        elif not values.size:
+            result[agg] = None
+        elif agg == 'sum':
+            result[agg] = float(values.sum())
+        elif agg == 'mean':
+            result[agg] = float(values.mean())
+        elif agg == 'min':
+            result[agg] = float(values.min())
+        elif agg == 'max':
+            result[agg] = float(values.max())
+        elif agg == 'std':
+            # Sample standard deviation, as in ColumnStats
+            result[agg] = float(values.std(ddof=1)) if values.size > 1 else 0.0
+    return result
+
+
+def _grouped_aggregate(values, codes, counts, aggregates):
+    """Aggregates of ``values`` per type code, as a list indexed by code."""
+    groups = len(counts)
+    sums = np.bincount(codes, weights=values, minlength=groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    computed = {'count': counts.astype(float), 'sum': sums, 'mean': means}
+    if 'min' in aggregates:
+        computed['min'] = np.full(groups, np.inf)
+        np.minimum.at(computed['min'], codes, values)
+    if 'max' in aggregates:
+        computed['max'] = np.full(groups, -np.inf)
+        np.maximum.at(computed['max'], codes, values)
+    if 'std' in aggregates:
+        m2 = np.bincount(codes, weights=np.square(values - means[codes]), minlength=groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            computed['std'] = np.where(counts > 1, np.sqrt(m2 / (counts - 1)), 0.0)
+
+    return [
+        {
+            agg: (int(counts[code]) if agg == 'count' else float(computed[agg][code]))
+            for agg in aggregates
+        }
+        for code in range(groups)
+    ]
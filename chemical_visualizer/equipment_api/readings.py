@@ -0,0 +1,180 @@
+"""
+Loading upload rows into the EquipmentReading table.
+
+Rows are read back from the upload's column store in blocks. On PostgreSQL
+each block is streamed into the table with COPY; other backends insert it
+with chunked ``bulk_create``. Either way the rows of one upload are never
+materialized as one Python list.
+
+Readings are loaded after the upload is committed, each block in its own
+short transaction, so a large upload never holds the database write lock
+(on SQLite, the whole database) for its full row load. The upload's
+``readings_state`` tells complete readings from missing or partial ones;
+failed loads are retried with ``manage.py load_readings``.
+"""
+import csv
+import io
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from equipment_api.models import EquipmentReading, EquipmentUpload
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_READINGS_BATCH_SIZE = 5000
+
+READING_COLUMNS = ['upload_id', 'name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+
+
+def readings_enabled():
+    """Whether upload rows are loaded into EquipmentReading."""
+    return getattr(settings, 'EQUIPMENT_STORE_READINGS', True)
+
+
+def get_readings_batch_size():
+    """Rows per bulk_create batch, and per COPY block."""
+    return getattr(settings, 'EQUIPMENT_READINGS_BATCH_SIZE', DEFAULT_READINGS_BATCH_SIZE)
+
+
+def iter_store_blocks(store, block_rows):
+    """
+    Yield the rows of a column store in blocks of decoded columns.
+
+    Yields:
+        tuple: (names, types, flowrates, pressures, temperatures) lists
+    """
+    for start in range(0, store.rows, block_rows):
+        rows = slice(start, min(start + block_rows, store.rows))
+        yield (
+            [name[:EquipmentReading.NAME_MAX_LENGTH] for name in store.names(rows)],
+            [str(equipment_type)[:EquipmentReading.TYPE_MAX_LENGTH] for equipment_type in store.types(rows)],
+            store.numeric('Flowrate')[rows].tolist(),
+            store.numeric('Pressure')[rows].tolist(),
+            store.numeric('Temperature')[rows].tolist(),
+        )
+
+
+def load_readings(upload, store=None, batch_size=None, method=None):
+    """
+    Load every row of an upload's column store into EquipmentReading.
+
+    Call after the upload is committed: each block is written in its own
+    transaction.
+
+    Args:
+        upload (EquipmentUpload): Saved upload whose rows are loaded
+        store (ColumnarStore): Defaults to ``upload.get_store()``
+        batch_size (int): Rows per batch
+        method (str): 'copy' or 'bulk'; defaults to 'copy' on PostgreSQL
+
+    Returns:
+        int: Number of rows loaded
+    """
+    store = store or upload.get_store()
+    if store is None:
+        return 0
+    batch_size = batch_size or get_readings_batch_size()
+    method = method or ('copy' if connection.vendor == 'postgresql' else 'bulk')
+    if method == 'copy':
+        return copy_readings(upload, store, batch_size)
+    return bulk_insert_readings(upload, store, batch_size)
+
+
+def bulk_insert_readings(upload, store, batch_size):
+    """Insert the rows with ``bulk_create``, one block at a time."""
+    loaded = 0
+    for names, types, flowrates, pressures, temperatures in iter_store_blocks(store, batch_size):
+        with transaction.atomic():
+            EquipmentReading.objects.bulk_create(
+                [
+                    EquipmentReading(
+                        upload_id=upload.pk,
+                        name=name,
+                        equipment_type=equipment_type,
+                        flowrate=flowrate,
+                        pressure=pressure,
+                        temperature=temperature,
+                    )
+                    for name, equipment_type, flowrate, pressure, temperature
+                    in zip(names, types, flowrates, pressures, temperatures)
+                ],
+                batch_size=batch_size,
+            )
+        loaded += len(names)
+    return loaded
+
+
+def copy_readings(upload, store, batch_size):
+    """Stream the rows into the table with PostgreSQL COPY, one CSV block at a time."""
+    sql = (
+        f'COPY {EquipmentReading._meta.db_table} ({", ".join(READING_COLUMNS)}) '
+        'FROM STDIN WITH (FORMAT csv)'
+    )
+    loaded = 0
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        for names, types, flowrates, pressures, temperatures in iter_store_blocks(store, batch_size):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                zip([upload.pk] * len(names), names, types, flowrates, pressures, temperatures)
+            )
+            with transaction.atomic():
+                if hasattr(raw, 'copy_expert'):
+                    # psycopg2
+                    buffer.seek(0)
+                    raw.copy_expert(sql, buffer)
+                else:
+                    # psycopg 3
+                    with raw.copy(sql) as copy:
+                        copy.write(buffer.getvalue())
+            loaded += len(names)
+    return loaded
+
+
+def load_committed_readings(uploads):
+    """
+    Load the readings of committed uploads when the readings table is enabled.
+
+    A failed load leaves the upload in place without readings: the rows
+    loaded so far are removed, the error is logged and the upload's
+    ``readings_state`` is set to failed, since the upload's statistics and
+    column store are already committed and valid.
+
+    Returns:
+        int: Number of rows loaded
+    """
+    if not readings_enabled():
+        return 0
+    loaded = 0
+    for upload in uploads:
+        _set_readings_state(upload, EquipmentUpload.READINGS_LOADING)
+        try:
+            loaded += load_readings(upload)
+        except Exception:
+            logger.exception("Loading readings of upload %s failed", upload.pk)
+            EquipmentReading.objects.filter(upload_id=upload.pk).delete()
+            _set_readings_state(upload, EquipmentUpload.READINGS_FAILED)
+        else:
+            _set_readings_state(upload, EquipmentUpload.READINGS_LOADED)
+    return loaded
+
+
+def _set_readings_state(upload, state):
+    upload.readings_state = state
+    EquipmentUpload.objects.filter(pk=upload.pk).update(readings_state=state)
+
+
+def reload_failed_readings():
+    """
+    Retry the readings load of every upload whose last load failed.
+
+    Returns:
+        tuple: (number of uploads retried, number of them now loaded)
+    """
+    uploads = list(EquipmentUpload.objects.filter(readings_state=EquipmentUpload.READINGS_FAILED))
+    load_committed_readings(uploads)
+    return len(uploads), sum(upload.readings_state == EquipmentUpload.READINGS_LOADED for upload in uploads)
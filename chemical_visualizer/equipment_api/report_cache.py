@@ -0,0 +1,134 @@
+"""
+Disk cache of rendered PDF reports.
+
+An upload's data never changes once committed, so its report is rendered
+once and kept under EQUIPMENT_REPORT_CACHE_DIR, keyed by upload id, upload
+time (so a reused id never matches another upload's report) and
+REPORT_TEMPLATE_VERSION (bumped whenever the report layout changes, so old
+renderings are never served). The cache is bounded by
+EQUIPMENT_REPORT_CACHE_MAX_BYTES: after each render the least recently
+served reports are removed until the rest fit. Serving a report records the
+access in the file's atime, independent of how the filesystem is mounted.
+
+A cached file's mtime is the time it was rendered and serves as the
+report's Last-Modified; its ETag combines the key with that mtime, so a
+report rendered again after eviction gets a new ETag.
+"""
+import glob
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.utils.http import http_date
+
+from equipment_api.pdf_utils import REPORT_TEMPLATE_VERSION, generate_equipment_report
+
+
+DEFAULT_REPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def get_report_cache_dir():
+    """Directory holding the rendered reports."""
+    return getattr(settings, 'EQUIPMENT_REPORT_CACHE_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'report_cache')
+
+
+def get_report_cache_max_bytes():
+    """Most bytes of reports kept on disk; 0 disables the cache."""
+    return getattr(settings, 'EQUIPMENT_REPORT_CACHE_MAX_BYTES', DEFAULT_REPORT_CACHE_MAX_BYTES)
+
+
+def report_path(upload, version=REPORT_TEMPLATE_VERSION):
+    uploaded = int(upload.uploaded_at.timestamp() * 1_000_000)
+    return os.path.join(get_report_cache_dir(), f'report_{upload.id}_{uploaded:x}_v{version}.pdf')
+
+
+def report_validators(upload_id, stat):
+    """
+    Conditional request validators of a cached report.
+
+    Returns:
+        tuple: (strong ETag, Last-Modified as an HTTP date)
+    """
+    etag = f'"{upload_id}-v{REPORT_TEMPLATE_VERSION}-{stat.st_mtime_ns:x}"'
+    return etag, http_date(stat.st_mtime)
+
+
+def _write_report(path, content):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def evict_reports(max_bytes, keep=None):
+    """
+    Remove the least recently served reports until the rest fit in ``max_bytes``.
+
+    ``keep`` is a path that is never removed, such as the report just rendered.
+
+    Returns:
+        int: Number of reports removed
+    """
+    entries = []
+    total = 0
+    for path in glob.glob(os.path.join(get_report_cache_dir(), 'report_*.pdf')):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_atime, stat.st_size, path))
+        total += stat.st_size
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def open_report(upload):
+    """
+    Open the cached report of an upload, rendering it first when missing.
+
+    Returns:
+        tuple: (report file opened for binary reading, its os.stat_result)
+    """
+    path = report_path(upload)
+    try:
+        report = open(path, 'rb')
+    except FileNotFoundError:
+        _write_report(path, generate_equipment_report(upload))
+        evict_reports(get_report_cache_max_bytes(), keep=path)
+        report = open(path, 'rb')
+
+    stat = os.fstat(report.fileno())
+    # Record the access for eviction without touching the mtime validators
+    try:
+        os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+    except FileNotFoundError:
+        pass
+    return report, stat
+
+
+def remove_reports(upload_id):
+    """Delete the cached reports of an upload, for every template version."""
+    for path in glob.glob(os.path.join(get_report_cache_dir(), f'report_{upload_id}_*.pdf')):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,194 @@
+"""
+Resumable chunked uploads.
+
+A client creates an UploadSession, PUTs numbered chunks at byte offsets into
+the session's spool file, asks for the received offset after an interrupted
+transfer and resumes from there, then completes the session to have the file
+processed like a regular upload.
+"""
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from equipment_api.compression import compression_for
+from equipment_api.ingest import IngestError
+from equipment_api.jobs import get_spool_dir, queue_upload_job
+from equipment_api.models import EquipmentUpload, UploadSession
+from equipment_api.pipeline import DuplicateUpload, process_upload
+from equipment_api.upload_handlers import hash_chunks
+
+
+DEFAULT_CHUNK_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_SESSION_TTL_HOURS = 24
+
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+class OffsetConflict(Exception):
+    """Raised when a chunk starts beyond the bytes received so far."""
+
+    def __init__(self, offset):
+        super().__init__(f'Expected a chunk at offset {offset} or earlier')
+        self.offset = offset
+
+
+def get_chunk_max_bytes():
+    """Largest chunk accepted in one request."""
+    return getattr(settings, 'EQUIPMENT_UPLOAD_CHUNK_MAX_BYTES', DEFAULT_CHUNK_MAX_BYTES)
+
+
+def get_session_ttl():
+    """How long an idle session is kept before it is removed."""
+    return timedelta(hours=getattr(settings, 'EQUIPMENT_UPLOAD_SESSION_TTL_HOURS', DEFAULT_SESSION_TTL_HOURS))
+
+
+def create_session(filename, size_bytes=None):
+    """Create an open session with an empty spool file."""
+    UploadSession.cleanup_stale_sessions(get_session_ttl())
+
+    _, extension = os.path.splitext(filename)
+    fd, path = tempfile.mkstemp(suffix=extension, dir=get_spool_dir())
+    os.close(fd)
+    return UploadSession.objects.create(filename=filename, spool_path=path, size_bytes=size_bytes)
+
+
+def write_chunk(session, index, offset, stream, length):
+    """
+    Write one chunk of ``length`` bytes from ``stream`` at ``offset``.
+
+    A chunk may start at or before the received offset, so a retried chunk is
+    simply written again. If the connection drops mid-chunk, the bytes that
+    did arrive are kept and the received offset reflects them.
+
+    Returns:
+        UploadSession: The session with its updated received offset
+
+    Raises:
+        OffsetConflict: If the chunk would leave a gap in the file
+        IngestError: If the session is closed or the chunk exceeds its size
+    """
+    if session.state != UploadSession.OPEN:
+        raise IngestError(f'Upload session is {session.state}')
+    if offset > session.received_bytes:
+        raise OffsetConflict(session.received_bytes)
+    if session.size_bytes is not None and offset + length > session.size_bytes:
+        raise IngestError(
+            f'Chunk ends at byte {offset + length}, beyond the declared size of {session.size_bytes}'
+        )
+
+    written = 0
+    with open(session.spool_path, 'r+b') as f:
+        f.seek(offset)
+        while written < length:
+            data = stream.read(min(COPY_BUFFER_BYTES, length - written))
+            if not data:
+                break
+            f.write(data)
+            written += len(data)
+
+    # Row update instead of save(): concurrent retries only ever move the offset forward
+    UploadSession.objects.filter(pk=session.pk).update(
+        received_bytes=Greatest('received_bytes', Value(offset + written)),
+        last_chunk=index,
+        updated_at=timezone.now(),
+    )
+    session.refresh_from_db()
+    return session
+
+
+def complete_session(session, mode='sync'):
+    """
+    Process the assembled file of a session.
+
+    Returns:
+        tuple: ('created' or 'duplicate', EquipmentUpload) for a processed
+               file, or ('queued', UploadJob) when ``mode`` is 'async'
+
+    Raises:
+        IngestError: If the session is not complete or the file is invalid
+    """
+    if session.size_bytes is not None and session.received_bytes != session.size_bytes:
+        raise IngestError(
+            f'Upload incomplete: received {session.received_bytes} of {session.size_bytes} bytes',
+            offset=session.received_bytes,
+        )
+    if session.received_bytes == 0:
+        raise IngestError('No data received')
+
+    # Only one request may complete a session
+    claimed = UploadSession.objects.filter(pk=session.pk, state=UploadSession.OPEN).update(
+        state=UploadSession.PROCESSING,
+        updated_at=timezone.now(),
+    )
+    if not claimed:
+        session.refresh_from_db()
+        raise IngestError(f'Upload session is {session.state}')
+
+    try:
+        # Drop bytes written by an interrupted chunk that were never acknowledged
+        os.truncate(session.spool_path, session.received_bytes)
+        with open(session.spool_path, 'rb') as f:
+            content_hash = hash_chunks(iter(lambda: f.read(COPY_BUFFER_BYTES), b''))
+        compression = compression_for(session.filename)
+
+        existing = EquipmentUpload.find_by_content_hash(content_hash)
+        if existing:
+            session.remove_spool()
+            _finish(session, UploadSession.COMPLETED, upload=existing)
+            return 'duplicate', existing
+
+        if mode == 'async':
+            job = queue_upload_job(
+                session.filename,
+                session.spool_path,
+                size_bytes=session.received_bytes,
+                content_hash=content_hash,
+                compression=compression,
+            )
+            _finish(session, UploadSession.COMPLETED, job=job)
+            return 'queued', job
+
+        try:
+            upload = process_upload(
+                session.filename,
+                path=session.spool_path,
+                content_hash=content_hash,
+                compression=compression,
+            )
+        except DuplicateUpload as e:
+            _finish(session, UploadSession.COMPLETED, upload=e.upload)
+            return 'duplicate', e.upload
+        finally:
+            session.remove_spool()
+        _finish(session, UploadSession.COMPLETED, upload=upload)
+        return 'created', upload
+    except Exception as e:
+        error = e.message if isinstance(e, IngestError) else f'Error processing file: {str(e)}'
+        _finish(session, UploadSession.FAILED, error=error)
+        raise
+
+
+def _finish(session, state, **fields):
+    for name, value in fields.items():
+        setattr(session, name, value)
+    session.state = state
+    session.save()
+
+
+def abort_session(session):
+    """
+    Delete an open or finished session and its spool file.
+
+    Raises:
+        IngestError: If the session is being processed
+    """
+    if session.state == UploadSession.PROCESSING:
+        raise IngestError('Upload session is processing')
+    if session.job_id is None:
+        session.remove_spool()
+    session.delete()
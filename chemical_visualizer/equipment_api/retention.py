@@ -0,0 +1,157 @@
+"""
+Retention of stored uploads.
+
+Uploads beyond the newest EQUIPMENT_RETENTION_COUNT, or older than
+EQUIPMENT_RETENTION_DAYS, are pruned in bounded batches: each batch is one
+short transaction, so SQLite is never locked for a large delete. An upload
+can own millions of EquipmentReading rows, so a batch's readings are deleted
+first, EQUIPMENT_PRUNE_READINGS_BATCH_SIZE rows per transaction, before the
+upload rows themselves. Pruning runs
+from the ``prune_uploads`` management command or from a background thread
+started with the server process, never in the upload request itself.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from equipment_api.models import EquipmentReading, EquipmentUpload
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_COUNT = 100
+DEFAULT_RETENTION_DAYS = 0
+DEFAULT_PRUNE_BATCH_SIZE = 500
+DEFAULT_PRUNE_READINGS_BATCH_SIZE = 10000
+DEFAULT_PRUNE_INTERVAL_SECONDS = 600
+
+_pruner = None
+_pruner_lock = threading.Lock()
+
+
+def get_retention_policy():
+    """
+    Configured retention limits.
+
+    Returns:
+        tuple: (maximum uploads kept or None, maximum age as a timedelta or None)
+    """
+    max_count = getattr(settings, 'EQUIPMENT_RETENTION_COUNT', DEFAULT_RETENTION_COUNT)
+    max_days = getattr(settings, 'EQUIPMENT_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    return (max_count or None, timedelta(days=max_days) if max_days else None)
+
+
+def get_prune_batch_size():
+    """Number of uploads deleted per transaction."""
+    return getattr(settings, 'EQUIPMENT_PRUNE_BATCH_SIZE', DEFAULT_PRUNE_BATCH_SIZE)
+
+
+def get_prune_readings_batch_size():
+    """Number of readings deleted per transaction."""
+    return getattr(settings, 'EQUIPMENT_PRUNE_READINGS_BATCH_SIZE', DEFAULT_PRUNE_READINGS_BATCH_SIZE)
+
+
+def delete_readings(upload_ids, batch_size=None):
+    """
+    Delete the readings of the given uploads, one bounded transaction per batch.
+
+    Returns:
+        int: Number of readings deleted
+    """
+    batch_size = batch_size or get_prune_readings_batch_size()
+    readings = EquipmentReading.objects.filter(upload_id__in=upload_ids)
+    deleted = 0
+    while True:
+        ids = list(readings.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            EquipmentReading.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+
+def expired_upload_ids(max_count=None, max_age=None, limit=DEFAULT_PRUNE_BATCH_SIZE):
+    """Ids of up to ``limit`` uploads that fall outside the retention limits."""
+    ids = []
+    if max_age is not None:
+        cutoff = timezone.now() - max_age
+        ids += EquipmentUpload.objects.filter(uploaded_at__lt=cutoff).values_list('id', flat=True)[:limit]
+    if max_count is not None and len(ids) < limit:
+        newest_first = EquipmentUpload.objects.order_by('-uploaded_at', '-id').values_list('id', flat=True)
+        seen = set(ids)
+        ids += [
+            upload_id for upload_id in newest_first[max_count:max_count + limit - len(ids)]
+            if upload_id not in seen
+        ]
+    return ids
+
+
+def prune_uploads(max_count=None, max_age=None, batch_size=None):
+    """
+    Delete every upload outside the retention limits, one batch at a time.
+
+    Limits default to the configured policy. Deleting an upload also removes
+    its readings (beforehand, in their own batches), type summaries and
+    column store.
+
+    Returns:
+        int: Number of uploads deleted
+    """
+    if max_count is None and max_age is None:
+        max_count, max_age = get_retention_policy()
+    if max_count is None and max_age is None:
+        return 0
+    batch_size = batch_size or get_prune_batch_size()
+
+    deleted = 0
+    while True:
+        ids = expired_upload_ids(max_count, max_age, batch_size)
+        if not ids:
+            return deleted
+        delete_readings(ids)
+        with transaction.atomic():
+            EquipmentUpload.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+
+def _pruner_loop(interval):
+    # The first pass runs at once, so a restarted server does not wait out
+    # a whole interval before applying the policy
+    while True:
+        close_old_connections()
+        try:
+            deleted = prune_uploads()
+            if deleted:
+                logger.info("Pruned %d uploads", deleted)
+        except Exception:
+            logger.exception("Upload pruning failed")
+        finally:
+            close_old_connections()
+        time.sleep(interval)
+
+
+def start_pruner():
+    """
+    Start the background pruning thread of this process, once.
+
+    Does nothing when EQUIPMENT_PRUNE_INTERVAL_SECONDS is 0, for deployments
+    that schedule ``manage.py prune_uploads`` instead.
+    """
+    global _pruner
+    interval = getattr(settings, 'EQUIPMENT_PRUNE_INTERVAL_SECONDS', DEFAULT_PRUNE_INTERVAL_SECONDS)
+    if not interval:
+        return
+    with _pruner_lock:
+        if _pruner is None:
+            _pruner = threading.Thread(
+                target=_pruner_loop,
+                args=(interval,),
+                name='upload-pruner',
+                daemon=True,
+            )
+            _pruner.start()
@@ -0,0 +1,129 @@
+"""
+Incrementally maintained daily rollups of committed uploads.
+
+When an upload commits, its row count and column sums are added to the
+DailyRollup of its day, and its per-type counts and sums to the
+DailyTypeRollup rows of that day, with F() increments inside the upload's
+transaction. Earlier uploads are never re-read, so a trend query costs one
+row per day (and type) however many uploads it covers.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from equipment_api.models import DailyRollup, DailyTypeRollup, EquipmentUpload
+from equipment_api.stats import NUMERIC_COLUMNS
+
+
+# Rollup sum fields, in NUMERIC_COLUMNS order
+SUM_FIELDS = ['flowrate_sum', 'pressure_sum', 'temperature_sum']
+
+
+def rollup_day(upload):
+    """The day bucket of an upload, in the local time zone."""
+    return timezone.localdate(upload.uploaded_at)
+
+
+def upload_totals(stats):
+    """Rollup increments of one upload, as a dict of field deltas."""
+    totals = {'upload_count': 1, 'equipment_count': stats.count}
+    for field, column in zip(SUM_FIELDS, NUMERIC_COLUMNS):
+        totals[field] = stats.columns[column].sum
+    return totals
+
+
+def type_totals(stats):
+    """Rollup increments of one upload per (truncated) equipment type."""
+    totals = {}
+    for equipment_type, count in stats.type_counts.items():
+        key = str(equipment_type)[:DailyTypeRollup.TYPE_MAX_LENGTH]
+        entry = totals.setdefault(key, {'upload_count': 1, 'equipment_count': 0, **dict.fromkeys(SUM_FIELDS, 0.0)})
+        entry['equipment_count'] += count
+        for field, column in zip(SUM_FIELDS, NUMERIC_COLUMNS):
+            entry[field] += stats.type_sum(equipment_type, column)
+    return totals
+
+
+def _accumulate(buckets, key, totals):
+    bucket = buckets.setdefault(key, dict.fromkeys(totals, 0))
+    for field, value in totals.items():
+        bucket[field] += value
+
+
+def _increment(model, key, totals):
+    # Create the bucket if missing, then add to it in SQL, so concurrent
+    # commits to the same bucket never overwrite each other
+    model.objects.bulk_create([model(**key)], ignore_conflicts=True)
+    model.objects.filter(**key).update(**{field: F(field) + value for field, value in totals.items()})
+
+
+def add_to_rollups(entries):
+    """
+    Add committed uploads to their daily rollups.
+
+    Call inside the transaction that saves the uploads, so an upload and its
+    rollup increments commit together.
+
+    Args:
+        entries: Iterable of (saved EquipmentUpload, its EquipmentStats) pairs
+    """
+    daily = {}
+    by_type = {}
+    for upload, stats in entries:
+        day = rollup_day(upload)
+        _accumulate(daily, day, upload_totals(stats))
+        for equipment_type, totals in type_totals(stats).items():
+            _accumulate(by_type, (day, equipment_type), totals)
+
+    for day, totals in daily.items():
+        _increment(DailyRollup, {'day': day}, totals)
+    for (day, equipment_type), totals in by_type.items():
+        _increment(DailyTypeRollup, {'day': day, 'equipment_type': equipment_type}, totals)
+
+
+def fill_type_sums(upload, stats):
+    """
+    Compute missing per-type sums of an older stats state from the column store.
+
+    Returns:
+        bool: Whether ``stats`` now has per-type sums
+    """
+    if stats.type_sums or not stats.type_counts:
+        return True
+    store = upload.get_store()
+    if store is None:
+        return False
+    codes = store.type_codes()
+    for column in NUMERIC_COLUMNS:
+        sums = np.bincount(codes, weights=store.numeric(column), minlength=len(store.type_categories))
+        for equipment_type, value in zip(store.type_categories, sums.tolist()):
+            if equipment_type in stats.type_counts:
+                stats.type_sums.setdefault(equipment_type, [0.0] * len(NUMERIC_COLUMNS))
+                stats.type_sums[equipment_type][NUMERIC_COLUMNS.index(column)] = value
+    return True
+
+
+def rebuild_rollups():
+    """
+    Recompute all rollups from the uploads still stored.
+
+    For backfilling; totals of uploads already pruned are lost. Per-type sums
+    missing from older stats states are recomputed from the column store, or
+    counted as zero when the rows were not kept.
+
+    Returns:
+        int: Number of uploads added to the rollups
+    """
+    added = 0
+    with transaction.atomic():
+        DailyRollup.objects.all().delete()
+        DailyTypeRollup.objects.all().delete()
+        for upload in EquipmentUpload.objects.order_by('id').iterator():
+            stats = upload.get_stats()
+            if stats is None:
+                continue
+            fill_type_sums(upload, stats)
+            add_to_rollups([(upload, stats)])
+            added += 1
+    return added
@@ -2,16 +2,27 @@
 Serializers for equipment API - converts models to JSON and validates data.
 """
 from rest_framework import serializers
-from equipment_api.models import EquipmentUpload
-import json
+from equipment_api.models import EquipmentAnomaly, EquipmentUpload, UploadJob, UploadSession
+from equipment_api.batch import get_batch_limits
+from equipment_api.compression import is_supported_upload
+import os
 
 
 class EquipmentUploadSerializer(serializers.ModelSerializer):
     """Serializer for equipment upload history."""
     
-    # Parse type_distribution from JSON string to dict
+    # Equipment count per type, from the upload's type summaries
     type_distribution = serializers.SerializerMethodField()
     
+    # Count and per-column mean/min/max per type, from the upload's type summaries
+    type_statistics = serializers.SerializerMethodField()
+    
+    # Derived per-column statistics from the stored stats state
+    statistics = serializers.SerializerMethodField()
+    
+    # Covariance and correlation matrices of the numeric columns, overall and per type
+    correlations = serializers.SerializerMethodField()
+    
     class Meta:
         model = EquipmentUpload
         fields = [
@@ -23,6 +34,11 @@ class EquipmentUploadSerializer(serializers.ModelSerializer):
             'avg_pressure',
             'avg_temperature',
             'type_distribution',
+            'type_statistics',
+            'statistics',
+            'correlations',
+            'anomaly_count',
+            'readings_state',
         ]
         read_only_fields = [
             'id',
@@ -33,25 +49,195 @@ class EquipmentUploadSerializer(serializers.ModelSerializer):
             'avg_pressure',
             'avg_temperature',
             'type_distribution',
+            'type_statistics',
+            'statistics',
+            'correlations',
+            'anomaly_count',
+            'readings_state',
         ]
     
     def get_type_distribution(self, obj):
-        """Convert JSON string to dict."""
-        try:
-            return json.loads(obj.type_distribution)
-        except (json.JSONDecodeError, TypeError):
-            return {}
+        """Map each equipment type to its count."""
+        return obj.type_distribution
+    
+    def get_type_statistics(self, obj):
+        """Map each equipment type to its count and column statistics."""
+        return obj.type_statistics
+    
+    def get_statistics(self, obj):
+        """Summarize the stored stats state per numeric column."""
+        return obj.stats.summary() if obj.stats else {}
+    
+    def get_correlations(self, obj):
+        """Covariance and correlation matrices from the stored co-moments."""
+        return obj.stats.correlation_summary() if obj.stats else {}
+
+
+class EquipmentAnomalySerializer(serializers.ModelSerializer):
+    """Serializer for values flagged as outliers at ingest."""
+    
+    class Meta:
+        model = EquipmentAnomaly
+        fields = [
+            'row',
+            'name',
+            'equipment_type',
+            'column',
+            'value',
+            'scope',
+            'method',
+            'score',
+        ]
+        read_only_fields = fields
 
 
 class CSVUploadSerializer(serializers.Serializer):
     """Serializer for CSV file upload."""
     csv_file = serializers.FileField(
         required=True,
-        help_text="CSV file with columns: Equipment Name, Type, Flowrate, Pressure, Temperature"
+        help_text="CSV file with columns: Equipment Name, Type, Flowrate, Pressure, Temperature; "
+                  "may be compressed as .csv.gz, .csv.bz2 or .csv.zst, or be an .xlsx workbook"
+    )
+    mode = serializers.ChoiceField(
+        choices=['sync', 'async'],
+        default='sync',
+        help_text="'async' queues the file as a background job instead of processing it in the request"
     )
     
     def validate_csv_file(self, value):
-        """Validate that the uploaded file is a CSV."""
-        if not value.name.endswith('.csv'):
-            raise serializers.ValidationError("File must be a CSV file.")
+        """Validate that the uploaded file is a plain or compressed CSV, or an .xlsx workbook."""
+        if not is_supported_upload(value.name):
+            raise serializers.ValidationError("File must be a CSV file (.csv, .csv.gz, .csv.bz2 or .csv.zst) or an Excel workbook (.xlsx).")
+        return value
+
+
+class UploadJobSerializer(serializers.ModelSerializer):
+    """Serializer for background upload job status."""
+    
+    upload_id = serializers.IntegerField(read_only=True, allow_null=True)
+    
+    class Meta:
+        model = UploadJob
+        fields = [
+            'id',
+            'filename',
+            'state',
+            'rows_processed',
+            'size_bytes',
+            'upload_id',
+            'error',
+            'created_at',
+            'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class BatchUploadSerializer(serializers.Serializer):
+    """Serializer for batch uploads of several CSV files or a ZIP archive."""
+    files = serializers.ListField(
+        child=serializers.FileField(),
+        required=False,
+        allow_empty=True,
+        help_text="CSV files, each with the same columns as a single upload"
+    )
+    archive = serializers.FileField(
+        required=False,
+        help_text="ZIP archive of CSV files"
+    )
+    
+    def validate_files(self, value):
+        """Validate that every uploaded file is a plain or compressed CSV, or an .xlsx workbook."""
+        max_files, _ = get_batch_limits()
+        if len(value) > max_files:
+            raise serializers.ValidationError(f"At most {max_files} files per batch.")
+        for uploaded_file in value:
+            if not is_supported_upload(uploaded_file.name):
+                raise serializers.ValidationError(f"{uploaded_file.name}: File must be a CSV file or an .xlsx workbook.")
         return value
+    
+    def validate_archive(self, value):
+        """Validate that the archive is a ZIP file."""
+        if not value.name.lower().endswith('.zip'):
+            raise serializers.ValidationError("Archive must be a ZIP file.")
+        return value
+    
+    def validate(self, attrs):
+        if not attrs.get('files') and not attrs.get('archive'):
+            raise serializers.ValidationError("Provide CSV files, a ZIP archive, or both.")
+        return attrs
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """Serializer for opening a resumable upload session."""
+    filename = serializers.CharField(
+        max_length=255,
+        help_text="Name of the file being uploaded (.csv, .csv.gz, .csv.bz2, .csv.zst or .xlsx)"
+    )
+    size = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Total size of the file in bytes; completion is refused until all bytes arrived"
+    )
+    
+    def validate_filename(self, value):
+        """Validate that the file is a plain or compressed CSV, or an .xlsx workbook."""
+        value = os.path.basename(value)
+        if not is_supported_upload(value):
+            raise serializers.ValidationError("File must be a CSV file (.csv, .csv.gz, .csv.bz2 or .csv.zst) or an Excel workbook (.xlsx).")
+        return value
+
+
+class UploadSessionCompleteSerializer(serializers.Serializer):
+    """Serializer for completing a resumable upload session."""
+    mode = serializers.ChoiceField(
+        choices=['sync', 'async'],
+        default='sync',
+        help_text="'async' queues the assembled file as a background job"
+    )
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for resumable upload session state."""
+    
+    offset = serializers.IntegerField(source='received_bytes', read_only=True)
+    upload_id = serializers.IntegerField(read_only=True, allow_null=True)
+    job_id = serializers.UUIDField(read_only=True, allow_null=True)
+    
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id',
+            'filename',
+            'size_bytes',
+            'offset',
+            'last_chunk',
+            'state',
+            'error',
+            'upload_id',
+            'job_id',
+            'created_at',
+            'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class TypeTotalSerializer(serializers.Serializer):
+    """Serializer for per-type equipment totals across the upload history."""
+    equipment_type = serializers.CharField()
+    total = serializers.IntegerField()
+    uploads = serializers.IntegerField()
+
+
+class DailyRollupSerializer(serializers.Serializer):
+    """Serializer for the daily totals of committed uploads."""
+    day = serializers.DateField()
+    uploads = serializers.IntegerField(source='upload_count')
+    equipment_count = serializers.IntegerField()
+    avg_flowrate = serializers.FloatField()
+    avg_pressure = serializers.FloatField()
+    avg_temperature = serializers.FloatField()
+
+
+class DailyTypeRollupSerializer(DailyRollupSerializer):
+    """Serializer for the daily totals of one equipment type."""
+    equipment_type = serializers.CharField()
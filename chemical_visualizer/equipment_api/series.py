@@ -0,0 +1,198 @@
+"""
+Downsampled per-row series of an upload's numeric columns, for charts.
+
+Plotting every reading of a multi-million-row upload overwhelms browsers and
+the desktop canvas, so a column is reduced to about ``points`` (row index,
+value) pairs read from the column store:
+
+- ``lttb``: Largest-Triangle-Three-Buckets; keeps, per bucket of rows, the
+  point forming the largest triangle with the point kept before it and the
+  mean of the next bucket, which preserves the visual shape of the line
+- ``minmax``: the lowest and highest value of every bucket of rows, in row
+  order, which keeps every peak and dip
+
+Bucket sums, minima and maxima come from whole-array reductions; LTTB's
+choice in each bucket depends on the previous one, so it loops over buckets
+with a vectorized argmax inside. A series never changes once the upload is
+committed, so it is memoized in the Django cache per (upload, column,
+method, points) for EQUIPMENT_SERIES_CACHE_SECONDS.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from equipment_api.query import QueryError
+from equipment_api.stats import NUMERIC_COLUMNS
+
+
+METHODS = ('lttb', 'minmax')
+DEFAULT_SERIES_METHOD = 'lttb'
+DEFAULT_SERIES_POINTS = 1000
+MAX_SERIES_POINTS = 10000
+DEFAULT_SERIES_CACHE_SECONDS = 600
+
+# API column name -> column store column
+COLUMNS = {column.lower(): column for column in NUMERIC_COLUMNS}
+
+
+def get_series_cache_seconds():
+    """Seconds a memoized series is kept."""
+    return getattr(settings, 'EQUIPMENT_SERIES_CACHE_SECONDS', DEFAULT_SERIES_CACHE_SECONDS)
+
+
+def series_cache_key(upload_id, column, method, points):
+    return f'equipment_api:series:{upload_id}:{column}:{method}:{points}'
+
+
+def series_options(params):
+    """
+    Keyword arguments of ``get_series`` from request query parameters.
+
+    Query parameters:
+    - ``column``: API column name (required)
+    - ``points``: most points returned
+    - ``method``: 'lttb' or 'minmax'
+
+    Raises:
+        QueryError: On a missing or unknown column, method or point count
+    """
+    column = params.get('column')
+    if column not in COLUMNS:
+        raise QueryError(f'column must be one of {", ".join(COLUMNS)}.')
+
+    method = params.get('method') or DEFAULT_SERIES_METHOD
+    if method not in METHODS:
+        raise QueryError(f'method must be one of {", ".join(METHODS)}.')
+
+    points = params.get('points')
+    if points in (None, ''):
+        points = DEFAULT_SERIES_POINTS
+    else:
+        try:
+            points = int(points)
+        except ValueError:
+            points = 0
+        if not 3 <= points <= MAX_SERIES_POINTS:
+            raise QueryError(f'points must be an integer from 3 to {MAX_SERIES_POINTS}.')
+
+    return {'column': COLUMNS[column], 'method': method, 'points': points}
+
+
+def split_buckets(values, buckets):
+    """
+    Split ``values`` into at most ``buckets`` runs of equal width.
+
+    Returns:
+        tuple: (width, 2-D view with one full run per row, the shorter
+        remaining values)
+    """
+    width = -(-values.shape[0] // buckets)
+    full = values.shape[0] // width * width
+    return width, values[:full].reshape(-1, width), values[full:]
+
+
+def minmax_decimate(values, points):
+    """
+    Rows of the lowest and highest value of each of ``points // 2`` buckets.
+
+    Returns:
+        ndarray: Selected row indices in ascending order
+    """
+    if values.shape[0] <= points:
+        return np.arange(values.shape[0])
+    width, grid, tail = split_buckets(values, points // 2)
+    starts = np.arange(grid.shape[0]) * width
+    rows = [starts + grid.argmin(axis=1), starts + grid.argmax(axis=1)]
+    if tail.size:
+        rows.append(grid.size + np.array([tail.argmin(), tail.argmax()]))
+    return np.unique(np.concatenate(rows))
+
+
+def lttb_decimate(values, points):
+    """
+    Rows kept by Largest-Triangle-Three-Buckets.
+
+    The first and last rows are always kept; the rows between them are split
+    into ``points - 2`` buckets, each contributing one row.
+
+    Returns:
+        ndarray: Selected row indices in ascending order
+    """
+    size = values.shape[0]
+    if size <= points:
+        return np.arange(size)
+    width, grid, tail = split_buckets(values[1:size - 1], points - 2)
+    buckets = [*grid, tail] if tail.size else list(grid)
+
+    # Centroid of every bucket, the last row standing in after the final one
+    starts = 1 + np.arange(len(buckets)) * width
+    mean_y = grid.mean(axis=1)
+    mean_x = starts[:grid.shape[0]] + (width - 1) / 2
+    if tail.size:
+        mean_y = np.append(mean_y, tail.mean())
+        mean_x = np.append(mean_x, starts[-1] + (tail.size - 1) / 2)
+    mean_y = np.append(mean_y, values[size - 1])
+    mean_x = np.append(mean_x, size - 1)
+
+    rows = np.empty(len(buckets) + 2, dtype=np.int64)
+    rows[0], rows[-1] = 0, size - 1
+    a_x, a_y = 0.0, float(values[0])
+    for i, bucket in enumerate(buckets):
+        c_x, c_y = mean_x[i + 1], mean_y[i + 1]
+        # Twice the triangle area is |(a_x - c_x) * (b_y - a_y) - (a_x - b_x) * (c_y - a_y)|,
+        # linear in the candidate (b_x, b_y) = (start + j, bucket[j])
+        offsets = np.arange(bucket.size)
+        area = np.abs((a_x - c_x) * (bucket - a_y) + (starts[i] + offsets - a_x) * (c_y - a_y))
+        j = int(area.argmax())
+        rows[i + 1] = starts[i] + j
+        a_x, a_y = float(rows[i + 1]), float(bucket[j])
+    return rows
+
+
+DECIMATORS = {
+    'lttb': lttb_decimate,
+    'minmax': minmax_decimate,
+}
+
+
+def downsample(store, column, method=DEFAULT_SERIES_METHOD, points=DEFAULT_SERIES_POINTS):
+    """
+    Downsampled series of one numeric column of a column store.
+
+    Returns:
+        dict: ``{'rows', 'x', 'y'}`` with the total row count, the kept row
+        indices and their values
+    """
+    values = np.asarray(store.numeric(column))
+    rows = DECIMATORS[method](values, points)
+    return {
+        'rows': store.rows,
+        'x': rows.tolist(),
+        'y': values[rows].tolist(),
+    }
+
+
+def get_series(upload, column, method=DEFAULT_SERIES_METHOD, points=DEFAULT_SERIES_POINTS):
+    """
+    Memoized downsampled series of an upload's column.
+
+    Returns:
+        dict: ``downsample`` result with the column, method and point count,
+        or None when the upload's rows are not stored
+    """
+    key = series_cache_key(upload.id, column, method, points)
+    series = cache.get(key)
+    if series is not None:
+        return series
+
+    store = upload.get_store()
+    if store is None:
+        return None
+    series = {
+        'column': column.lower(),
+        'method': method,
+        'points': points,
+        **downsample(store, column, method, points),
+    }
+    cache.set(key, series, get_series_cache_seconds())
+    return series
@@ -0,0 +1,49 @@
+"""
+Signal handlers for equipment_api.
+"""
+import functools
+import logging
+
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from equipment_api.columnar import remove_store
+from equipment_api.jobs import recover_stale_jobs
+from equipment_api.models import EquipmentUpload
+from equipment_api.report_cache import remove_reports
+from equipment_api.retention import start_pruner
+
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=EquipmentUpload)
+def delete_upload_store(sender, instance, **kwargs):
+    """Remove the column store of a deleted upload once the delete commits."""
+    transaction.on_commit(functools.partial(remove_store, instance.data_path))
+
+
+@receiver(post_delete, sender=EquipmentUpload)
+def delete_upload_reports(sender, instance, **kwargs):
+    """Remove the cached PDF reports of a deleted upload once the delete commits."""
+    transaction.on_commit(functools.partial(remove_reports, instance.pk))
+
+
+@receiver(request_started, dispatch_uid='equipment_api.first_request')
+def start_background_work(sender, **kwargs):
+    """
+    Start the background work of a server process on its first request.
+
+    Recovers the jobs of the previous process and starts the pruner. Runs
+    once per process, when the database is known to be migrated, rather than
+    in AppConfig.ready() where queries are discouraged and management
+    commands would start a pruner too.
+    """
+    request_started.disconnect(dispatch_uid='equipment_api.first_request')
+    try:
+        recover_stale_jobs()
+    except Exception:
+        logger.exception("Recovering interrupted upload jobs failed")
+    start_pruner()
@@ -0,0 +1,689 @@
+"""
+Mergeable online statistics for equipment metrics.
+
+Every accumulator here can be updated chunk by chunk and merged with another
+partial state, so statistics from different chunks, processes or uploads can
+be combined without rescanning the underlying rows. States serialize to plain
+JSON-compatible dicts for storage on ``EquipmentUpload.stats_state``.
+"""
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+
+NUMERIC_COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
+
+STATS_STATE_VERSION = 1
+DEFAULT_COMPRESSION = 100
+
+# Most bins a Histogram keeps; the bin width doubles to stay within it
+DEFAULT_HISTOGRAM_BINS = 64
+MIN_HISTOGRAM_EXPONENT = -30
+
+
+class TDigest:
+    """
+    Approximate quantile sketch in the style of a merging t-digest.
+
+    Values are kept as weighted centroids; compression groups centroids by the
+    arcsine scale function so the tails stay precise while the middle of the
+    distribution is summarized coarsely. At most ``compression + 1`` centroids
+    survive each compression.
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def total_weight(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        """Add an array of values, each with weight 1."""
+        values = np.asarray(values, dtype='float64')
+        if values.size:
+            self._compress(
+                np.concatenate([self.means, values]),
+                np.concatenate([self.weights, np.ones(values.size)]),
+            )
+
+    def merge(self, other):
+        """Fold another digest into this one."""
+        if other.weights.size:
+            self._compress(
+                np.concatenate([self.means, other.means]),
+                np.concatenate([self.weights, other.weights]),
+            )
+
+    def _compress(self, means, weights):
+        order = np.argsort(means)
+        means = means[order]
+        weights = weights[order]
+
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = np.floor(self.compression * (np.arcsin(np.clip(2 * q - 1, -1, 1)) / np.pi + 0.5))
+        # k is non-decreasing, so consecutive runs of equal k form the groups
+        groups = np.concatenate([[0], np.cumsum(k[1:] != k[:-1])])
+
+        self.weights = np.bincount(groups, weights=weights)
+        self.means = np.bincount(groups, weights=means * weights) / self.weights
+
+    def quantile(self, q, minimum=None, maximum=None):
+        """
+        Estimate the value at quantile ``q`` (0 <= q <= 1).
+
+        ``minimum``/``maximum`` pin the ends of the interpolation to the exact
+        extremes when the caller tracks them.
+        """
+        if not self.weights.size:
+            return None
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        lo = self.means[0] if minimum is None else minimum
+        hi = self.means[-1] if maximum is None else maximum
+        xs = np.concatenate([[0.0], centers, [total]])
+        ys = np.concatenate([[lo], self.means, [hi]])
+        return float(np.interp(q * total, xs, ys))
+
+    def to_dict(self):
+        return {
+            'compression': self.compression,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(data.get('compression', DEFAULT_COMPRESSION))
+        digest.means = np.asarray(data.get('means', []), dtype='float64')
+        digest.weights = np.asarray(data.get('weights', []), dtype='float64')
+        return digest
+
+
+class Histogram:
+    """
+    Fixed-width histogram with power-of-two bin widths, mergeable without rescanning.
+
+    Bin ``i`` covers ``[i * 2**exponent, (i + 1) * 2**exponent)``. Bins of two
+    histograms line up once both use the larger exponent, and doubling the
+    width just adds neighbouring bins, so partial histograms of chunks,
+    processes or uploads merge into exactly the histogram of all their
+    values at that width. The width doubles whenever the values would span
+    more than ``max_bins`` bins, which bounds the state whatever the number
+    of values.
+    """
+
+    def __init__(self, max_bins=DEFAULT_HISTOGRAM_BINS):
+        self.max_bins = max_bins
+        self.exponent = None
+        self.offset = 0
+        self.counts = np.zeros(0, dtype='int64')
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    @property
+    def width(self):
+        return None if self.exponent is None else 2.0 ** self.exponent
+
+    def _bounds(self, exponent):
+        """First and last bin index of the current bins at a (larger) exponent."""
+        shift = exponent - self.exponent
+        return self.offset >> shift, (self.offset + self.counts.size - 1) >> shift
+
+    def _resize(self, exponent, low_index, high_index):
+        """Rebin to ``exponent`` over bins low_index..high_index, which cover the current bins."""
+        counts = np.zeros(high_index - low_index + 1, dtype='int64')
+        if self.counts.size:
+            indices = (np.arange(self.counts.size, dtype='int64') + self.offset) >> (exponent - self.exponent)
+            np.add.at(counts, indices - low_index, self.counts)
+        self.exponent = exponent
+        self.offset = low_index
+        self.counts = counts
+
+    def _cover(self, low, high, exponent=MIN_HISTOGRAM_EXPONENT):
+        """Grow the bins to cover values from ``low`` to ``high``, doubling the width as needed."""
+        if high > low:
+            exponent = max(exponent, math.ceil(math.log2((high - low) / self.max_bins)))
+        elif low:
+            # A single value; start with bins fine relative to its magnitude
+            exponent = max(exponent, math.floor(math.log2(abs(low))) - 8)
+        if self.exponent is not None:
+            exponent = max(exponent, self.exponent)
+        while True:
+            low_index = math.floor(low / 2.0 ** exponent)
+            high_index = math.floor(high / 2.0 ** exponent)
+            if self.counts.size:
+                current_low, current_high = self._bounds(exponent)
+                low_index, high_index = min(low_index, current_low), max(high_index, current_high)
+            if high_index - low_index < self.max_bins:
+                break
+            exponent += 1
+        self._resize(exponent, low_index, high_index)
+
+    def update(self, values):
+        """Add an array of values."""
+        values = np.asarray(values, dtype='float64')
+        if not values.size:
+            return
+        self._cover(float(values.min()), float(values.max()))
+        indices = np.floor(values / self.width).astype('int64') - self.offset
+        self.counts += np.bincount(indices, minlength=self.counts.size)
+
+    @staticmethod
+    def update_runs(histograms, values, lengths, minima, maxima):
+        """
+        Add consecutive runs of ``values`` to one histogram each, in one pass.
+
+        Run ``i`` holds ``lengths[i]`` values between ``minima[i]`` and
+        ``maxima[i]`` and goes to ``histograms[i]``.
+        """
+        for histogram, low, high in zip(histograms, minima, maxima):
+            histogram._cover(low, high)
+        # Lay the histograms end to end, so every value maps to one slot of
+        # a single bincount
+        sizes = np.array([histogram.counts.size for histogram in histograms])
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        widths = np.repeat([histogram.width for histogram in histograms], lengths)
+        shifts = np.repeat(starts - [histogram.offset for histogram in histograms], lengths)
+        slots = np.floor(values / widths).astype('int64') + shifts
+        counts = np.bincount(slots, minlength=int(sizes.sum()))
+        for histogram, start, size in zip(histograms, starts.tolist(), sizes.tolist()):
+            histogram.counts += counts[start:start + size]
+
+    def merge(self, other):
+        """Fold another histogram into this one."""
+        if not other.counts.size:
+            return
+        # The lower edges of the other's first and last bins
+        self._cover(other.offset * other.width, (other.offset + other.counts.size - 1) * other.width, other.exponent)
+        indices = (np.arange(other.counts.size, dtype='int64') + other.offset) >> (self.exponent - other.exponent)
+        np.add.at(self.counts, indices - self.offset, other.counts)
+
+    def coarsen(self, max_bins):
+        """Copy with the width doubled until at most ``max_bins`` bins remain."""
+        coarse = Histogram.from_dict(self.to_dict(), self.max_bins)
+        if coarse.counts.size:
+            exponent = coarse.exponent
+            while coarse._bounds(exponent)[1] - coarse._bounds(exponent)[0] >= max_bins:
+                exponent += 1
+            coarse._resize(exponent, *coarse._bounds(exponent))
+        return coarse
+
+    def edges(self):
+        """Bin edges, one more than the counts."""
+        if not self.counts.size:
+            return []
+        return ((np.arange(self.counts.size + 1) + self.offset) * self.width).tolist()
+
+    def quantile(self, q, minimum=None, maximum=None):
+        """
+        Estimate the value at quantile ``q``, taking values as spread evenly within each bin.
+
+        ``minimum``/``maximum`` narrow the first and last bins to the exact
+        extremes when the caller tracks them.
+        """
+        if not self.counts.size:
+            return None
+        edges = np.asarray(self.edges())
+        if minimum is not None:
+            edges[0] = max(edges[0], minimum)
+        if maximum is not None:
+            edges[-1] = min(edges[-1], maximum)
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)])
+        return float(np.interp(q * cumulative[-1], cumulative, edges))
+
+    def to_dict(self):
+        return {
+            'exponent': self.exponent,
+            'offset': self.offset,
+            'counts': self.counts.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data, max_bins=DEFAULT_HISTOGRAM_BINS):
+        histogram = cls(max_bins)
+        histogram.exponent = data.get('exponent')
+        histogram.offset = data.get('offset', 0)
+        histogram.counts = np.asarray(data.get('counts', []), dtype='int64')
+        return histogram
+
+
+class CoMoments:
+    """
+    Count, means and co-moment matrix of the numeric columns, mergeable (Chan et al.).
+
+    The co-moment matrix holds the sums of products of deviations from the
+    means, so covariance and correlation matrices come out of one pass and
+    partial states merge without revisiting rows.
+    """
+
+    def __init__(self, size=len(NUMERIC_COLUMNS)):
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.comoment = np.zeros((size, size))
+
+    def update(self, values):
+        """Fold a (rows, columns) array of values into the running state."""
+        values = np.asarray(values, dtype='float64')
+        if not len(values):
+            return
+        mean = values.mean(axis=0)
+        centered = values - mean
+        self.merge_moments(len(values), mean, centered.T @ centered)
+
+    def merge(self, other):
+        """Fold another partial state into this one."""
+        self.merge_moments(other.count, other.mean, other.comoment)
+
+    def merge_moments(self, count, mean, comoment):
+        """Fold the count, means and co-moment matrix of another set of rows into the state."""
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * (self.count * count / total)
+        self.mean = self.mean + delta * (count / total)
+        self.count = total
+
+    @property
+    def covariance(self):
+        """Sample covariance matrix (ddof=1), matching ``pandas.DataFrame.cov``."""
+        if self.count < 2:
+            return np.zeros_like(self.comoment)
+        return self.comoment / (self.count - 1)
+
+    @property
+    def correlation(self):
+        """Pearson correlation matrix; NaN where a column has no spread."""
+        spread = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.clip(self.comoment / np.outer(spread, spread), -1.0, 1.0)
+
+    def summary(self):
+        """Plain dict of the covariance and correlation matrices; undefined correlations are None."""
+        return {
+            'count': self.count,
+            'covariance': self.covariance.tolist(),
+            'correlation': [
+                [None if math.isnan(value) else value for value in row]
+                for row in self.correlation.tolist()
+            ],
+        }
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean.tolist(),
+            'comoment': self.comoment.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        moments = cls()
+        moments.count = data['count']
+        moments.mean = np.asarray(data['mean'], dtype='float64')
+        moments.comoment = np.asarray(data['comoment'], dtype='float64')
+        return moments
+
+
+class ColumnStats:
+    """Count, mean, variance (Welford/Chan), min, max and quantiles of one column."""
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.digest = TDigest(compression)
+
+    @property
+    def sum(self):
+        return self.mean * self.count
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1), matching ``pandas.Series.var``."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def update(self, values):
+        """Fold an array of values into the running state."""
+        values = np.asarray(values, dtype='float64')
+        if not values.size:
+            return
+        mean = float(values.mean())
+        self._merge_moments(
+            int(values.size),
+            mean,
+            float(np.square(values - mean).sum()),
+            float(values.min()),
+            float(values.max()),
+        )
+        self.digest.update(values)
+
+    def merge(self, other):
+        """Fold another partial state into this one."""
+        if not other.count:
+            return
+        self._merge_moments(other.count, other.mean, other.m2, other.minimum, other.maximum)
+        self.digest.merge(other.digest)
+
+    def _merge_moments(self, count, mean, m2, minimum, maximum):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        return self.digest.quantile(q, self.minimum, self.maximum)
+
+    def summary(self):
+        """Plain dict of the derived statistics for API responses and reports."""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'std': self.std,
+            'min': self.minimum,
+            'p25': self.quantile(0.25),
+            'median': self.quantile(0.5),
+            'p75': self.quantile(0.75),
+            'p95': self.quantile(0.95),
+            'max': self.maximum,
+        }
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.minimum if self.count else None,
+            'max': self.maximum if self.count else None,
+            'digest': self.digest.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data['count']
+        stats.mean = data['mean']
+        stats.m2 = data['m2']
+        if stats.count:
+            stats.minimum = data['min']
+            stats.maximum = data['max']
+        stats.digest = TDigest.from_dict(data['digest'])
+        return stats
+
+
+class EquipmentStats:
+    """
+    Mergeable statistics for a set of equipment rows.
+
+    Tracks the row count, per-column ``ColumnStats`` and ``Histogram`` for the
+    numeric columns, their ``CoMoments``, and per equipment type the row
+    count, the sum, minimum and maximum of each numeric column, a histogram
+    of each and their co-moments.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.columns = {column: ColumnStats() for column in NUMERIC_COLUMNS}
+        self.histograms = {column: Histogram() for column in NUMERIC_COLUMNS}
+        self.comoments = CoMoments()
+        self.type_counts = {}
+        # Per type, one value per NUMERIC_COLUMNS entry
+        self.type_sums = {}
+        self.type_mins = {}
+        self.type_maxs = {}
+        self.type_histograms = {}
+        self.type_comoments = {}
+
+    def update(self, df):
+        """Fold one cleaned DataFrame chunk into the running state."""
+        self.count += len(df)
+        values = df[NUMERIC_COLUMNS].to_numpy(dtype='float64')
+        for j, column in enumerate(NUMERIC_COLUMNS):
+            self.columns[column].update(values[:, j])
+            self.histograms[column].update(values[:, j])
+        self.comoments.update(values)
+        self._update_types(df, values)
+
+    def _update_types(self, df, values):
+        """Fold the per-type counts, sums, minima, maxima, histograms and co-moments of a chunk in one grouped pass."""
+        codes, types = pd.factorize(df['Type'], sort=False)
+        if not len(types):
+            return
+        # Sort the rows by type once; each aggregate is then one reduction
+        # over the contiguous run of every type
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        values = values[order]
+        counts = np.diff(np.r_[starts, len(sorted_codes)])
+        sum_array = np.add.reduceat(values, starts)
+        sums = sum_array.tolist()
+        mins = np.minimum.reduceat(values, starts).tolist()
+        maxs = np.maximum.reduceat(values, starts).tolist()
+
+        # Deviations of every row from the means of its type's run
+        means = sum_array / counts[:, None]
+        centered = values - np.repeat(means, counts, axis=0)
+        bounds = np.r_[starts, len(sorted_codes)]
+
+        runs = []
+        for i, code in enumerate(sorted_codes[starts].tolist()):
+            if code >= 0:
+                self.merge_type(types[code], int(counts[i]), sums[i], mins[i], maxs[i])
+                run = centered[bounds[i]:bounds[i + 1]]
+                self._type_comoments(types[code]).merge_moments(int(counts[i]), means[i], run.T @ run)
+                runs.append(i)
+        if not runs:
+            return
+        # Rows of unknown type (code -1) sort first, so the runs kept are
+        # contiguous from the first one
+        first = starts[runs[0]]
+        for j, column in enumerate(NUMERIC_COLUMNS):
+            Histogram.update_runs(
+                [self._type_histograms(types[sorted_codes[starts[i]]])[column] for i in runs],
+                values[first:, j],
+                counts[runs],
+                [mins[i][j] for i in runs],
+                [maxs[i][j] for i in runs],
+            )
+
+    def _type_comoments(self, equipment_type):
+        comoments = self.type_comoments.get(equipment_type)
+        if comoments is None:
+            comoments = self.type_comoments[equipment_type] = CoMoments()
+        return comoments
+
+    def _type_histograms(self, equipment_type):
+        histograms = self.type_histograms.get(equipment_type)
+        if histograms is None:
+            histograms = self.type_histograms[equipment_type] = {column: Histogram() for column in NUMERIC_COLUMNS}
+        return histograms
+
+    def merge_type(self, equipment_type, count, sums=None, mins=None, maxs=None):
+        """Fold one type's count and column sums, minima and maxima into the state."""
+        self.type_counts[equipment_type] = self.type_counts.get(equipment_type, 0) + count
+        if sums is not None:
+            current = self.type_sums.get(equipment_type)
+            self.type_sums[equipment_type] = list(sums) if current is None else [a + b for a, b in zip(current, sums)]
+        if mins is not None:
+            current = self.type_mins.get(equipment_type)
+            self.type_mins[equipment_type] = list(mins) if current is None else [min(a, b) for a, b in zip(current, mins)]
+        if maxs is not None:
+            current = self.type_maxs.get(equipment_type)
+            self.type_maxs[equipment_type] = list(maxs) if current is None else [max(a, b) for a, b in zip(current, maxs)]
+
+    def merge(self, other):
+        """Fold another partial state (chunk, process or upload) into this one."""
+        self.count += other.count
+        for column in NUMERIC_COLUMNS:
+            self.columns[column].merge(other.columns[column])
+            self.histograms[column].merge(other.histograms[column])
+        self.comoments.merge(other.comoments)
+        for equipment_type, comoments in other.type_comoments.items():
+            self._type_comoments(equipment_type).merge(comoments)
+        for equipment_type, histograms in other.type_histograms.items():
+            merged = self._type_histograms(equipment_type)
+            for column in NUMERIC_COLUMNS:
+                merged[column].merge(histograms[column])
+        for equipment_type, count in other.type_counts.items():
+            self.merge_type(
+                equipment_type,
+                count,
+                other.type_sums.get(equipment_type),
+                other.type_mins.get(equipment_type),
+                other.type_maxs.get(equipment_type),
+            )
+        return self
+
+    def mean(self, column):
+        return self.columns[column].mean
+
+    def type_sum(self, equipment_type, column):
+        """Sum of a numeric column over the rows of one type."""
+        sums = self.type_sums.get(equipment_type)
+        return sums[NUMERIC_COLUMNS.index(column)] if sums else 0.0
+
+    def summary(self):
+        """Derived per-column statistics keyed by column name."""
+        return {column: self.columns[column].summary() for column in NUMERIC_COLUMNS}
+
+    def type_summary(self, equipment_type):
+        """
+        Mean, minimum and maximum of each numeric column over one type.
+
+        Returns:
+            dict: Keyed by column name; values are None for states saved
+            before per-type statistics were tracked
+        """
+        count = self.type_counts.get(equipment_type, 0)
+        sums = self.type_sums.get(equipment_type)
+        mins = self.type_mins.get(equipment_type)
+        maxs = self.type_maxs.get(equipment_type)
+        return {
+            column: {
+                'mean': sums[i] / count if sums and count else None,
+                'min': mins[i] if mins else None,
+                'max': maxs[i] if maxs else None,
+            }
+            for i, column in enumerate(NUMERIC_COLUMNS)
+        }
+
+    def correlation_summary(self):
+        """
+        Covariance and correlation matrices of the numeric columns, overall and per type.
+
+        Returns:
+            dict: ``{'columns': [...], 'overall': {...}, 'types': {type: {...}}}``
+            with matrices in column order, or {} for states saved before
+            co-moments were tracked
+        """
+        if not self.comoments.count:
+            return {}
+        return {
+            'columns': NUMERIC_COLUMNS,
+            'overall': self.comoments.summary(),
+            'types': {
+                equipment_type: comoments.summary()
+                for equipment_type, comoments in self.type_comoments.items()
+            },
+        }
+
+    def to_dict(self, histograms=True):
+        """
+        Plain dict of the state.
+
+        ``histograms=False`` leaves out the histograms, which uploads store
+        separately (see ``histograms_to_dict``).
+        """
+        data = {
+            'version': STATS_STATE_VERSION,
+            'count': self.count,
+            'columns': {column: stats.to_dict() for column, stats in self.columns.items()},
+            'type_counts': self.type_counts,
+            # Per type, values of NUMERIC_COLUMNS in order
+            'type_sums': self.type_sums,
+            'type_mins': self.type_mins,
+            'type_maxs': self.type_maxs,
+            'comoments': self.comoments.to_dict(),
+            'type_comoments': {
+                equipment_type: comoments.to_dict()
+                for equipment_type, comoments in self.type_comoments.items()
+            },
+        }
+        if histograms:
+            data['histograms'] = self.histograms_to_dict()
+        return data
+
+    def histograms_to_dict(self):
+        return {
+            'columns': {column: histogram.to_dict() for column, histogram in self.histograms.items()},
+            'types': {
+                equipment_type: {column: histogram.to_dict() for column, histogram in histograms.items()}
+                for equipment_type, histograms in self.type_histograms.items()
+            },
+        }
+
+    def load_histograms(self, data):
+        """Restore histograms saved by ``histograms_to_dict``."""
+        for column in NUMERIC_COLUMNS:
+            if column in data.get('columns', {}):
+                self.histograms[column] = Histogram.from_dict(data['columns'][column])
+        self.type_histograms = {
+            equipment_type: {column: Histogram.from_dict(histograms[column]) for column in NUMERIC_COLUMNS}
+            for equipment_type, histograms in data.get('types', {}).items()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data['count']
+        for column in NUMERIC_COLUMNS:
+            stats.columns[column] = ColumnStats.from_dict(data['columns'][column])
+        stats.type_counts = dict(data.get('type_counts', {}))
+        stats.type_sums = {key: list(values) for key, values in data.get('type_sums', {}).items()}
+        stats.type_mins = {key: list(values) for key, values in data.get('type_mins', {}).items()}
+        stats.type_maxs = {key: list(values) for key, values in data.get('type_maxs', {}).items()}
+        if 'comoments' in data:
+            stats.comoments = CoMoments.from_dict(data['comoments'])
+        stats.type_comoments = {
+            key: CoMoments.from_dict(value) for key, value in data.get('type_comoments', {}).items()
+        }
+        if 'histograms' in data:
+            stats.load_histograms(data['histograms'])
+        return stats
+
+    def to_json(self, histograms=True):
+        return json.dumps(self.to_dict(histograms))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+
+def merge_stats(states):
+    """Merge an iterable of ``EquipmentStats`` into a new combined state."""
+    combined = EquipmentStats()
+    for state in states:
+        combined.merge(state)
+    return combined
@@ -1,4 +1,1438 @@
 """
 Tests for equipment_api.
 """
-from django.test import TestCase
+import bz2
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import zstandard
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from chemical_visualizer import database
+from equipment_api import jobs, retention, signals
+from equipment_api.columnar import ColumnarStore, ColumnarWriter
+from equipment_api.excel import ingest_excel
+from equipment_api.ingest import FieldCountCheck, IngestError, ingest_serial, parse_header
+from equipment_api.models import EquipmentReading, EquipmentUpload, UploadJob, UploadTypeSummary
+from equipment_api.pdf_utils import generate_equipment_report
+from equipment_api.parallel import ingest_csv_parallel, ingest_range, split_byte_ranges
+from equipment_api.report_cache import evict_reports, get_report_cache_dir
+from equipment_api.retention import delete_readings, prune_uploads
+from equipment_api.serializers import EquipmentUploadSerializer
+from equipment_api.series import lttb_decimate, minmax_decimate
+from equipment_api.stats import NUMERIC_COLUMNS, EquipmentStats, Histogram
+
+
+def make_csv(rows, seed=0):
+    """CSV bytes of ``rows`` pumps whose values depend on ``seed``."""
+    lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+    for i in range(rows):
+        lines.append(f'Pump {seed}-{i},{("Centrifugal", "Rotary")[i % 2]},{100 + seed + i % 7},{50 + i % 5},{20 + i % 3}')
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def make_xlsx(rows):
+    """Workbook bytes with ``rows`` (header first) in its first worksheet."""
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def csv_rows(content):
+    """Header and rows of CSV bytes, numeric cells converted to floats."""
+    lines = content.decode().splitlines()
+    rows = [line.split(',') for line in lines[1:]]
+    return [lines[0].split(',')] + [[name, kind] + [float(value) for value in values] for name, kind, *values in rows]
+
+
+def sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class StatsAssertionsMixin:
+
+    def assertSummaryAlmostEqual(self, first, second):
+        """Per-column summaries match up to floating-point rounding."""
+        self.assertEqual(first.keys(), second.keys())
+        for column, values in first.items():
+            self.assertEqual(values.keys(), second[column].keys())
+            for name, value in values.items():
+                self.assertAlmostEqual(value, second[column][name], places=9, msg=f'{column} {name}')
+
+
+class EquipmentAPITestCase(TestCase):
+    """Authenticated API client with uploads stored under a temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=media_root,
+            EQUIPMENT_DATA_DIR=f'{media_root}/equipment_data',
+            EQUIPMENT_SPOOL_DIR=f'{media_root}/spool',
+            EQUIPMENT_REPORT_CACHE_DIR=f'{media_root}/report_cache',
+            EQUIPMENT_PRUNE_INTERVAL_SECONDS=0,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Memoized comparisons and series are keyed by ids, which later tests reuse
+        self.addCleanup(cache.clear)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('tester', password='secret'))
+
+    def upload(self, content, name='equipment.csv'):
+        csv_file = io.BytesIO(content)
+        csv_file.name = name
+        return self.client.post('/api/upload/', {'csv_file': csv_file}, format='multipart')
+
+
+class ContentHashUploadTests(EquipmentAPITestCase):
+    """Uploads are hashed while received and identical bytes are stored once."""
+
+    def test_upload_stores_digest_of_its_bytes(self):
+        content = make_csv(8)
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 201)
+        upload = EquipmentUpload.objects.get(pk=response.data['data']['id'])
+        self.assertEqual(upload.content_hash, sha256(content))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_upload_spooled_to_disk_stores_digest_of_its_bytes(self):
+        content = make_csv(500)
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 201)
+        upload = EquipmentUpload.objects.get(pk=response.data['data']['id'])
+        self.assertEqual(upload.content_hash, sha256(content))
+
+    def test_identical_upload_returns_existing_statistics(self):
+        first = self.upload(make_csv(8))
+        second = self.upload(make_csv(8), name='renamed.csv')
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.data['duplicate'])
+        self.assertEqual(second.data['data']['id'], first.data['data']['id'])
+        self.assertEqual(EquipmentUpload.objects.count(), 1)
+
+    def test_different_upload_with_same_name_is_not_a_duplicate(self):
+        self.upload(make_csv(8, seed=1))
+        response = self.upload(make_csv(12, seed=2))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['data']['equipment_count'], 12)
+
+    def test_csv_body_upload_is_hashed(self):
+        content = make_csv(9)
+        response = self.client.post('/api/upload/', content, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        upload = EquipmentUpload.objects.get(pk=response.data['data']['id'])
+        self.assertEqual(upload.content_hash, sha256(content))
+
+    def test_unsupported_content_encoding_is_rejected(self):
+        response = self.client.post('/api/upload/', make_csv(9), content_type='text/csv', HTTP_CONTENT_ENCODING='br')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Content-Encoding', response.data['detail'])
+
+    def test_hashing_failure_is_reported(self):
+        with mock.patch('equipment_api.views.get_content_hash', side_effect=OSError('read failed')):
+            response = self.upload(make_csv(8))
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('read failed', response.data['error'])
+
+    def test_identical_bytes_saved_during_parsing_return_the_saved_upload(self):
+        first = EquipmentUpload.objects.get(pk=self.upload(make_csv(8)).data['data']['id'])
+        # The duplicate check before parsing runs before the first upload commits
+        with mock.patch.object(EquipmentUpload, 'find_by_content_hash', side_effect=[None, first]):
+            response = self.upload(make_csv(8), name='again.csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['duplicate'])
+        self.assertEqual(response.data['data']['id'], first.pk)
+        self.assertEqual(EquipmentUpload.objects.count(), 1)
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'equipment_data')), [os.path.basename(first.data_path)])
+
+    def test_digest_is_unique_except_when_blank(self):
+        upload = EquipmentUpload.objects.get(pk=self.upload(make_csv(8)).data['data']['id'])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            EquipmentUpload.objects.create(
+                filename='copy.csv', equipment_count=1, avg_flowrate=0, avg_pressure=0, avg_temperature=0,
+                content_hash=upload.content_hash,
+            )
+        for _ in range(2):
+            EquipmentUpload.objects.create(
+                filename='unhashed.csv', equipment_count=1, avg_flowrate=0, avg_pressure=0, avg_temperature=0,
+            )
+
+
+class StreamingIngestTests(EquipmentAPITestCase):
+    """Uploads are parsed chunk by chunk into the same statistics as one pass."""
+
+    def test_utf8_bom_is_ignored(self):
+        for seed, engine in enumerate(('c', 'pyarrow')):
+            with override_settings(EQUIPMENT_CSV_ENGINE=engine):
+                response = self.upload(b'\xef\xbb\xbf' + make_csv(6, seed=seed), name='excel.csv')
+                self.assertEqual(response.status_code, 201, engine)
+                self.assertEqual(response.data['data']['equipment_count'], 6)
+
+    @override_settings(EQUIPMENT_INGEST_CHUNK_ROWS=7)
+    def test_chunked_upload_matches_single_chunk(self):
+        content = make_csv(50)
+        chunked = self.upload(content).data['data']
+        with override_settings(EQUIPMENT_INGEST_CHUNK_ROWS=1000):
+            EquipmentUpload.objects.all().delete()
+            whole = self.upload(content).data['data']
+        for field in ('equipment_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature', 'type_distribution'):
+            self.assertEqual(chunked[field], whole[field], field)
+
+    def test_header_only_file_is_rejected(self):
+        response = self.upload(b'Equipment Name,Type,Flowrate,Pressure,Temperature\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'No valid data found in CSV')
+
+    def test_missing_columns_are_rejected(self):
+        response = self.upload(b'Equipment Name,Type,Flowrate\nPump,Rotary,1\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Missing columns: Pressure, Temperature')
+
+
+class CompressedUploadTests(EquipmentAPITestCase):
+    """Compressed CSVs are decompressed while parsed and match the plain upload."""
+
+    CODECS = {
+        '.csv.gz': gzip.compress,
+        '.csv.bz2': bz2.compress,
+        '.csv.zst': lambda content: zstandard.ZstdCompressor().compress(content),
+    }
+
+    def test_compressed_files_match_the_plain_file(self):
+        content = make_csv(300, seed=60)
+        expected = self.upload(content).data['data']
+        for suffix, compress in self.CODECS.items():
+            with self.subTest(suffix):
+                compressed = compress(content)
+                response = self.upload(compressed, name=f'equipment{suffix}')
+                self.assertEqual(response.status_code, 201)
+                data = response.data['data']
+                self.assertEqual(data['equipment_count'], 300)
+                self.assertEqual(data['statistics'], expected['statistics'])
+                upload = EquipmentUpload.objects.get(pk=data['id'])
+                self.assertEqual(upload.content_hash, sha256(compressed))
+
+    def test_gzip_encoded_csv_body(self):
+        response = self.client.post(
+            '/api/upload/', gzip.compress(make_csv(30, seed=61)),
+            content_type='text/csv', HTTP_CONTENT_ENCODING='gzip',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['data']['equipment_count'], 30)
+
+    def test_corrupt_streams_are_rejected(self):
+        content = make_csv(300, seed=62)
+        for suffix, compress in self.CODECS.items():
+            with self.subTest(suffix):
+                compressed = compress(content)
+                for corrupt in (compressed[:len(compressed) // 2], compressed[:20] + b'\xff' * 64):
+                    response = self.upload(corrupt, name=f'corrupt{suffix}')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.data['error'], 'Invalid or corrupt compressed file')
+        self.assertFalse(EquipmentUpload.objects.exists())
+
+
+class ExcelUploadTests(StatsAssertionsMixin, EquipmentAPITestCase):
+    """Workbooks are read row by row and give the same statistics as a CSV."""
+
+    @override_settings(EQUIPMENT_INGEST_CHUNK_ROWS=7)
+    def test_workbook_matches_the_csv(self):
+        content = make_csv(40, seed=70)
+        expected = self.upload(content).data['data']
+        response = self.upload(make_xlsx(csv_rows(content)), name='equipment.xlsx')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['data']['equipment_count'], 40)
+        self.assertEqual(response.data['data']['type_distribution'], expected['type_distribution'])
+        self.assertSummaryAlmostEqual(response.data['data']['statistics'], expected['statistics'])
+
+    def test_invalid_cells_are_dropped(self):
+        rows = [
+            ['Notes', 'Temperature', 'Equipment Name', 'Type', 'Pressure', 'Flowrate'],
+            ['ok', 20, 'Pump 1', 'Rotary', 50, 100],
+            ['text', 'hot', 'Pump 2', 'Rotary', 50, 100],
+            ['empty', 21, 'Pump 3', None, 51, 101],
+            ['short', 22, 'Pump 4', 'Rotary'],
+            [None, 22.5, 'Pump 5', 'Centrifugal', '55', 110],
+        ]
+        response = self.upload(make_xlsx(rows), name='equipment.xlsx')
+        self.assertEqual(response.status_code, 201)
+        data = response.data['data']
+        self.assertEqual(data['equipment_count'], 2)
+        self.assertEqual(data['type_distribution'], {'Centrifugal': 1, 'Rotary': 1})
+        self.assertEqual(data['statistics']['Flowrate']['mean'], 105.0)
+
+    def test_workbook_path_is_ingested(self):
+        path = os.path.join(settings.MEDIA_ROOT, 'equipment.xlsx')
+        with open(path, 'wb') as f:
+            f.write(make_xlsx(csv_rows(make_csv(12, seed=71))))
+        self.assertEqual(ingest_excel(path, chunk_rows=5).count, 12)
+
+    def test_invalid_workbooks_are_rejected(self):
+        cases = [
+            (b'not a zip file', 'Invalid Excel file'),
+            (make_xlsx([['Equipment Name', 'Type', 'Flowrate'], ['Pump', 'Rotary', 1]]), 'Missing columns: Pressure, Temperature'),
+            (make_xlsx([]), 'No valid data found in workbook'),
+        ]
+        for content, error in cases:
+            with self.subTest(error):
+                response = self.upload(content, name='equipment.xlsx')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['error'], error)
+        self.assertFalse(EquipmentUpload.objects.exists())
+
+
+class BatchUploadTests(EquipmentAPITestCase):
+    """Batch uploads store every distinct file under its own digest."""
+
+    def post_batch(self, *files):
+        uploads = []
+        for name, content in files:
+            uploaded_file = io.BytesIO(content)
+            uploaded_file.name = name
+            uploads.append(uploaded_file)
+        return self.client.post('/api/upload/batch/', {'files': uploads}, format='multipart')
+
+    def test_files_with_the_same_name_keep_their_own_digests(self):
+        first, second = make_csv(8, seed=1), make_csv(12, seed=2)
+        response = self.post_batch(('same.csv', first), ('same.csv', second))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['status'] for result in response.data['results']], ['created', 'created'])
+        self.assertEqual(
+            sorted(EquipmentUpload.objects.values_list('equipment_count', 'content_hash')),
+            [(8, sha256(first)), (12, sha256(second))],
+        )
+
+        # A later single upload of the second file finds its own statistics
+        response = self.upload(second, name='same.csv')
+        self.assertTrue(response.data['duplicate'])
+        self.assertEqual(response.data['data']['equipment_count'], 12)
+
+    def test_identical_files_in_a_batch_are_stored_once(self):
+        content = make_csv(8)
+        response = self.post_batch(('a.csv', content), ('b.csv', content))
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['duplicates'], 1)
+        self.assertEqual(EquipmentUpload.objects.count(), 1)
+
+    def test_files_saved_by_a_concurrent_upload_are_duplicates(self):
+        saved = EquipmentUpload.objects.get(pk=self.upload(make_csv(8, seed=1)).data['data']['id'])
+        # The first file passes the check before parsing, then loses the race
+        with mock.patch.object(EquipmentUpload, 'find_by_content_hash', side_effect=[None, None, saved, None]):
+            response = self.post_batch(('a.csv', make_csv(8, seed=1)), ('b.csv', make_csv(8, seed=2)))
+        self.assertEqual([result['status'] for result in response.data['results']], ['duplicate', 'created'])
+        self.assertEqual(response.data['results'][0]['data']['id'], saved.pk)
+        self.assertEqual(EquipmentUpload.objects.count(), 2)
+
+
+class InlineExecutor:
+    """Runs submitted jobs at once, inside the test transaction."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@mock.patch('equipment_api.jobs.close_old_connections', mock.Mock())
+@mock.patch('equipment_api.jobs.get_executor', InlineExecutor)
+class UploadJobTests(EquipmentAPITestCase):
+    """Async uploads run as jobs whose state is reported by /api/jobs/<id>/."""
+
+    def upload_async(self, content, name='equipment.csv'):
+        csv_file = io.BytesIO(content)
+        csv_file.name = name
+        return self.client.post('/api/upload/', {'csv_file': csv_file, 'mode': 'async'}, format='multipart')
+
+    def test_async_upload_reports_the_finished_job(self):
+        response = self.upload_async(make_csv(10, seed=30))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], response.data['status_url'])
+
+        job = self.client.get(f"/api/jobs/{response.data['job_id']}/").data
+        self.assertEqual(job['state'], UploadJob.SUCCEEDED)
+        self.assertEqual(job['rows_processed'], 10)
+        upload = EquipmentUpload.objects.get(pk=job['upload_id'])
+        self.assertEqual(upload.content_hash, sha256(make_csv(10, seed=30)))
+        self.assertEqual(os.listdir(jobs.get_spool_dir()), [])
+
+    def test_invalid_file_fails_the_job(self):
+        response = self.upload_async(b'Name,Kind\nPump,Rotary\n')
+        job = self.client.get(f"/api/jobs/{response.data['job_id']}/").data
+        self.assertEqual(job['state'], UploadJob.FAILED)
+        self.assertIn('Missing columns', job['error'])
+        self.assertIsNone(job['upload_id'])
+
+    def test_unknown_job_is_not_found(self):
+        self.assertEqual(self.client.get('/api/jobs/not-a-uuid/').status_code, 404)
+
+    def test_jobs_of_a_previous_process_are_failed(self):
+        created = []
+        for state in (UploadJob.QUEUED, UploadJob.RUNNING, UploadJob.QUEUED):
+            path = os.path.join(jobs.get_spool_dir(), f'{state}-{len(created)}.csv')
+            with open(path, 'wb') as f:
+                f.write(make_csv(3))
+            created.append(UploadJob.objects.create(filename='equipment.csv', spool_path=path, state=state))
+        stale, running, current = created
+        UploadJob.objects.filter(pk__in=[stale.pk, running.pk]).update(
+            updated_at=jobs._started_at - timedelta(minutes=1),
+        )
+
+        self.assertEqual(jobs.recover_stale_jobs(), 2)
+        for job in (stale, running):
+            job.refresh_from_db()
+            self.assertEqual(job.state, UploadJob.FAILED)
+            self.assertEqual(job.error, jobs.STALE_JOB_ERROR)
+            self.assertFalse(os.path.exists(job.spool_path))
+        current.refresh_from_db()
+        self.assertEqual(current.state, UploadJob.QUEUED)
+        self.assertTrue(os.path.exists(current.spool_path))
+
+        # A recovered job left in the old pool's queue is not run again
+        jobs.run_upload_job(stale.pk)
+        stale.refresh_from_db()
+        self.assertEqual(stale.state, UploadJob.FAILED)
+
+
+class UploadSessionTests(EquipmentAPITestCase):
+    """Resumable uploads assemble chunks sent at byte offsets, then process the file."""
+
+    def open_session(self, content=None, filename='equipment.csv'):
+        data = {'filename': filename}
+        if content is not None:
+            data['size'] = len(content)
+        response = self.client.post('/api/upload/sessions/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def put_chunk(self, session_id, index, offset, data):
+        return self.client.put(
+            f'/api/upload/sessions/{session_id}/chunks/{index}/?offset={offset}',
+            data,
+            content_type='application/octet-stream',
+        )
+
+    def complete(self, session_id):
+        return self.client.post(f'/api/upload/sessions/{session_id}/complete/', {}, format='json')
+
+    def test_chunks_are_assembled_and_processed(self):
+        content = make_csv(50, seed=50)
+        session_id = self.open_session(content)
+        self.assertEqual(self.put_chunk(session_id, 0, 0, content[:700]).data['offset'], 700)
+        # A retried chunk is written again without moving the offset back
+        self.assertEqual(self.put_chunk(session_id, 0, 0, content[:700]).data['offset'], 700)
+        self.assertEqual(self.put_chunk(session_id, 1, 700, content[700:]).data['offset'], len(content))
+
+        response = self.complete(session_id)
+        self.assertEqual(response.status_code, 201)
+        upload = EquipmentUpload.objects.get(pk=response.data['data']['id'])
+        self.assertEqual(upload.content_hash, sha256(content))
+        session = self.client.get(f'/api/upload/sessions/{session_id}/').data
+        self.assertEqual((session['state'], session['upload_id']), ('completed', upload.pk))
+        self.assertEqual(os.listdir(jobs.get_spool_dir()), [])
+
+    def test_chunk_past_the_received_offset_is_a_conflict(self):
+        content = make_csv(50, seed=51)
+        session_id = self.open_session(content)
+        self.put_chunk(session_id, 0, 0, content[:500])
+        response = self.put_chunk(session_id, 2, 900, content[900:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 500)
+
+    def test_early_completion_reports_the_offset_to_resume_from(self):
+        content = make_csv(50, seed=52)
+        session_id = self.open_session(content)
+        self.put_chunk(session_id, 0, 0, content[:500])
+        response = self.complete(session_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['offset'], 500)
+
+        self.put_chunk(session_id, 1, 500, content[500:])
+        self.assertEqual(self.complete(session_id).status_code, 201)
+        self.assertEqual(self.complete(session_id).status_code, 400)
+
+    def test_chunk_beyond_the_declared_size_is_rejected(self):
+        content = make_csv(10, seed=53)
+        session_id = self.open_session(content)
+        response = self.put_chunk(session_id, 0, 0, content + b'Pump extra,Rotary,1,2,3\n')
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_file_completes_with_the_existing_upload(self):
+        content = make_csv(10, seed=54)
+        existing = self.upload(content).data['data']['id']
+        session_id = self.open_session()
+        self.put_chunk(session_id, 0, 0, content)
+        response = self.complete(session_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['id'], existing)
+
+    def test_aborted_session_removes_its_bytes(self):
+        session_id = self.open_session()
+        self.put_chunk(session_id, 0, 0, make_csv(10))
+        self.assertEqual(self.client.delete(f'/api/upload/sessions/{session_id}/').status_code, 204)
+        self.assertEqual(self.client.get(f'/api/upload/sessions/{session_id}/').status_code, 404)
+        self.assertEqual(os.listdir(jobs.get_spool_dir()), [])
+
+
+class IngestValidationTests(EquipmentAPITestCase):
+    """Files that cannot give meaningful statistics are rejected with a 400."""
+
+    def test_infinite_values_are_rejected(self):
+        for value in ('inf', '-inf', 'Infinity'):
+            content = make_csv(4) + f'Pump X,Rotary,{value},50,20\n'.encode()
+            response = self.upload(content, name=f'{value}.csv')
+            self.assertEqual(response.status_code, 400, value)
+            self.assertEqual(response.data['error'], 'Infinite values in columns: Flowrate')
+        self.assertEqual(EquipmentUpload.objects.count(), 0)
+
+    def test_huge_finite_values_are_rejected(self):
+        content = make_csv(4) + b'Pump X,Rotary,100,1e308,20\nPump Y,Rotary,100,-1e308,20\n'
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Values out of range in columns: Pressure')
+        self.assertEqual(EquipmentUpload.objects.count(), 0)
+
+    def test_rows_with_extra_fields_are_rejected_by_both_engines(self):
+        for engine in ('c', 'pyarrow'):
+            with override_settings(EQUIPMENT_CSV_ENGINE=engine):
+                for extra in (',x', ',x,y', ','):
+                    content = make_csv(4) + f'Pump X,Rotary,100,50,20{extra}\n'.encode()
+                    response = self.upload(content, name=f'{engine}.csv')
+                    self.assertEqual(response.status_code, 400, (engine, extra))
+                    self.assertEqual(response.data['error'], 'Invalid CSV format')
+        self.assertEqual(EquipmentUpload.objects.count(), 0)
+
+    def test_quoted_delimiters_and_line_breaks_are_not_extra_fields(self):
+        for seed, engine in enumerate(('c', 'pyarrow')):
+            with override_settings(EQUIPMENT_CSV_ENGINE=engine):
+                content = make_csv(4, seed=seed) + b'"Pump, big",Rotary,100,50,20\n"Pump\nsplit, twice",Rotary,100,50,20\n'
+                response = self.upload(content)
+                self.assertEqual(response.status_code, 201, engine)
+                self.assertEqual(response.data['data']['equipment_count'], 6)
+
+    def test_field_count_check_across_block_boundaries(self):
+        def read(content, block_size):
+            check = FieldCountCheck(io.BytesIO(content), 5)
+            return b''.join(iter(lambda: check.read(block_size), b''))
+
+        rows = b'A,P,1,2,3\n"B\n,x",P,1,2,3\nC,P,1\n"D ""q"", y",P,1,2,3\n'
+        for block_size in (1, 7, 64):
+            self.assertEqual(read(rows, block_size), rows)
+            with self.assertRaises(IngestError):
+                read(rows + b'E,P,1,2,3,x', block_size)
+
+    def test_short_rows_are_dropped_by_both_engines(self):
+        for seed, engine in enumerate(('c', 'pyarrow')):
+            with override_settings(EQUIPMENT_CSV_ENGINE=engine):
+                response = self.upload(make_csv(4, seed=seed) + b'Pump X,Rotary,100\n')
+                self.assertEqual(response.status_code, 201, engine)
+                self.assertEqual(response.data['data']['equipment_count'], 4)
+
+
+class EquipmentStatsTests(StatsAssertionsMixin, TestCase):
+    """Statistics merged from chunk states equal those of one pass over all rows."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        rows = 20000
+        self.df = pd.DataFrame({
+            'Equipment Name': [f'Pump {i}' for i in range(rows)],
+            'Type': rng.choice(['Centrifugal', 'Rotary', 'Reciprocating'], rows),
+            'Flowrate': rng.lognormal(4, 1, rows),
+            'Pressure': rng.normal(50, 5, rows),
+            'Temperature': rng.uniform(20, 200, rows),
+        })
+
+    def one_pass(self):
+        stats = EquipmentStats()
+        stats.update(self.df)
+        return stats
+
+    def merged(self, parts=7):
+        stats = EquipmentStats()
+        for rows in np.array_split(np.arange(len(self.df)), parts):
+            chunk = EquipmentStats()
+            chunk.update(self.df.iloc[rows])
+            # Partial states travel between processes as plain dicts
+            stats.merge(EquipmentStats.from_dict(chunk.to_dict()))
+        return stats
+
+    def test_merged_chunks_equal_one_pass(self):
+        one_pass, merged = self.one_pass(), self.merged()
+        self.assertEqual(merged.count, len(self.df))
+        self.assertEqual(merged.type_counts, one_pass.type_counts)
+        for column in NUMERIC_COLUMNS:
+            expected, actual = one_pass.columns[column], merged.columns[column]
+            self.assertAlmostEqual(actual.mean, self.df[column].mean(), places=9)
+            self.assertAlmostEqual(actual.std, self.df[column].std(), places=9)
+            self.assertEqual((actual.minimum, actual.maximum), (expected.minimum, expected.maximum))
+        for equipment_type in one_pass.type_counts:
+            self.assertEqual(merged.type_summary(equipment_type).keys(), one_pass.type_summary(equipment_type).keys())
+            for column, values in merged.type_summary(equipment_type).items():
+                for name, value in values.items():
+                    self.assertAlmostEqual(value, one_pass.type_summary(equipment_type)[column][name], places=9)
+        np.testing.assert_allclose(
+            merged.comoments.correlation,
+            self.df[NUMERIC_COLUMNS].corr().to_numpy(),
+            atol=1e-12,
+        )
+
+    def test_type_summary_matches_groupby(self):
+        grouped = self.df.groupby('Type')[NUMERIC_COLUMNS]
+        for stats in (self.one_pass(), self.merged()):
+            for equipment_type, rows in grouped:
+                summary = stats.type_summary(equipment_type)
+                for column in NUMERIC_COLUMNS:
+                    self.assertAlmostEqual(summary[column]['mean'], rows[column].mean(), places=9)
+                    self.assertEqual(summary[column]['min'], rows[column].min())
+                    self.assertEqual(summary[column]['max'], rows[column].max())
+
+    def test_type_summary_of_older_states_is_empty(self):
+        state = self.one_pass().to_dict()
+        for key in ('type_sums', 'type_mins', 'type_maxs'):
+            del state[key]
+        summary = EquipmentStats.from_dict(state).type_summary('Rotary')
+        self.assertEqual(summary['Flowrate'], {'mean': None, 'min': None, 'max': None})
+
+    def test_quantile_rank_error_is_bounded(self):
+        for stats in (self.one_pass(), self.merged()):
+            for column in NUMERIC_COLUMNS:
+                values = np.sort(self.df[column].to_numpy())
+                for q in (0.01, 0.25, 0.5, 0.75, 0.95, 0.99):
+                    rank = np.searchsorted(values, stats.columns[column].quantile(q)) / values.size
+                    self.assertLess(abs(rank - q), 0.005, f'{column} q={q}')
+
+    def test_state_survives_json_round_trip(self):
+        stats = self.merged()
+        restored = EquipmentStats.from_json(stats.to_json())
+        self.assertSummaryAlmostEqual(restored.summary(), stats.summary())
+        self.assertEqual(restored.correlation_summary(), stats.correlation_summary())
+
+
+class HistogramTests(TestCase):
+    """Power-of-two histograms merge exactly and stay within their bin budget."""
+
+    def setUp(self):
+        self.values = np.random.default_rng(1).lognormal(4, 1, 20000)
+
+    def assertCountsExact(self, histogram, values):
+        self.assertLessEqual(histogram.counts.size, histogram.max_bins)
+        expected, _ = np.histogram(values, bins=histogram.edges())
+        np.testing.assert_array_equal(histogram.counts, expected)
+
+    def test_merged_chunks_equal_one_pass(self):
+        one_pass = Histogram()
+        one_pass.update(self.values)
+        merged = Histogram()
+        for chunk in np.array_split(self.values, 9):
+            part = Histogram()
+            part.update(chunk)
+            merged.merge(Histogram.from_dict(part.to_dict()))
+        self.assertEqual(merged.to_dict(), one_pass.to_dict())
+        self.assertCountsExact(merged, self.values)
+
+    def test_runs_go_to_their_own_histograms(self):
+        runs = np.array_split(np.sort(self.values), 3)
+        histograms = [Histogram() for _ in runs]
+        Histogram.update_runs(
+            histograms,
+            np.concatenate(runs),
+            [run.size for run in runs],
+            [run.min() for run in runs],
+            [run.max() for run in runs],
+        )
+        for histogram, run in zip(histograms, runs):
+            self.assertCountsExact(histogram, run)
+
+    def test_coarsen_keeps_the_counts(self):
+        histogram = Histogram()
+        histogram.update(self.values)
+        coarse = histogram.coarsen(10)
+        self.assertLessEqual(coarse.counts.size, 10)
+        self.assertEqual(coarse.count, len(self.values))
+        self.assertCountsExact(coarse, self.values)
+
+    def test_single_and_negative_values(self):
+        for values in ([42.0], [-3.5, -3.5], [-120.0, 0.0, 7.25]):
+            with self.subTest(values=values):
+                histogram = Histogram()
+                histogram.update(values)
+                self.assertCountsExact(histogram, values)
+
+
+def reference_lttb(values, points):
+    """Plain-loop LTTB over the same buckets as lttb_decimate."""
+    size = len(values)
+    width = -(-(size - 2) // (points - 2))
+    buckets = [list(range(start, min(start + width, size - 1))) for start in range(1, size - 1, width)]
+    rows = [0]
+    for i, bucket in enumerate(buckets):
+        after = buckets[i + 1] if i + 1 < len(buckets) else [size - 1]
+        c_x, c_y = sum(after) / len(after), sum(values[row] for row in after) / len(after)
+        a_x, a_y = rows[-1], values[rows[-1]]
+        areas = [abs((a_x - c_x) * (values[b] - a_y) - (a_x - b) * (c_y - a_y)) for b in bucket]
+        rows.append(bucket[areas.index(max(areas))])
+    return rows + [size - 1]
+
+
+class SeriesTests(TestCase):
+    """Downsampled series keep the shape and extremes of a column."""
+
+    def setUp(self):
+        self.values = np.random.default_rng(2).normal(50, 5, 1003).cumsum()
+
+    def test_lttb_matches_the_reference(self):
+        for points in (3, 10, 100, 1001):
+            with self.subTest(points=points):
+                rows = lttb_decimate(self.values, points)
+                self.assertLessEqual(len(rows), points)
+                self.assertEqual(rows.tolist(), reference_lttb(self.values.tolist(), points))
+
+    def test_lttb_keeps_a_spike(self):
+        values = np.zeros(10000)
+        values[4321] = 100.0
+        rows = lttb_decimate(values, 50)
+        self.assertIn(4321, rows)
+        self.assertEqual((rows[0], rows[-1]), (0, 9999))
+
+    def test_minmax_keeps_every_bucket_extreme(self):
+        rows = minmax_decimate(self.values, 20)
+        self.assertLessEqual(len(rows), 20)
+        self.assertTrue(np.all(np.diff(rows) > 0))
+        width = -(-len(self.values) // 10)
+        for start in range(0, len(self.values), width):
+            bucket = self.values[start:start + width]
+            self.assertIn(start + bucket.argmin(), rows)
+            self.assertIn(start + bucket.argmax(), rows)
+
+    def test_short_columns_are_kept_whole(self):
+        for decimate in (lttb_decimate, minmax_decimate):
+            self.assertEqual(decimate(self.values[:30], 30).tolist(), list(range(30)))
+
+
+class ParallelIngestTests(StatsAssertionsMixin, TestCase):
+    """Byte ranges of a file parse to the same statistics as the whole file."""
+
+    def write_csv(self, content):
+        path = tempfile.mktemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_ranges_merge_to_the_serial_statistics(self):
+        path = self.write_csv(make_csv(1000))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            stats = ingest_csv_parallel(path, workers=4, chunk_rows=64, executor=executor)
+        with open(path, 'rb', buffering=0) as f:
+            expected = ingest_serial(f)
+        self.assertEqual(stats.count, 1000)
+        self.assertSummaryAlmostEqual(stats.summary(), expected.summary())
+
+    def test_ranges_merge_in_range_order(self):
+        path = self.write_csv(make_csv(1000))
+        header_line, ranges = split_byte_ranges(path, 4)
+        header = parse_header(header_line)
+        expected = EquipmentStats()
+        for start, end in ranges:
+            expected.merge(EquipmentStats.from_dict(ingest_range(path, header, start, end, 64)[0]))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            stats = ingest_csv_parallel(path, workers=4, chunk_rows=64, executor=executor)
+        self.assertEqual(stats.to_dict(), expected.to_dict())
+
+    def test_quoted_fields_on_one_line_are_parsed_in_parallel(self):
+        rows = ''.join(f'"Pump, {i}",Rotary,{100 + i},50,20\n' for i in range(300))
+        path = self.write_csv(b'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + rows.encode())
+        with ThreadPoolExecutor(max_workers=4) as executor, \
+                mock.patch('equipment_api.parallel.ingest_serial') as serial:
+            stats = ingest_csv_parallel(path, workers=4, chunk_rows=64, executor=executor)
+        serial.assert_not_called()
+        self.assertEqual(stats.count, 300)
+
+    def test_ranges_splitting_a_quoted_field_fall_back_to_serial(self):
+        rows = ''.join(f'"Pump\n{i}",Rotary,{100 + i},50,20\n' for i in range(300))
+        path = self.write_csv(b'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + rows.encode())
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            stats = ingest_csv_parallel(
+                path, workers=4, chunk_rows=64, executor=executor, writer=ColumnarWriter(store_dir),
+            )
+        self.assertEqual(stats.count, 300)
+        self.assertEqual(stats.type_counts, {'Rotary': 300})
+        store = ColumnarStore(store_dir)
+        self.assertEqual(store.rows, 300)
+        self.assertFalse([name for name in os.listdir(store_dir) if name.startswith('part-')])
+
+
+class ColumnarStoreTests(EquipmentAPITestCase):
+    """Stored rows read back exactly, for slices and row index arrays."""
+
+    def test_names_of_slices_and_rows(self):
+        response = self.upload(make_csv(10, seed=3))
+        store = EquipmentUpload.objects.get(pk=response.data['data']['id']).get_store()
+        names = [f'Pump 3-{i}' for i in range(10)]
+        self.assertEqual(store.names(), names)
+        self.assertEqual(store.names(slice(2, 5)), names[2:5])
+        self.assertEqual(store.names(slice(8, None)), names[8:])
+        self.assertEqual(store.names(slice(0, 10, 3)), names[0:10:3])
+        self.assertEqual(store.names(slice(4, 4)), [])
+        self.assertEqual(store.names([7, 1]), [names[7], names[1]])
+
+
+class ReadingsTests(EquipmentAPITestCase):
+    """Every stored row is loaded into EquipmentReading once the upload commits."""
+
+    @override_settings(EQUIPMENT_READINGS_BATCH_SIZE=4)
+    def test_upload_rows_are_loaded_in_blocks(self):
+        response = self.upload(make_csv(10, seed=5))
+        upload = EquipmentUpload.objects.get(pk=response.data['data']['id'])
+        readings = list(upload.readings.order_by('id').values_list('name', 'flowrate'))
+        self.assertEqual(len(readings), 10)
+        self.assertEqual(readings[3], ('Pump 5-3', 108.0))
+        self.assertEqual(upload.readings_state, EquipmentUpload.READINGS_LOADED)
+        self.assertEqual(response.data['data']['readings_state'], EquipmentUpload.READINGS_LOADED)
+
+    def test_failed_load_keeps_the_upload_without_readings(self):
+        with mock.patch('equipment_api.readings.iter_store_blocks', side_effect=RuntimeError('disk gone')):
+            with self.assertLogs('equipment_api.readings', 'ERROR'):
+                response = self.upload(make_csv(10, seed=6))
+        self.assertEqual(response.status_code, 201)
+        upload = EquipmentUpload.objects.get(pk=response.data['data']['id'])
+        self.assertFalse(upload.readings.exists())
+        self.assertEqual(upload.readings_state, EquipmentUpload.READINGS_FAILED)
+        self.assertEqual(response.data['data']['readings_state'], EquipmentUpload.READINGS_FAILED)
+
+        call_command('load_readings', stdout=io.StringIO())
+        upload.refresh_from_db()
+        self.assertEqual(upload.readings_state, EquipmentUpload.READINGS_LOADED)
+        self.assertEqual(upload.readings.count(), 10)
+
+    @override_settings(EQUIPMENT_STORE_READINGS=False)
+    def test_disabled_readings_are_not_loaded(self):
+        response = self.upload(make_csv(10, seed=7))
+        upload = EquipmentUpload.objects.get(pk=response.data['data']['id'])
+        self.assertEqual(upload.readings_state, EquipmentUpload.READINGS_NONE)
+        self.assertFalse(upload.readings.exists())
+
+
+class AnomalyTests(EquipmentAPITestCase):
+    """Outlying values are flagged at ingest and listed per upload."""
+
+    def upload_with_outlier(self):
+        content = make_csv(200, seed=40) + b'Pump stuck,Rotary,142,9999,21\n'
+        return self.upload(content).data['data']['id']
+
+    def test_stuck_value_is_flagged(self):
+        upload_id = self.upload_with_outlier()
+        response = self.client.get(f'/api/uploads/{upload_id}/anomalies/', {'column': 'pressure'})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(response.data['total'], 2)
+        flags = response.data['data']
+        self.assertEqual({flag['scope'] for flag in flags}, {'column', 'type'})
+        self.assertEqual({(flag['name'], flag['value']) for flag in flags}, {('Pump stuck', 9999.0)})
+
+        scoped = self.client.get(f'/api/uploads/{upload_id}/anomalies/', {'scope': 'type'}).data['data']
+        self.assertTrue(scoped)
+        self.assertEqual({flag['scope'] for flag in scoped}, {'type'})
+
+    def test_invalid_filters_are_rejected(self):
+        upload_id = self.upload_with_outlier()
+        for params in ({'column': 'name'}, {'scope': 'row'}):
+            response = self.client.get(f'/api/uploads/{upload_id}/anomalies/', params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_clean_upload_has_no_flags(self):
+        upload_id = self.upload(make_csv(200, seed=41)).data['data']['id']
+        response = self.client.get(f'/api/uploads/{upload_id}/anomalies/')
+        self.assertEqual((response.data['total'], response.data['data']), (0, []))
+
+    @override_settings(EQUIPMENT_STORE_ROWS=False)
+    def test_detection_without_stored_rows_is_not_available(self):
+        upload_id = self.upload_with_outlier()
+        self.assertIsNone(EquipmentUpload.objects.get(pk=upload_id).anomaly_count)
+        response = self.client.get(f'/api/uploads/{upload_id}/anomalies/')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('not stored', response.data['error'])
+
+    @override_settings(EQUIPMENT_ANOMALY_METHOD='off')
+    def test_disabled_stage_is_not_available(self):
+        upload_id = self.upload_with_outlier()
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/anomalies/').status_code, 404)
+
+
+class HistoryPaginationTests(EquipmentAPITestCase):
+    """History pages follow (uploaded_at, id) newest first through keyset cursors."""
+
+    def setUp(self):
+        super().setUp()
+        self.ids = [self.upload(make_csv(4, seed=seed)).data['data']['id'] for seed in range(5)]
+
+    def test_next_links_visit_every_upload_once(self):
+        seen = []
+        url = '/api/history/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(response.data['count'], 2)
+            seen += [upload['id'] for upload in response.data['data']]
+            url = response.data['next']
+        self.assertEqual(seen, self.ids[::-1])
+
+    def test_uploads_sharing_a_timestamp_are_ordered_by_id(self):
+        EquipmentUpload.objects.update(uploaded_at=EquipmentUpload.objects.get(pk=self.ids[0]).uploaded_at)
+        first = self.client.get('/api/history/?page_size=3')
+        second = self.client.get(first.data['next'])
+        pages = [upload['id'] for response in (first, second) for upload in response.data['data']]
+        self.assertEqual(pages, self.ids[::-1])
+        self.assertIsNone(second.data['next'])
+
+    def test_first_link_drops_the_cursor(self):
+        first = self.client.get('/api/history/?page_size=2')
+        second = self.client.get(first.data['next'])
+        self.assertEqual(second.data['first'], 'http://testserver/api/history/?page_size=2')
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/history/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class TypeSummaryTests(EquipmentAPITestCase):
+    """Per-type counts are stored as rows and queried in SQL."""
+
+    def upload_types(self, *types, seed=0):
+        lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+        lines += [f'Pump {seed}-{i},{equipment_type},{100 + seed},{50 + i},20' for i, equipment_type in enumerate(types)]
+        return self.upload(('\n'.join(lines) + '\n').encode()).data['data']['id']
+
+    def test_type_counts_are_stored_in_file_order(self):
+        pk = self.upload_types('Valve', 'Pump', 'Valve', 'Mixer')
+        upload = EquipmentUpload.objects.get(pk=pk)
+        self.assertEqual(
+            list(upload.type_summaries.values_list('equipment_type', 'count')),
+            [('Valve', 2), ('Pump', 1), ('Mixer', 1)],
+        )
+        response = self.client.get(f'/api/uploads/{pk}/')
+        self.assertEqual(response.data['type_distribution'], {'Valve': 2, 'Pump': 1, 'Mixer': 1})
+
+    def test_types_colliding_when_truncated_share_a_summary(self):
+        long_type = 'T' * UploadTypeSummary.TYPE_MAX_LENGTH
+        pk = self.upload_types(long_type + 'a', long_type + 'b', 'Pump')
+        upload = EquipmentUpload.objects.get(pk=pk)
+        self.assertEqual(upload.type_distribution, {long_type: 2, 'Pump': 1})
+
+    def test_history_filters_by_type(self):
+        with_valve = self.upload_types('Valve', 'Pump', seed=1)
+        self.upload_types('Pump', seed=2)
+        response = self.client.get('/api/history/?type=Valve')
+        self.assertEqual([upload['id'] for upload in response.data['data']], [with_valve])
+        self.assertEqual(response.data['data'][0]['type_distribution'], {'Valve': 1, 'Pump': 1})
+
+    def test_types_totals_across_uploads(self):
+        self.upload_types('Valve', 'Pump', 'Pump', seed=1)
+        self.upload_types('Pump', 'Mixer', 'Mixer', seed=2)
+        response = self.client.get('/api/types/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            [(row['equipment_type'], row['total'], row['uploads']) for row in response.data['data']],
+            [('Pump', 3, 2), ('Mixer', 2, 1), ('Valve', 1, 1)],
+        )
+
+    def test_deleting_an_upload_removes_its_types(self):
+        pk = self.upload_types('Valve', seed=1)
+        self.upload_types('Pump', seed=2)
+        EquipmentUpload.objects.filter(pk=pk).delete()
+        response = self.client.get('/api/types/')
+        self.assertEqual([row['equipment_type'] for row in response.data['data']], ['Pump'])
+
+
+class TypeStatisticsTests(EquipmentAPITestCase):
+    """Uploads report mean, minimum and maximum of each column per type."""
+
+    def test_upload_reports_statistics_per_type(self):
+        content = make_csv(30, seed=80)
+        response = self.upload(content)
+        type_statistics = response.data['data']['type_statistics']
+        for equipment_type, rows in pd.read_csv(io.BytesIO(content)).groupby('Type'):
+            self.assertEqual(type_statistics[equipment_type]['count'], len(rows))
+            for column, prefix in UploadTypeSummary.STATISTIC_COLUMNS.items():
+                values = type_statistics[equipment_type][prefix]
+                self.assertAlmostEqual(values['mean'], rows[column].mean())
+                self.assertEqual((values['min'], values['max']), (rows[column].min(), rows[column].max()))
+
+    def test_history_reports_statistics_per_type(self):
+        pk = self.upload(make_csv(10, seed=81)).data['data']['id']
+        [upload] = self.client.get('/api/history/').data['data']
+        self.assertEqual(upload['type_statistics'], EquipmentUpload.objects.get(pk=pk).type_statistics)
+        self.assertEqual(upload['type_statistics']['Rotary']['count'], 5)
+
+    def test_summaries_without_statistics_report_nulls(self):
+        pk = self.upload(make_csv(10, seed=82)).data['data']['id']
+        # Summaries stored before per-type statistics were tracked
+        UploadTypeSummary.objects.update(**{
+            f'{name}_{prefix}': None
+            for prefix in UploadTypeSummary.STATISTIC_COLUMNS.values()
+            for name in ('avg', 'min', 'max')
+        })
+        response = self.client.get(f'/api/uploads/{pk}/')
+        self.assertEqual(response.data['type_statistics']['Rotary'], {
+            'count': 5,
+            'flowrate': {'mean': None, 'min': None, 'max': None},
+            'pressure': {'mean': None, 'min': None, 'max': None},
+            'temperature': {'mean': None, 'min': None, 'max': None},
+        })
+
+
+class CompareTests(EquipmentAPITestCase):
+    """Two uploads are compared from their stored aggregates, once per pair."""
+
+    def setUp(self):
+        super().setUp()
+        self.a = self.upload(make_csv(10, seed=90)).data['data']['id']
+        lines = make_csv(20, seed=91).decode().splitlines()
+        lines += [f'Mixer {i},Mixer,{300 + i},60,30' for i in range(4)]
+        self.b = self.upload(('\n'.join(lines) + '\n').encode()).data['data']['id']
+
+    def compare(self, a, b):
+        return self.client.get(f'/api/compare/?a={a}&b={b}')
+
+    def test_deltas_between_uploads(self):
+        response = self.compare(self.a, self.b)
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual((data['a']['id'], data['b']['id']), (self.a, self.b))
+        self.assertEqual(data['equipment_count'], {'a': 10, 'b': 24, 'delta': 14, 'pct_change': 140.0})
+
+        a_stats = EquipmentUpload.objects.get(pk=self.a).stats.summary()
+        b_stats = EquipmentUpload.objects.get(pk=self.b).stats.summary()
+        for column in NUMERIC_COLUMNS:
+            for stat, entry in data['statistics'][column].items():
+                self.assertEqual((entry['a'], entry['b']), (a_stats[column][stat], b_stats[column][stat]))
+                self.assertAlmostEqual(entry['delta'], b_stats[column][stat] - a_stats[column][stat])
+
+    def test_type_missing_from_one_upload(self):
+        data = self.compare(self.a, self.b).data
+        self.assertEqual(data['type_distribution']['Rotary'], {'a': 5, 'b': 10, 'delta': 5, 'pct_change': 100.0})
+        self.assertEqual(data['type_distribution']['Mixer'], {'a': 0, 'b': 4, 'delta': 4, 'pct_change': None})
+        self.assertEqual(
+            data['type_statistics']['Mixer']['flowrate']['max'],
+            {'a': None, 'b': 303.0, 'delta': None, 'pct_change': None},
+        )
+        rotary = data['type_statistics']['Rotary']['pressure']['min']
+        self.assertEqual((rotary['a'], rotary['b'], rotary['delta']), (50.0, 50.0, 0.0))
+
+    def test_upload_without_stats_state_compares_averages(self):
+        EquipmentUpload.objects.filter(pk=self.a).update(stats_state='')
+        data = self.compare(self.a, self.b).data
+        flowrate = data['statistics']['Flowrate']
+        self.assertEqual(flowrate['count']['a'], 10)
+        self.assertEqual(flowrate['mean']['a'], EquipmentUpload.objects.get(pk=self.a).avg_flowrate)
+        self.assertIsNone(flowrate['max']['a'])
+        self.assertIsNotNone(flowrate['max']['b'])
+
+    def test_comparison_is_memoized(self):
+        first = self.compare(self.a, self.b).data
+        with self.assertNumQueries(0):
+            second = self.compare(self.a, self.b).data
+        self.assertEqual(second, first)
+        # The reverse pair is its own comparison
+        self.assertEqual(self.compare(self.b, self.a).data['equipment_count']['delta'], -14)
+
+    def test_invalid_and_missing_ids(self):
+        for query in ('?a=1', f'?a={self.a}&b=two'):
+            with self.subTest(query):
+                response = self.client.get(f'/api/compare/{query}')
+                self.assertEqual(response.status_code, 400)
+        response = self.compare(self.a, 999)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['error'], 'Upload 999 not found.')
+
+
+class HistogramEndpointTests(EquipmentAPITestCase):
+    """Histograms are served from the state kept at ingest, overall and per type."""
+
+    def setUp(self):
+        super().setUp()
+        self.content = make_csv(200, seed=95)
+        self.pk = self.upload(self.content).data['data']['id']
+        self.rows = pd.read_csv(io.BytesIO(self.content))
+
+    def get_histograms(self, query=''):
+        return self.client.get(f'/api/uploads/{self.pk}/histograms/{query}')
+
+    def test_histograms_of_columns_and_types(self):
+        response = self.get_histograms()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['columns']), ['flowrate', 'pressure', 'temperature'])
+        self.assertEqual(sorted(response.data['types']), ['Centrifugal', 'Rotary'])
+        flowrate = response.data['columns']['flowrate']
+        self.assertEqual(flowrate['count'], 200)
+        expected, _ = np.histogram(self.rows['Flowrate'], bins=flowrate['fixed']['edges'])
+        self.assertEqual(flowrate['fixed']['counts'], expected.tolist())
+        self.assertEqual(len(flowrate['quantile']['edges']), 11)
+        self.assertEqual(sum(flowrate['quantile']['counts']), 200)
+
+        rotary = response.data['types']['Rotary']['pressure']
+        rows = self.rows[self.rows['Type'] == 'Rotary']['Pressure']
+        expected, _ = np.histogram(rows, bins=rotary['fixed']['edges'])
+        self.assertEqual(rotary['fixed']['counts'], expected.tolist())
+        self.assertEqual((rotary['quantile']['edges'][0], rotary['quantile']['edges'][-1]), (rows.min(), rows.max()))
+
+    def test_options_narrow_the_histograms(self):
+        response = self.get_histograms('?column=pressure,temperature&type=none&bins=2&quantile_bins=4')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['columns']), ['pressure', 'temperature'])
+        self.assertEqual(response.data['types'], {})
+        pressure = response.data['columns']['pressure']
+        self.assertLessEqual(len(pressure['fixed']['counts']), 2)
+        self.assertEqual(sum(pressure['fixed']['counts']), 200)
+        self.assertEqual(pressure['quantile']['counts'], [50, 50, 50, 50])
+
+        response = self.get_histograms('?type=Rotary,Valve&column=flowrate')
+        self.assertEqual(list(response.data['types']), ['Rotary'])
+
+    def test_invalid_options_are_rejected(self):
+        for query in ('?column=speed', '?bins=0', '?quantile_bins=101', '?bins=many'):
+            with self.subTest(query):
+                response = self.get_histograms(query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+    def test_missing_histograms_are_not_found(self):
+        EquipmentUpload.objects.filter(pk=self.pk).update(histogram_state='')
+        self.assertEqual(self.get_histograms().status_code, 404)
+        self.assertEqual(self.client.get('/api/uploads/999/histograms/').status_code, 404)
+
+
+class SeriesEndpointTests(EquipmentAPITestCase):
+    """Series are read from the column store and memoized per request shape."""
+
+    def setUp(self):
+        super().setUp()
+        self.content = make_csv(500, seed=96)
+        self.pk = self.upload(self.content).data['data']['id']
+        self.flowrate = pd.read_csv(io.BytesIO(self.content))['Flowrate'].to_numpy()
+
+    def get_series(self, query):
+        return self.client.get(f'/api/uploads/{self.pk}/series/{query}')
+
+    def test_series_of_a_column(self):
+        for method, decimate in (('lttb', lttb_decimate), ('minmax', minmax_decimate)):
+            with self.subTest(method):
+                response = self.get_series(f'?column=flowrate&points=40&method={method}')
+                self.assertEqual(response.status_code, 200)
+                data = response.data
+                self.assertEqual((data['upload_id'], data['rows'], data['method'], data['points']), (self.pk, 500, method, 40))
+                self.assertEqual(data['x'], decimate(self.flowrate, 40).tolist())
+                self.assertEqual(data['y'], self.flowrate[data['x']].tolist())
+
+    def test_defaults_keep_short_columns_whole(self):
+        data = self.get_series('?column=pressure').data
+        self.assertEqual((data['method'], data['points']), ('lttb', 1000))
+        self.assertEqual(data['x'], list(range(500)))
+
+    def test_series_is_memoized(self):
+        first = self.get_series('?column=flowrate&points=40').data
+        with mock.patch('equipment_api.series.downsample') as downsample:
+            second = self.get_series('?column=flowrate&points=40').data
+        downsample.assert_not_called()
+        self.assertEqual(second, first)
+
+    def test_invalid_options_are_rejected(self):
+        for query in ('', '?column=speed', '?column=flowrate&method=mean', '?column=flowrate&points=2', '?column=flowrate&points=10001'):
+            with self.subTest(query):
+                response = self.get_series(query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+    def test_unstored_rows_are_not_found(self):
+        EquipmentUpload.objects.filter(pk=self.pk).update(data_path='')
+        response = self.get_series('?column=flowrate')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['error'], f'Rows of upload {self.pk} are not stored.')
+
+
+class RollupTests(EquipmentAPITestCase):
+    """Daily rollups are incremented as uploads commit and outlive the uploads."""
+
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = make_csv(8, seed=1), make_csv(12, seed=2)
+        self.first_id = self.upload(self.first).data['data']['id']
+        second = io.BytesIO(self.second)
+        second.name = 'second.csv'
+        self.client.post('/api/upload/batch/', {'files': [second]}, format='multipart')
+        self.rows = pd.concat([pd.read_csv(io.BytesIO(content)) for content in (self.first, self.second)])
+
+    def get_rollups(self, query=''):
+        response = self.client.get(f'/api/rollups/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def test_uploads_of_one_day_share_a_rollup(self):
+        [rollup] = self.get_rollups()
+        self.assertEqual(rollup['day'], timezone.localdate().isoformat())
+        self.assertEqual(rollup['uploads'], 2)
+        self.assertEqual(rollup['equipment_count'], 20)
+        for column in NUMERIC_COLUMNS:
+            self.assertAlmostEqual(rollup[f'avg_{column.lower()}'], self.rows[column].mean())
+
+    def test_type_rollups(self):
+        rollups = self.get_rollups('?by_type=true')
+        self.assertEqual([rollup['equipment_type'] for rollup in rollups], ['Centrifugal', 'Rotary'])
+        [rotary] = self.get_rollups('?type=Rotary')
+        rows = self.rows[self.rows['Type'] == 'Rotary']
+        self.assertEqual(rotary['uploads'], 2)
+        self.assertEqual(rotary['equipment_count'], len(rows))
+        self.assertAlmostEqual(rotary['avg_flowrate'], rows['Flowrate'].mean())
+
+    def test_rebuild_buckets_uploads_by_day(self):
+        earlier = timezone.now() - timedelta(days=3)
+        EquipmentUpload.objects.filter(pk=self.first_id).update(uploaded_at=earlier)
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        rollups = self.get_rollups()
+        self.assertEqual(
+            [(rollup['day'], rollup['equipment_count']) for rollup in rollups],
+            [(timezone.localdate(earlier).isoformat(), 8), (timezone.localdate().isoformat(), 12)],
+        )
+        today = timezone.localdate().isoformat()
+        self.assertEqual([rollup['equipment_count'] for rollup in self.get_rollups(f'?start={today}')], [12])
+        self.assertEqual([rollup['equipment_count'] for rollup in self.get_rollups(f'?end={today}')], [8, 12])
+        self.assertEqual(self.client.get('/api/rollups/?start=yesterday').status_code, 400)
+
+    def test_rebuild_fills_type_sums_from_the_stored_rows(self):
+        for upload in EquipmentUpload.objects.all():
+            state = json.loads(upload.stats_state)
+            state['type_sums'] = {}
+            EquipmentUpload.objects.filter(pk=upload.pk).update(stats_state=json.dumps(state))
+        expected = self.get_rollups('?type=Rotary')
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        [rotary] = self.get_rollups('?type=Rotary')
+        self.assertAlmostEqual(rotary['avg_flowrate'], expected[0]['avg_flowrate'])
+
+    def test_rollups_outlive_deleted_uploads(self):
+        before = self.get_rollups()
+        EquipmentUpload.objects.all().delete()
+        self.assertEqual(self.get_rollups(), before)
+
+
+class QueryTests(EquipmentAPITestCase):
+    """Row filters, projections and aggregates over an upload's stored rows."""
+
+    def setUp(self):
+        super().setUp()
+        self.upload_id = self.upload(make_csv(10)).data['data']['id']
+
+    def query(self, params):
+        """Status code and body of a query; rows are streamed, aggregates are not."""
+        response = self.client.get(f'/api/uploads/{self.upload_id}/query/?{params}')
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content
+
+    def test_filters_and_fields(self):
+        status_code, content = self.query('pressure__gt=52&type=Rotary&fields=name,pressure')
+        self.assertEqual(status_code, 200)
+        self.assertEqual(json.loads(content)['data'], [
+            {'name': 'Pump 0-3', 'pressure': 53.0},
+            {'name': 'Pump 0-9', 'pressure': 54.0},
+        ])
+
+    def test_limit_and_offset(self):
+        data = json.loads(self.query('limit=2&offset=1&fields=name')[1])
+        self.assertEqual(data['matched'], 10)
+        self.assertEqual(data['data'], [{'name': 'Pump 0-1'}, {'name': 'Pump 0-2'}])
+
+    def test_aggregates_grouped_by_type(self):
+        data = json.loads(self.query('agg=count,mean,max&group_by=type&flowrate__lte=104')[1])
+        groups = {group['type']: group for group in data['groups']}
+        self.assertEqual(data['matched'], 8)
+        self.assertEqual(groups['Centrifugal']['count'], 4)
+        self.assertEqual(groups['Rotary']['aggregates']['flowrate'], {'count': 4, 'mean': 101.5, 'max': 103.0})
+
+    def test_csv_output(self):
+        status_code, content = self.query('output=csv&pressure=50&fields=name,type')
+        self.assertEqual(status_code, 200)
+        self.assertEqual(content, b'name,type\r\nPump 0-0,Centrifugal\r\nPump 0-5,Rotary\r\n')
+
+    def test_invalid_parameters_are_rejected(self):
+        for params, error in (
+            ('pressure__xx=1', 'Unknown operator in pressure__xx; use one of gt, gte, lt, lte, ne.'),
+            ('fields=bogus', 'Unknown fields: bogus'),
+        ):
+            status_code, content = self.query(params)
+            self.assertEqual(status_code, 400, params)
+            self.assertEqual(json.loads(content)['error'], error)
+
+
+class ReportTests(EquipmentAPITestCase):
+    """PDF reports are rendered once, served with validators and evicted by access."""
+
+    def get_report(self, upload_id, **headers):
+        response = self.client.get('/api/report/', {'upload_id': upload_id}, **headers)
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+            response.close()
+            return response, content
+        return response, b''
+
+    def test_report_is_rendered_once_and_revalidated(self):
+        upload_id = self.upload(make_csv(20)).data['data']['id']
+        with mock.patch('equipment_api.report_cache.generate_equipment_report', wraps=generate_equipment_report) as render:
+            first, content = self.get_report(upload_id)
+            second, cached = self.get_report(upload_id)
+            not_modified, _ = self.get_report(upload_id, HTTP_IF_NONE_MATCH=first['ETag'])
+        render.assert_called_once()
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(cached, content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+
+        stale, _ = self.get_report(upload_id, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(stale.status_code, 200)
+
+    @override_settings(EQUIPMENT_REPORT_CACHE_MAX_BYTES=0)
+    def test_disabled_cache_renders_in_memory(self):
+        upload_id = self.upload(make_csv(20)).data['data']['id']
+        response, content = self.get_report(upload_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertNotIn('ETag', response)
+        self.assertFalse(os.path.exists(get_report_cache_dir()))
+
+    def test_least_recently_served_reports_are_evicted(self):
+        os.makedirs(get_report_cache_dir())
+        paths = [os.path.join(get_report_cache_dir(), f'report_{i}_0_v1.pdf') for i in range(3)]
+        for atime, path in zip((300, 100, 200), paths):
+            with open(path, 'wb') as f:
+                f.write(b'x' * 100)
+            os.utime(path, (atime, atime))
+        self.assertEqual(evict_reports(150, keep=paths[1]), 2)
+        self.assertEqual([os.path.exists(path) for path in paths], [False, True, False])
+
+    def test_unknown_upload_is_not_found(self):
+        response, _ = self.get_report(999)
+        self.assertEqual(response.status_code, 404)
+
+
+class SerializerTests(EquipmentAPITestCase):
+    """Upload representations are built from one parse of the stored state."""
+
+    def test_stats_state_is_parsed_once_per_upload(self):
+        self.upload(make_csv(10, seed=7))
+        upload = EquipmentUpload.objects.get()
+        with mock.patch.object(EquipmentStats, 'from_json', wraps=EquipmentStats.from_json) as from_json:
+            data = EquipmentUploadSerializer(upload).data
+        from_json.assert_called_once()
+        self.assertEqual(data['statistics']['Flowrate']['count'], 10)
+        self.assertEqual(data['correlations']['overall']['count'], 10)
+
+
+class RetentionTests(EquipmentAPITestCase):
+    """Pruning keeps the newest uploads and removes the readings of the rest."""
+
+    def test_prune_deletes_readings_in_batches_then_uploads(self):
+        ids = [self.upload(make_csv(10, seed=seed)).data['data']['id'] for seed in range(3)]
+        self.assertEqual(EquipmentReading.objects.count(), 30)
+
+        self.assertEqual(delete_readings([ids[0]], batch_size=4), 10)
+        self.assertEqual(prune_uploads(max_count=1, batch_size=1), 2)
+        self.assertEqual(list(EquipmentUpload.objects.values_list('id', flat=True)), [ids[2]])
+        self.assertEqual(set(EquipmentReading.objects.values_list('upload_id', flat=True)), {ids[2]})
+
+    def test_files_are_removed_once_the_delete_commits(self):
+        upload = EquipmentUpload.objects.get(pk=self.upload(make_csv(10)).data['data']['id'])
+        store = os.path.join(settings.MEDIA_ROOT, upload.data_path)
+        os.makedirs(get_report_cache_dir())
+        report = os.path.join(get_report_cache_dir(), f'report_{upload.pk}_1.pdf')
+        open(report, 'wb').close()
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            EquipmentUpload.objects.filter(pk=upload.pk).delete()
+            raise RuntimeError('rolled back')
+        self.assertTrue(os.path.isdir(store))
+        self.assertTrue(os.path.exists(report))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            EquipmentUpload.objects.filter(pk=upload.pk).delete()
+            self.assertTrue(os.path.isdir(store))
+        self.assertFalse(os.path.exists(store))
+        self.assertFalse(os.path.exists(report))
+
+    @override_settings(EQUIPMENT_PRUNE_INTERVAL_SECONDS=3600)
+    def test_pruner_starts_once_and_prunes_at_once(self):
+        with mock.patch.object(retention, '_pruner', None), mock.patch('equipment_api.retention.threading.Thread') as thread:
+            retention.start_pruner()
+            retention.start_pruner()
+        thread.assert_called_once()
+        self.assertEqual(thread.call_args.kwargs['args'], (3600,))
+
+        with mock.patch('equipment_api.retention.prune_uploads', return_value=0) as prune, \
+                mock.patch('equipment_api.retention.close_old_connections'), \
+                mock.patch('equipment_api.retention.time.sleep', side_effect=StopIteration):
+            with self.assertRaises(StopIteration):
+                retention._pruner_loop(3600)
+        prune.assert_called_once_with()
+
+    def test_first_request_starts_background_work(self):
+        with mock.patch.object(signals, 'recover_stale_jobs') as recover, \
+                mock.patch.object(signals, 'start_pruner') as start:
+            signals.start_background_work(sender=None)
+        recover.assert_called_once_with()
+        start.assert_called_once_with()
+
+
+class DatabaseConfigTests(TestCase):
+    """PostgreSQL settings use Django's pool when psycopg's pool is usable."""
+
+    @mock.patch.dict('os.environ', {'DB_ENGINE': 'postgresql', 'DB_POOL_MAX_SIZE': '4'})
+    def test_postgresql_pool_on_supported_django(self):
+        with mock.patch.object(database, '_pool_available', return_value=True):
+            config = database.database_config('/tmp')
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 4)
+
+    @mock.patch.dict('os.environ', {'DB_ENGINE': 'postgresql', 'DB_CONN_MAX_AGE': '60'})
+    @mock.patch.object(database.django, 'VERSION', (4, 2, 7, 'final', 0))
+    def test_postgresql_without_pool_before_django_5_1(self):
+        self.assertFalse(database._pool_available())
+        config = database.database_config('/tmp')
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertNotIn('pool', config['OPTIONS'])
+
+    @mock.patch.dict('os.environ', {}, clear=True)
+    @mock.patch.object(database.django, 'VERSION', (4, 2, 7, 'final', 0))
+    def test_sqlite_immediate_transactions_before_django_5_1(self):
+        config = database.database_config('/tmp')
+        self.assertEqual(config['ENGINE'], database.SQLITE_IMMEDIATE_ENGINE)
+        self.assertNotIn('transaction_mode', config['OPTIONS'])
+
+    @mock.patch.dict('os.environ', {'DB_ENGINE': 'postgresql', 'DB_CONN_MAX_AGE': '60'})
+    def test_postgresql_persistent_connections_without_pool(self):
+        with mock.patch.object(database, '_pool_available', return_value=False):
+            config = database.database_config('/tmp')
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertNotIn('pool', config['OPTIONS'])
@@ -0,0 +1,68 @@
+"""
+Upload handlers for equipment_api.
+"""
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class ContentHashMixin:
+    """
+    Hashes each file while the handler stores it.
+
+    The SHA-256 digest is set as ``content_hash`` on the file object the
+    handler returns, so every uploaded file carries its own digest, even when
+    several files share a field and a name.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Reset first: the memory handler stops later handlers from here
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def stores_file(self):
+        """Whether this handler, rather than a later one, keeps the current file."""
+        return True
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.stores_file():
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.content_hash = self.hasher.hexdigest()
+        return uploaded_file
+
+
+class ContentHashMemoryFileUploadHandler(ContentHashMixin, MemoryFileUploadHandler):
+    """Keeps small uploads in memory, hashing them as they stream in."""
+
+    def stores_file(self):
+        return self.activated
+
+
+class ContentHashTemporaryFileUploadHandler(ContentHashMixin, TemporaryFileUploadHandler):
+    """Spools large uploads to a temporary file, hashing them as they stream in."""
+
+
+def get_content_hash(uploaded_file):
+    """
+    SHA-256 hex digest of an uploaded file.
+
+    Uses the digest computed while the upload was received when available,
+    otherwise hashes the file chunk by chunk.
+    """
+    digest = getattr(uploaded_file, 'content_hash', None)
+    if digest:
+        return digest
+    return hash_chunks(uploaded_file.chunks())
+
+
+def hash_chunks(chunks):
+    """SHA-256 hex digest of an iterable of byte chunks."""
+    hasher = hashlib.sha256()
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.hexdigest()
@@ -3,9 +3,12 @@ URL configuration for equipment_api app.
 """
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from equipment_api.views import EquipmentUploadViewSet
+from equipment_api.views import EquipmentUploadViewSet, UploadJobViewSet, UploadSessionViewSet, UploadViewSet
 
 router = DefaultRouter()
+router.register(r'jobs', UploadJobViewSet, basename='upload-job')
+router.register(r'upload/sessions', UploadSessionViewSet, basename='upload-session')
+router.register(r'uploads', UploadViewSet, basename='upload')
 router.register(r'', EquipmentUploadViewSet, basename='equipment')
 
 urlpatterns = router.urls
@@ -4,17 +4,61 @@ Views for equipment API - handles CSV upload, history, and PDF report endpoints.
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
-from django.http import FileResponse
-import pandas as pd
-import json
+from rest_framework.reverse import reverse
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Sum
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 import io
 
-from equipment_api.models import EquipmentUpload
-from equipment_api.serializers import EquipmentUploadSerializer, CSVUploadSerializer
+from equipment_api.models import (
+    DailyRollup,
+    DailyTypeRollup,
+    EquipmentAnomaly,
+    EquipmentUpload,
+    UploadJob,
+    UploadSession,
+    UploadTypeSummary,
+)
+from equipment_api.serializers import (
+    EquipmentUploadSerializer,
+    EquipmentAnomalySerializer,
+    CSVUploadSerializer,
+    TypeTotalSerializer,
+    DailyRollupSerializer,
+    DailyTypeRollupSerializer,
+    BatchUploadSerializer,
+    UploadJobSerializer,
+    UploadSessionCreateSerializer,
+    UploadSessionCompleteSerializer,
+    UploadSessionSerializer,
+)
 from equipment_api.pdf_utils import generate_equipment_report
+from equipment_api.report_cache import get_report_cache_max_bytes, open_report, report_validators
+from equipment_api.ingest import IngestError
+from equipment_api.pipeline import DuplicateUpload, process_upload
+from equipment_api.jobs import submit_upload_job
+from equipment_api.batch import collect_archive, collect_uploaded_files, process_batch
+from equipment_api.upload_handlers import get_content_hash
+from equipment_api.compare import get_comparison
+from equipment_api.compression import compression_for
+from equipment_api.filters import parse_day, parse_moment
+from equipment_api.histograms import histogram_options, upload_histograms
+from equipment_api.pagination import UploadKeysetPagination
+from equipment_api.parsers import CSVBodyParser
+from equipment_api.query import EquipmentQuery, QueryError
+from equipment_api.series import get_series, series_options
+from equipment_api.resumable import (
+    OffsetConflict,
+    abort_session,
+    complete_session,
+    create_session,
+    get_chunk_max_bytes,
+    write_chunk,
+)
 
 
 class EquipmentUploadViewSet(viewsets.ViewSet):
@@ -23,7 +67,12 @@ class EquipmentUploadViewSet(viewsets.ViewSet):
     
     Endpoints:
     - POST /api/upload/ : Upload CSV file
-    - GET /api/history/ : Get last 5 uploads
+    - POST /api/upload/batch/ : Upload several CSV files or a ZIP archive
+    - GET /api/history/ : Page through uploads, filtered by type or upload date
+    - GET /api/types/ : Equipment totals per type across stored uploads
+    - GET /api/rollups/ : Daily totals and averages, overall or per type
+    - GET /api/compare/?a=<id>&b=<id> : Deltas between two uploads
+    - GET /api/report/ : Download PDF report
     
     Authentication: Basic Auth required (username/password)
     """
@@ -31,14 +80,37 @@ class EquipmentUploadViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser)
     
-    @action(detail=False, methods=['post'])
+    def duplicate_response(self, upload):
+        """Answer an upload of bytes already stored with the existing upload."""
+        serializer = EquipmentUploadSerializer(upload)
+        return Response(
+            {
+                'message': 'CSV already uploaded; returning existing statistics',
+                'duplicate': True,
+                'data': serializer.data
+            },
+            status=status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['post'], parser_classes=(MultiPartParser, FormParser, CSVBodyParser))
     def upload(self, request):
         """
         Upload a CSV file with equipment data.
         
         Expected columns: Equipment Name, Type, Flowrate, Pressure, Temperature
         
-        Returns: Upload summary with statistics
+        Form fields:
+        - csv_file: The CSV file, optionally compressed (.csv.gz, .csv.bz2, .csv.zst)
+        - mode: Optional. 'sync' (default) processes the file in the request;
+                'async' queues a background job and returns 202 with its id.
+        
+        The CSV may also be sent as a raw text/csv request body, optionally
+        with Content-Encoding: gzip, and mode as a query parameter.
+        
+        Re-uploads of byte-identical files return the existing upload (200)
+        without parsing the file again.
+        
+        Returns: Upload summary with statistics, or the queued job
         """
         serializer = CSVUploadSerializer(data=request.data)
         
@@ -51,54 +123,36 @@ class EquipmentUploadViewSet(viewsets.ViewSet):
         csv_file = serializer.validated_data['csv_file']
         
         try:
-            # Read CSV file
-            df = pd.read_csv(io.StringIO(csv_file.read().decode('utf-8')))
+            compression = compression_for(csv_file.name, getattr(csv_file, 'content_encoding', None))
             
-            # Validate required columns
-            required_columns = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-            missing_columns = set(required_columns) - set(df.columns)
+            # Identical bytes were uploaded before: return the stored statistics
+            content_hash = get_content_hash(csv_file)
+            existing = EquipmentUpload.find_by_content_hash(content_hash)
+            if existing:
+                return self.duplicate_response(existing)
             
-            if missing_columns:
+            if serializer.validated_data['mode'] == 'async':
+                # Spool the file and hand it to the background job pool
+                job = submit_upload_job(csv_file, content_hash=content_hash, compression=compression)
+                status_url = reverse('upload-job-detail', kwargs={'pk': job.pk}, request=request)
                 return Response(
                     {
-                        'error': f"Missing columns: {', '.join(missing_columns)}",
-                        'required_columns': required_columns
+                        'message': 'CSV accepted for processing',
+                        'job_id': str(job.pk),
+                        'status_url': status_url,
                     },
-                    status=status.HTTP_400_BAD_REQUEST
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': status_url},
                 )
             
-            # Select only required columns and remove rows with NaN values
-            df = df[required_columns].dropna()
-            
-            if len(df) == 0:
-                return Response(
-                    {'error': 'No valid data found in CSV'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Compute statistics
-            equipment_count = len(df)
-            avg_flowrate = float(df['Flowrate'].mean())
-            avg_pressure = float(df['Pressure'].mean())
-            avg_temperature = float(df['Temperature'].mean())
-            
-            # Equipment type distribution
-            type_distribution = df['Type'].value_counts().to_dict()
-            type_distribution_json = json.dumps(type_distribution)
-            
-            # Create upload record
-            upload = EquipmentUpload.objects.create(
-                filename=csv_file.name,
-                equipment_count=equipment_count,
-                avg_flowrate=avg_flowrate,
-                avg_pressure=avg_pressure,
-                avg_temperature=avg_temperature,
-                type_distribution=type_distribution_json,
+            # Stream (and decompress) the CSV into statistics and a column store, then save the upload
+            upload = process_upload(
+                csv_file.name,
+                uploaded_file=csv_file,
+                content_hash=content_hash,
+                compression=compression,
             )
             
-            # Cleanup old uploads (keep only last 5)
-            EquipmentUpload.cleanup_old_uploads()
-            
             # Return the created upload
             serializer = EquipmentUploadSerializer(upload)
             return Response(
@@ -109,9 +163,12 @@ class EquipmentUploadViewSet(viewsets.ViewSet):
                 status=status.HTTP_201_CREATED
             )
         
-        except pd.errors.ParserError:
+        except DuplicateUpload as e:
+            # Identical bytes were saved while this file was being parsed
+            return self.duplicate_response(e.upload)
+        except IngestError as e:
             return Response(
-                {'error': 'Invalid CSV format'},
+                e.as_response_data(),
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
@@ -120,24 +177,211 @@ class EquipmentUploadViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'], url_path='upload/batch')
+    def upload_batch(self, request):
+        """
+        Upload several CSV files, or a ZIP archive of CSV files, at once.
+        
+        Form fields:
+        - files: One or more CSV files (repeat the field)
+        - archive: Optional ZIP archive of CSV files
+        
+        Files are parsed concurrently and all new uploads are saved in one
+        transaction. Byte-identical files are reported as duplicates.
+        
+        Returns: One result per file with its status and upload summary
+        """
+        serializer = BatchUploadSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        items = []
+        try:
+            items = collect_uploaded_files(serializer.validated_data.get('files', []))
+            archive = serializer.validated_data.get('archive')
+            if archive:
+                items += collect_archive(archive)
+            
+            results = process_batch(items)
+        except IngestError as e:
+            return Response(
+                e.as_response_data(),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Error processing batch: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        finally:
+            for item in items:
+                item.cleanup()
+        
+        data = [
+            {
+                'filename': item.filename,
+                'status': item_status,
+                'data': EquipmentUploadSerializer(upload).data if upload else None,
+                'error': error,
+            }
+            for item, item_status, upload, error in results
+        ]
+        created = sum(1 for result in data if result['status'] == 'created')
+        return Response(
+            {
+                'message': f'{created} of {len(data)} files uploaded',
+                'created': created,
+                'duplicates': sum(1 for result in data if result['status'] == 'duplicate'),
+                'failed': sum(1 for result in data if result['status'] == 'error'),
+                'results': data,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+    
     @action(detail=False, methods=['get'])
     def history(self, request):
         """
-        Retrieve the last 5 uploaded files with their statistics.
+        Retrieve uploaded files with their statistics, one page at a time.
+        
+        Query Parameters:
+        - type: Optional. Only uploads containing this equipment type.
+        - uploaded_after: Optional. ISO date or datetime, inclusive.
+        - uploaded_before: Optional. ISO date or datetime, exclusive.
+        - page_size: Optional. Uploads per page (default PAGE_SIZE, max 100).
+        - cursor: Optional. Opaque position taken from the 'next' link.
+        
+        Returns: A page of uploads ordered by most recent first, with the
+        link to the next page
+        """
+        uploads = EquipmentUpload.objects.prefetch_related('type_summaries')
+        equipment_type = request.query_params.get('type')
+        if equipment_type:
+            uploads = uploads.filter(type_summaries__equipment_type=equipment_type)
+        
+        for param, lookup in (('uploaded_after', 'uploaded_at__gte'), ('uploaded_before', 'uploaded_at__lt')):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            moment = parse_moment(value)
+            if moment is None:
+                return Response(
+                    {'error': f'{param} must be an ISO date or datetime.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            uploads = uploads.filter(**{lookup: moment})
+        
+        paginator = UploadKeysetPagination()
+        page = paginator.paginate_queryset(uploads, request, view=self)
+        serializer = EquipmentUploadSerializer(page, many=True)
+        
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def types(self, request):
+        """
+        Total equipment count per type across all stored uploads.
+        
+        Returns: One entry per type with its total count and the number of
+        uploads containing it, largest totals first
+        """
+        totals = (
+            UploadTypeSummary.objects
+            .values('equipment_type')
+            .annotate(total=Sum('count'), uploads=Count('upload'))
+            .order_by('-total', 'equipment_type')
+        )
+        serializer = TypeTotalSerializer(totals, many=True)
+        
+        return Response(
+            {
+                'count': len(serializer.data),
+                'data': serializer.data
+            },
+            status=status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['get'])
+    def rollups(self, request):
+        """
+        Daily totals and averages of committed uploads, from the rollup tables.
+        
+        Query Parameters:
+        - type: Optional. Daily rows of this equipment type only.
+        - by_type: Optional. 'true' for daily rows of every equipment type.
+        - start: Optional. ISO date of the first day, inclusive.
+        - end: Optional. ISO date of the last day, inclusive.
         
-        Returns: List of uploads ordered by most recent first
+        Returns: One entry per day (and type), oldest first. Days include
+        uploads since removed by retention.
         """
-        uploads = EquipmentUpload.objects.all()[:5]
-        serializer = EquipmentUploadSerializer(uploads, many=True)
+        equipment_type = request.query_params.get('type')
+        by_type = request.query_params.get('by_type', '').lower() in ('1', 'true', 'yes')
+        if equipment_type or by_type:
+            rollups = DailyTypeRollup.objects.all()
+            if equipment_type:
+                rollups = rollups.filter(equipment_type=equipment_type)
+            serializer_class = DailyTypeRollupSerializer
+        else:
+            rollups = DailyRollup.objects.all()
+            serializer_class = DailyRollupSerializer
+        
+        for param, lookup in (('start', 'day__gte'), ('end', 'day__lte')):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            day = parse_day(value)
+            if day is None:
+                return Response(
+                    {'error': f'{param} must be an ISO date.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            rollups = rollups.filter(**{lookup: day})
+        
+        serializer = serializer_class(rollups, many=True)
         
         return Response(
             {
-                'count': len(uploads),
+                'count': len(serializer.data),
                 'data': serializer.data
             },
             status=status.HTTP_200_OK
         )
     
+    @action(detail=False, methods=['get'])
+    def compare(self, request):
+        """
+        Compare two uploads from their stored statistics.
+        
+        Query Parameters:
+        - a: Required. Id of the upload compared from.
+        - b: Required. Id of the upload compared to.
+        
+        Returns: a, b, b - a and the percent change for the equipment and
+        anomaly counts, every per-column statistic, the type distribution and
+        the per-type column statistics. Memoized per (a, b) pair.
+        """
+        ids = []
+        for param in ('a', 'b'):
+            try:
+                ids.append(int(request.query_params[param]))
+            except (KeyError, ValueError):
+                return Response(
+                    {'error': f'{param} must be an upload id.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        comparison, missing = get_comparison(*ids)
+        if comparison is None:
+            return Response(
+                {'error': f'Upload {missing} not found.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(comparison, status=status.HTTP_200_OK)
+    
     @action(detail=False, methods=['get'])
     def report(self, request):
         """
@@ -147,6 +391,10 @@ class EquipmentUploadViewSet(viewsets.ViewSet):
         - upload_id: Optional. Specific upload ID to generate report for.
                      If not provided, uses most recent upload.
         
+        Reports are rendered once and served from the disk cache with an
+        ETag and Last-Modified; a matching If-None-Match or
+        If-Modified-Since gets 304 Not Modified.
+        
         Returns: PDF file as downloadable attachment
         """
         upload_id = request.query_params.get('upload_id')
@@ -169,17 +417,28 @@ class EquipmentUploadViewSet(viewsets.ViewSet):
             )
         
         try:
-            # Generate PDF
-            pdf_content = generate_equipment_report(upload)
-            
-            # Create response with PDF
             filename = f"equipment_report_{upload.id}.pdf"
-            response = FileResponse(
-                io.BytesIO(pdf_content),
-                content_type='application/pdf'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            if not get_report_cache_max_bytes():
+                # Cache disabled: render this request's PDF in memory
+                response = FileResponse(
+                    io.BytesIO(generate_equipment_report(upload)),
+                    content_type='application/pdf'
+                )
+                response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                return response
             
+            report, stat = open_report(upload)
+            etag, last_modified = report_validators(upload.id, stat)
+            not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+            if not_modified is not None:
+                report.close()
+                response = not_modified
+            else:
+                # Create response with PDF, streamed from the cached file
+                response = FileResponse(report, content_type='application/pdf')
+                response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            response['ETag'] = etag
+            response['Last-Modified'] = last_modified
             return response
         
         except Exception as e:
@@ -187,3 +446,421 @@ class EquipmentUploadViewSet(viewsets.ViewSet):
                 {'error': f'Error generating PDF report: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class UploadJobViewSet(viewsets.ViewSet):
+    """
+    ViewSet for background upload jobs.
+    
+    Endpoints:
+    - GET /api/jobs/<id>/ : Job state, progress in rows and resulting upload id
+    
+    Authentication: Basic Auth required (username/password)
+    """
+    authentication_classes = [BasicAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    
+    def retrieve(self, request, pk=None):
+        """Report the state of an upload job."""
+        try:
+            job = UploadJob.objects.get(pk=pk)
+        except (UploadJob.DoesNotExist, ValidationError):
+            return Response(
+                {'error': f'Job {pk} not found.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        serializer = UploadJobSerializer(job)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class UploadViewSet(viewsets.ViewSet):
+    """
+    ViewSet for individual uploads and their stored rows.
+    
+    Endpoints:
+    - GET /api/uploads/<id>/ : Upload summary and statistics
+    - GET /api/uploads/<id>/query/ : Filter, project or aggregate the upload's rows
+    - GET /api/uploads/<id>/anomalies/ : Values flagged as outliers at ingest
+    - GET /api/uploads/<id>/histograms/ : Fixed and quantile bins per column and type
+    - GET /api/uploads/<id>/series/ : Downsampled per-row series of one column
+    
+    Authentication: Basic Auth required (username/password)
+    """
+    authentication_classes = [BasicAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    
+    def get_upload(self, pk):
+        """Return the upload with this id, or None."""
+        try:
+            return EquipmentUpload.objects.get(pk=pk)
+        except (EquipmentUpload.DoesNotExist, ValueError):
+            return None
+    
+    def not_found(self, pk):
+        return Response(
+            {'error': f'Upload {pk} not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    def retrieve(self, request, pk=None):
+        """Summary and statistics of one upload."""
+        upload = self.get_upload(pk)
+        if upload is None:
+            return self.not_found(pk)
+        
+        serializer = EquipmentUploadSerializer(upload)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def query(self, request, pk=None):
+        """
+        Query the stored rows of an upload.
+        
+        Query Parameters:
+        - flowrate, pressure, temperature: Optional. Equal to the value; add
+          __gt, __gte, __lt, __lte or __ne to compare instead.
+        - type: Optional. Equipment type, or several separated by commas.
+        - fields: Optional. Columns to return (name, type, flowrate, pressure,
+          temperature).
+        - agg: Optional. Aggregates of the matching rows (count, sum, mean,
+          min, max, std) instead of the rows themselves.
+        - group_by: Optional. 'type' to aggregate per equipment type.
+        - limit / offset: Optional. Window of matching rows to return.
+        - output: Optional. 'json' (default) or 'csv'.
+        
+        Returns: Aggregates, or the matching rows streamed as JSON or CSV
+        """
+        upload = self.get_upload(pk)
+        if upload is None:
+            return self.not_found(pk)
+        store = upload.get_store()
+        if store is None:
+            return Response(
+                {'error': f'Rows of upload {pk} are not stored.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        output = request.query_params.get('output', 'json')
+        if output not in ('json', 'csv'):
+            return Response(
+                {'error': "output must be 'json' or 'csv'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            query = EquipmentQuery.from_params(request.query_params)
+        except QueryError as e:
+            return Response(e.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
+        
+        mask = query.mask(store)
+        if query.is_aggregate:
+            return Response(
+                {'upload_id': upload.id, **query.aggregate(store, mask)},
+                status=status.HTTP_200_OK
+            )
+        if output == 'csv':
+            return StreamingHttpResponse(query.stream_csv(store, mask), content_type='text/csv')
+        return StreamingHttpResponse(query.stream_json(store, mask), content_type='application/json')
+    
+    @action(detail=True, methods=['get'])
+    def anomalies(self, request, pk=None):
+        """
+        Values of an upload flagged as outliers at ingest, highest score first.
+        
+        Query Parameters:
+        - column: Optional. flowrate, pressure or temperature.
+        - scope: Optional. 'column' (against the whole column) or 'type'
+          (against rows of the same equipment type).
+        
+        Returns: Total number of flags and the stored flags
+        """
+        upload = self.get_upload(pk)
+        if upload is None:
+            return self.not_found(pk)
+        if upload.anomaly_count is None:
+            return Response(
+                {'error': f'Anomaly detection did not run for upload {pk}; its rows are not stored or the stage is off.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        anomalies = upload.anomalies.all()
+        column = request.query_params.get('column')
+        if column:
+            if column not in EquipmentAnomaly.COLUMNS:
+                return Response(
+                    {'error': f'column must be one of {", ".join(EquipmentAnomaly.COLUMNS)}.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            anomalies = anomalies.filter(column=column)
+        scope = request.query_params.get('scope')
+        if scope:
+            if scope not in (EquipmentAnomaly.SCOPE_COLUMN, EquipmentAnomaly.SCOPE_TYPE):
+                return Response(
+                    {'error': "scope must be 'column' or 'type'."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            anomalies = anomalies.filter(scope=scope)
+        
+        serializer = EquipmentAnomalySerializer(anomalies, many=True)
+        return Response({
+            'upload_id': upload.id,
+            'total': upload.anomaly_count,
+            'count': len(serializer.data),
+            'data': serializer.data,
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def histograms(self, request, pk=None):
+        """
+        Histograms of an upload's numeric columns, overall and per type.
+        
+        Query Parameters:
+        - column: Optional. flowrate, pressure or temperature, or several
+          separated by commas.
+        - type: Optional. Equipment types to include, separated by commas;
+          'none' for the whole columns only.
+        - bins: Optional. Most fixed-width bins per histogram (default: as
+          stored, at most 64).
+        - quantile_bins: Optional. Number of equal-count bins (default 10).
+        
+        Returns: For every column, and every column of every type, the
+        fixed-width bin edges and counts and the quantile bin edges and counts
+        """
+        upload = self.get_upload(pk)
+        if upload is None:
+            return self.not_found(pk)
+        stats = upload.get_stats_with_histograms()
+        if stats is None:
+            return Response(
+                {'error': f'Histograms of upload {pk} are not stored.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        try:
+            options = histogram_options(request.query_params)
+        except QueryError as e:
+            return Response(e.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'upload_id': upload.id,
+            **upload_histograms(stats, **options),
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def series(self, request, pk=None):
+        """
+        Per-row readings of one column, downsampled for charting.
+        
+        Query Parameters:
+        - column: Required. flowrate, pressure or temperature.
+        - points: Optional. Most points returned (default 1000, at most 10000).
+        - method: Optional. 'lttb' (default) keeps the shape of the line;
+          'minmax' keeps the lowest and highest value of every bucket.
+        
+        Returns: Total rows, and the kept row indices (x) and values (y)
+        """
+        upload = self.get_upload(pk)
+        if upload is None:
+            return self.not_found(pk)
+        
+        try:
+            options = series_options(request.query_params)
+        except QueryError as e:
+            return Response(e.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
+        
+        series = get_series(upload, **options)
+        if series is None:
+            return Response(
+                {'error': f'Rows of upload {pk} are not stored.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({'upload_id': upload.id, **series}, status=status.HTTP_200_OK)
+
+
+class UploadSessionViewSet(viewsets.ViewSet):
+    """
+    ViewSet for resumable chunked uploads of large files.
+    
+    Endpoints:
+    - POST /api/upload/sessions/ : Open a session (filename, optional size)
+    - GET /api/upload/sessions/<id>/ : Session state and received byte offset
+    - PUT /api/upload/sessions/<id>/chunks/<n>/?offset=<bytes> : Send chunk n
+    - POST /api/upload/sessions/<id>/complete/ : Process the assembled file
+    - DELETE /api/upload/sessions/<id>/ : Abort the session
+    
+    After an interrupted transfer, read the offset and resume from there.
+    
+    Authentication: Basic Auth required (username/password)
+    """
+    authentication_classes = [BasicAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = (JSONParser, FormParser, MultiPartParser)
+    
+    def _get_session(self, pk):
+        try:
+            return UploadSession.objects.get(pk=pk)
+        except (UploadSession.DoesNotExist, ValidationError):
+            return None
+    
+    def _not_found(self, pk):
+        return Response(
+            {'error': f'Upload session {pk} not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    def create(self, request):
+        """Open a resumable upload session."""
+        serializer = UploadSessionCreateSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        session = create_session(
+            serializer.validated_data['filename'],
+            serializer.validated_data.get('size'),
+        )
+        session_url = reverse('upload-session-detail', kwargs={'pk': session.pk}, request=request)
+        return Response(
+            UploadSessionSerializer(session).data,
+            status=status.HTTP_201_CREATED,
+            headers={'Location': session_url},
+        )
+    
+    def retrieve(self, request, pk=None):
+        """Report the state and received offset of a session."""
+        session = self._get_session(pk)
+        if not session:
+            return self._not_found(pk)
+        
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+    
+    def destroy(self, request, pk=None):
+        """Abort a session and delete the bytes received so far."""
+        session = self._get_session(pk)
+        if not session:
+            return self._not_found(pk)
+        
+        try:
+            abort_session(session)
+        except IngestError as e:
+            return Response(
+                e.as_response_data(),
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>[0-9]+)')
+    def chunks(self, request, pk=None, index=None):
+        """
+        Write chunk ``index`` of the file at byte ``offset``.
+        
+        The raw request body is the chunk. Chunks may be re-sent; a chunk
+        that starts beyond the received offset is refused with 409 and the
+        offset to resume from.
+        """
+        session = self._get_session(pk)
+        if not session:
+            return self._not_found(pk)
+        
+        try:
+            offset = int(request.query_params['offset'])
+            if offset < 0:
+                raise ValueError
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Query parameter offset must be a non-negative byte offset.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0:
+            return Response(
+                {'error': 'Chunk body with a Content-Length is required.'},
+                status=status.HTTP_411_LENGTH_REQUIRED
+            )
+        if length > get_chunk_max_bytes():
+            return Response(
+                {'error': f'Chunks may be at most {get_chunk_max_bytes()} bytes.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        
+        try:
+            # Stream the body straight into the spool file
+            session = write_chunk(session, int(index), offset, request.stream, length)
+        except OffsetConflict as e:
+            return Response(
+                {'error': str(e), 'offset': e.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        except IngestError as e:
+            return Response(
+                e.as_response_data(),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """
+        Process the assembled file once every chunk has arrived.
+        
+        Body fields:
+        - mode: Optional. 'sync' (default) or 'async', as for /api/upload/.
+        """
+        session = self._get_session(pk)
+        if not session:
+            return self._not_found(pk)
+        
+        serializer = UploadSessionCompleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            outcome, result = complete_session(session, serializer.validated_data['mode'])
+        except IngestError as e:
+            return Response(
+                e.as_response_data(),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Error processing file: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        if outcome == 'queued':
+            status_url = reverse('upload-job-detail', kwargs={'pk': result.pk}, request=request)
+            return Response(
+                {
+                    'message': 'CSV accepted for processing',
+                    'job_id': str(result.pk),
+                    'status_url': status_url,
+                },
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': status_url},
+            )
+        if outcome == 'duplicate':
+            return Response(
+                {
+                    'message': 'CSV already uploaded; returning existing statistics',
+                    'duplicate': True,
+                    'data': EquipmentUploadSerializer(result).data
+                },
+                status=status.HTTP_200_OK
+            )
+        return Response(
+            {
+                'message': 'CSV uploaded successfully',
+                'data': EquipmentUploadSerializer(result).data
+            },
+            status=status.HTTP_201_CREATED
+        )
@@ -12,7 +12,7 @@ import {
   Tooltip,
   Legend,
 } from 'chart.js';
-import { Bar, Pie } from 'react-chartjs-2';
+import { Bar, Line, Pie } from 'react-chartjs-2';
 import './App.css';
 
 // Register ChartJS components
@@ -54,6 +54,57 @@ function App() {
     }
   };
 
+  // Fetch per-column histograms of an upload; charts without them still render
+  const fetchHistograms = async (uploadId) => {
+    if (uploadId === undefined || uploadId === null) {
+      return {};
+    }
+    try {
+      const response = await axios.get(
+        `${API_BASE_URL}/api/uploads/${uploadId}/histograms/`,
+        {
+          params: { type: 'none', bins: 32 },
+          auth: {
+            username: API_USERNAME,
+            password: API_PASSWORD,
+          },
+        }
+      );
+      return response.data?.columns || {};
+    } catch (err) {
+      console.error('Histogram error:', err);
+      return {};
+    }
+  };
+
+  // Fetch downsampled per-row readings of each column; the server keeps at
+  // most `points` points per column however many rows the upload has
+  const fetchSeries = async (uploadId) => {
+    if (uploadId === undefined || uploadId === null) {
+      return {};
+    }
+    const columns = ['flowrate', 'pressure', 'temperature'];
+    try {
+      const responses = await Promise.all(
+        columns.map((column) =>
+          axios.get(`${API_BASE_URL}/api/uploads/${uploadId}/series/`, {
+            params: { column, points: 1000 },
+            auth: {
+              username: API_USERNAME,
+              password: API_PASSWORD,
+            },
+          })
+        )
+      );
+      return Object.fromEntries(
+        responses.map((response, i) => [columns[i], response.data])
+      );
+    } catch (err) {
+      console.error('Series error:', err);
+      return {};
+    }
+  };
+
   // Handle file upload
   const handleUpload = async () => {
     if (!selectedFile) {
@@ -81,6 +132,10 @@ function App() {
 
       if (response.status === 201) {
         const payload = response.data?.data || {};
+        const [histograms, series] = await Promise.all([
+          fetchHistograms(payload.id),
+          fetchSeries(payload.id),
+        ]);
         const normalized = {
           total_records: payload.equipment_count ?? 0,
           equipment_types: payload.type_distribution || {},
@@ -90,6 +145,8 @@ function App() {
             avg_temperature: payload.avg_temperature ?? 0,
           },
           equipment: [],
+          histograms,
+          series,
         };
         setSummaryData(normalized);
         setSuccess(true);
@@ -179,8 +236,77 @@ function App() {
     };
   };
 
+  // Prepare histogram chart data, one chart per measurement
+  const getHistogramChartData = () => {
+    const histograms = summaryData?.histograms || {};
+    const columns = [
+      ['flowrate', 'Flowrate', 'rgba(54, 162, 235, 0.7)'],
+      ['pressure', 'Pressure', 'rgba(255, 99, 132, 0.7)'],
+      ['temperature', 'Temperature', 'rgba(75, 192, 75, 0.7)'],
+    ];
+
+    return columns
+      .filter(([key]) => histograms[key]?.fixed?.counts?.length)
+      .map(([key, label, color]) => {
+        const { edges, counts } = histograms[key].fixed;
+        return {
+          key,
+          label,
+          data: {
+            labels: counts.map(
+              (_, i) => `${edges[i].toFixed(1)}–${edges[i + 1].toFixed(1)}`
+            ),
+            datasets: [
+              {
+                label: `${label} count`,
+                data: counts,
+                backgroundColor: color,
+                borderColor: color.replace('0.7', '1'),
+                borderWidth: 1,
+                barPercentage: 1.0,
+                categoryPercentage: 1.0,
+              },
+            ],
+          },
+        };
+      });
+  };
+
+  // Prepare per-row reading line charts from the downsampled series
+  const getSeriesChartData = () => {
+    const series = summaryData?.series || {};
+    const columns = [
+      ['flowrate', 'Flowrate', 'rgba(54, 162, 235, 1)'],
+      ['pressure', 'Pressure', 'rgba(255, 99, 132, 1)'],
+      ['temperature', 'Temperature', 'rgba(75, 192, 75, 1)'],
+    ];
+
+    return columns
+      .filter(([key]) => series[key]?.x?.length)
+      .map(([key, label, color]) => {
+        const { x, y } = series[key];
+        return {
+          key,
+          label,
+          data: {
+            datasets: [
+              {
+                label: `${label} by row`,
+                data: x.map((row, i) => ({ x: row, y: y[i] })),
+                borderColor: color,
+                borderWidth: 1,
+                pointRadius: 0,
+              },
+            ],
+          },
+        };
+      });
+  };
+
   const barChartData = getBarChartData();
   const pieChartData = getPieChartData();
+  const histogramCharts = getHistogramChartData();
+  const seriesCharts = getSeriesChartData();
 
   const chartOptions = {
     responsive: true,
@@ -192,6 +318,14 @@ function App() {
     },
   };
 
+  const seriesChartOptions = {
+    ...chartOptions,
+    animation: false,
+    scales: {
+      x: { type: 'linear', title: { display: true, text: 'Row' } },
+    },
+  };
+
   return (
     <div className="app-container">
       <header className="app-header">
@@ -295,6 +429,20 @@ function App() {
                   <Pie data={pieChartData} options={chartOptions} />
                 </div>
               )}
+
+              {histogramCharts.map((chart) => (
+                <div className="chart-wrapper" key={chart.key}>
+                  <h3>{chart.label} Distribution</h3>
+                  <Bar data={chart.data} options={chartOptions} />
+                </div>
+              ))}
+
+              {seriesCharts.map((chart) => (
+                <div className="chart-wrapper" key={`series-${chart.key}`}>
+                  <h3>{chart.label} Readings</h3>
+                  <Line data={chart.data} options={seriesChartOptions} />
+                </div>
+              ))}
             </div>
 
             {/* Equipment List */}